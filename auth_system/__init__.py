@@ -10,12 +10,16 @@ Fecha: 23 de Noviembre 2025
 
 from .constants import DEFAULT_USER_ROLE
 from .permissions import check_permission, get_user_permissions
+from .permission_cache import get_permission_cache
+from .token_cache import get_token_cache
 from .decorators import require_permission, require_role, get_current_user
 
 __all__ = [
     'DEFAULT_USER_ROLE',
     'check_permission',
     'get_user_permissions',
+    'get_permission_cache',
+    'get_token_cache',
     'require_permission',
     'require_role',
     'get_current_user'
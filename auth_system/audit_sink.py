@@ -0,0 +1,263 @@
+"""
+Escritura en Segundo Plano de Audit Logs
+
+Cola acotada de registros de auditoría que un hilo en segundo plano
+enriquece con el perfil del usuario (cache de permisos) y escribe en la
+colección `audit_logs` mediante batch writes, al alcanzar
+AUDIT_SINK['batch_size'] registros o AUDIT_SINK['flush_interval_seconds'].
+
+Si la cola está llena, o si un batch falla, los registros se guardan en un
+archivo JSONL (AUDIT_SINK['spill_file']) que se reintenta al iniciar el hilo;
+con overflow_policy="drop" simplemente se descartan.
+
+Autor: Juan Pablo GM
+Fecha: 23 de Noviembre 2025
+"""
+
+import atexit
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from database.config import get_firestore_client
+
+from .constants import AUDIT_SINK
+from .permission_cache import get_permission_cache
+
+
+FIRESTORE_MAX_BATCH = 500
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class AuditLogSink:
+    """
+    Cola de audit logs con escritura por lotes en un hilo en segundo plano.
+    """
+
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_seconds: Optional[float] = None,
+        overflow_policy: Optional[str] = None,
+        spill_file: Optional[str] = None
+    ):
+        """
+        Inicializa la cola (el hilo se inicia con el primer registro).
+
+        Args:
+            max_queue: Máximo de registros pendientes en memoria
+            batch_size: Registros por batch write (máximo 500)
+            flush_interval_seconds: Tiempo máximo antes de escribir un batch incompleto
+            overflow_policy: "spill" para guardar en disco o "drop" para descartar
+            spill_file: Archivo JSONL para registros no escritos
+        """
+        self.batch_size = min(batch_size or AUDIT_SINK['batch_size'], FIRESTORE_MAX_BATCH)
+        self.flush_interval_seconds = flush_interval_seconds or AUDIT_SINK['flush_interval_seconds']
+        self.overflow_policy = overflow_policy or AUDIT_SINK['overflow_policy']
+        spill_path = Path(spill_file or AUDIT_SINK['spill_file'])
+        self.spill_path = spill_path if spill_path.is_absolute() else PROJECT_ROOT / spill_path
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue or AUDIT_SINK['max_queue'])
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def enqueue(self, log_data: Dict[str, Any]) -> bool:
+        """
+        Encola un registro sin bloquear.
+
+        Args:
+            log_data: Registro de auditoría (sin datos del perfil del usuario)
+
+        Returns:
+            True si quedó en cola, False si se desbordó (guardado en disco o descartado)
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(log_data)
+            return True
+        except queue.Full:
+            self._overflow([log_data])
+            return False
+
+    def flush(self, timeout: Optional[float] = None):
+        """Espera a que se escriban los registros pendientes."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+
+    def close(self, timeout: float = 10.0):
+        """Escribe lo pendiente y detiene el hilo."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna estadísticas de la cola."""
+        return {
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'spilled': self.spilled,
+            'dropped': self.dropped
+        }
+
+    # ------------------------------------------------------------------
+    # Hilo de escritura
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-log-sink', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Agrupa registros de la cola y los escribe por lotes."""
+        self._replay_spill()
+        while True:
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            elif self._stop.is_set():
+                return
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Espera hasta completar un batch o hasta que venza el intervalo."""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stop.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.5)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Enriquece los registros y los escribe en un batch de Firestore."""
+        try:
+            db = get_firestore_client()
+            firestore_batch = db.batch()
+            collection = db.collection('audit_logs')
+            for log_data in batch:
+                self._enrich(log_data)
+                firestore_batch.set(collection.document(log_data['log_id']), log_data)
+            firestore_batch.commit()
+            self.written += len(batch)
+        except Exception as e:
+            print(f"⚠️ Error escribiendo audit logs ({len(batch)} registros): {e}")
+            self._overflow(batch)
+
+    @staticmethod
+    def _enrich(log_data: Dict[str, Any]):
+        """Agrega nombre y roles del usuario desde el cache de permisos."""
+        if 'user_roles' in log_data:
+            return
+        try:
+            user_data = get_permission_cache().get_user_data(log_data['user_uid']) or {}
+        except Exception:
+            user_data = {}
+        log_data['user_name'] = user_data.get('full_name')
+        log_data['user_roles'] = user_data.get('roles', [])
+
+    # ------------------------------------------------------------------
+    # Desborde a disco
+    # ------------------------------------------------------------------
+
+    def _overflow(self, records: List[Dict[str, Any]]):
+        """Aplica la política de desborde a registros no escritos."""
+        if self.overflow_policy != 'spill':
+            self.dropped += len(records)
+            return
+        try:
+            with self._spill_lock:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    for log_data in records:
+                        f.write(json.dumps(log_data, ensure_ascii=False, default=_json_default) + '\n')
+            self.spilled += len(records)
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar audit logs en disco: {e}")
+            self.dropped += len(records)
+
+    def _replay_spill(self):
+        """Reintenta los registros guardados en disco en ejecuciones anteriores."""
+        with self._spill_lock:
+            if not self.spill_path.exists():
+                return
+            replay_path = self.spill_path.with_suffix('.replay')
+            try:
+                self.spill_path.replace(replay_path)
+            except OSError:
+                return
+
+        records = []
+        with open(replay_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    log_data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(log_data.get('timestamp'), str):
+                    try:
+                        log_data['timestamp'] = datetime.fromisoformat(log_data['timestamp'])
+                    except ValueError:
+                        pass
+                records.append(log_data)
+
+        print(f"📝 Reintentando {len(records)} audit logs pendientes en disco")
+        for start in range(0, len(records), self.batch_size):
+            self._write_batch(records[start:start + self.batch_size])
+        replay_path.unlink()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+_audit_sink: Optional[AuditLogSink] = None
+_audit_sink_lock = threading.Lock()
+
+
+def get_audit_sink() -> AuditLogSink:
+    """Retorna la instancia compartida de la cola de audit logs."""
+    global _audit_sink
+    if _audit_sink is None:
+        with _audit_sink_lock:
+            if _audit_sink is None:
+                _audit_sink = AuditLogSink()
+                atexit.register(_audit_sink.close)
+    return _audit_sink
@@ -200,3 +200,36 @@ ADMIN_ONLY_PATHS = [
     "/auth/change-password",
     "/auth/user/*"
 ]
+
+# ============================================================================
+# CACHE DE PERMISOS
+# ============================================================================
+
+PERMISSION_CACHE = {
+    "ttl_seconds": 300,             # 5 minutos
+    "enable_listeners": True,       # Invalidación con on_snapshot
+    # "users" es opcional: un listener sobre toda la colección recibe cada
+    # cambio de cualquier usuario; sin él los usuarios expiran por TTL
+    "listen_collections": ["roles"]
+}
+
+# ============================================================================
+# CACHE DE TOKENS VERIFICADOS
+# ============================================================================
+
+TOKEN_CACHE = {
+    "max_entries": 2048,
+    "revocation_check_seconds": 300  # None desactiva la verificación de revocación
+}
+
+# ============================================================================
+# ESCRITURA DE AUDIT LOGS
+# ============================================================================
+
+AUDIT_SINK = {
+    "max_queue": 10000,             # Registros pendientes en memoria
+    "batch_size": 200,              # Máximo 500 por batch en Firestore
+    "flush_interval_seconds": 2.0,
+    "overflow_policy": "spill",     # "spill" (a disco) o "drop"
+    "spill_file": "app_outputs/audit_logs_spill.jsonl"
+}
@@ -9,11 +9,12 @@ Fecha: 23 de Noviembre 2025
 
 from functools import wraps
 from typing import List, Optional, Callable
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth
 
 from .permissions import check_permission, get_user_permissions, has_any_role
+from .token_cache import build_user_context, get_token_cache
 
 
 # Security scheme para FastAPI
@@ -21,17 +22,23 @@ security = HTTPBearer()
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
     """
     Dependency para obtener el usuario actual desde el token de Firebase.
     
+    Si AuthorizationMiddleware ya verificó el token se reutiliza
+    `request.state.user`; en otro caso el token se verifica a través del
+    cache de tokens.
+    
     Uso en endpoints:
         async def my_endpoint(current_user: dict = Depends(get_current_user)):
             user_uid = current_user['uid']
             user_email = current_user['email']
     
     Args:
+        request: Request de FastAPI
         credentials: Credenciales del header Authorization
         
     Returns:
@@ -40,21 +47,16 @@ async def get_current_user(
     Raises:
         HTTPException: Si el token es inválido o expirado
     """
+    user = getattr(request.state, 'user', None)
+    if user is not None:
+        return user
+    
     try:
         # Verificar token de Firebase
         id_token = credentials.credentials
-        decoded_token = auth.verify_id_token(id_token)
-        
-        uid = decoded_token['uid']
-        email = decoded_token.get('email')
-        email_verified = decoded_token.get('email_verified', False)
+        decoded_token = await get_token_cache().verify_async(id_token)
         
-        return {
-            'uid': uid,
-            'email': email,
-            'email_verified': email_verified,
-            'token': decoded_token
-        }
+        return build_user_context(decoded_token)
         
     except auth.InvalidIdTokenError:
         raise HTTPException(
@@ -297,18 +299,17 @@ def optional_auth():
             try:
                 from fastapi import Request
                 request = kwargs.get('request')
-                if request and hasattr(request, 'headers'):
+                state_user = getattr(getattr(request, 'state', None), 'user', None)
+                if state_user is not None:
+                    # Token ya verificado por AuthorizationMiddleware
+                    kwargs['current_user'] = state_user
+                elif request and hasattr(request, 'headers'):
                     auth_header = request.headers.get('Authorization')
                     if auth_header and auth_header.startswith('Bearer '):
                         token = auth_header.split('Bearer ')[1]
                         try:
-                            decoded_token = auth.verify_id_token(token)
-                            kwargs['current_user'] = {
-                                'uid': decoded_token['uid'],
-                                'email': decoded_token.get('email'),
-                                'email_verified': decoded_token.get('email_verified', False),
-                                'token': decoded_token
-                            }
+                            decoded_token = await get_token_cache().verify_async(token)
+                            kwargs['current_user'] = build_user_context(decoded_token)
                         except:
                             # Token inválido, continuar sin usuario
                             pass
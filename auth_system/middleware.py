@@ -11,10 +11,43 @@ from fastapi import Request
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from firebase_admin import auth
+from datetime import datetime
 from typing import List
 import re
 
+from .audit_sink import AuditLogSink, get_audit_sink
 from .constants import PUBLIC_PATHS
+from .permission_cache import get_permission_cache, request_scope
+from .token_cache import build_user_context, get_token_cache
+
+
+class PathMatcher:
+    """
+    Tabla de rutas compilada una sola vez.
+    
+    Las rutas exactas se buscan en un conjunto y las rutas con wildcard
+    final ("/static/*") se combinan en una sola expresión regular de prefijos.
+    """
+    
+    def __init__(self, paths: List[str]):
+        """
+        Compila la tabla de rutas.
+        
+        Args:
+            paths: Rutas exactas o con wildcard final
+        """
+        self.exact = frozenset(p for p in paths if not p.endswith("*"))
+        prefixes = [
+            ".*".join(re.escape(part) for part in p.split("*"))
+            for p in paths if p.endswith("*")
+        ]
+        self.pattern = re.compile("|".join(prefixes)) if prefixes else None
+    
+    def matches(self, path: str) -> bool:
+        """Retorna True si la ruta está en la tabla."""
+        if path in self.exact:
+            return True
+        return self.pattern is not None and self.pattern.match(path) is not None
 
 
 class AuthorizationMiddleware(BaseHTTPMiddleware):
@@ -51,6 +84,9 @@ class AuthorizationMiddleware(BaseHTTPMiddleware):
         super().__init__(app)
         self.public_paths = public_paths or PUBLIC_PATHS
         self.admin_only_paths = admin_only_paths or []
+        self._public_matcher = PathMatcher(self.public_paths)
+        self._admin_matcher = PathMatcher(self.admin_only_paths)
+        self._token_cache = get_token_cache()
     
     def is_public_path(self, path: str) -> bool:
         """
@@ -66,15 +102,7 @@ class AuthorizationMiddleware(BaseHTTPMiddleware):
         Returns:
             True si es ruta pública, False en caso contrario
         """
-        for public_path in self.public_paths:
-            # Soporte para wildcards
-            if public_path.endswith("*"):
-                pattern = public_path.replace("*", ".*")
-                if re.match(f"^{pattern}", path):
-                    return True
-            elif path == public_path:
-                return True
-        return False
+        return self._public_matcher.matches(path)
     
     def is_admin_only_path(self, path: str) -> bool:
         """
@@ -86,19 +114,29 @@ class AuthorizationMiddleware(BaseHTTPMiddleware):
         Returns:
             True si requiere super_admin, False en caso contrario
         """
-        for admin_path in self.admin_only_paths:
-            if admin_path.endswith("*"):
-                pattern = admin_path.replace("*", ".*")
-                if re.match(f"^{pattern}", path):
-                    return True
-            elif path == admin_path:
-                return True
-        return False
+        return self._admin_matcher.matches(path)
     
     async def dispatch(self, request: Request, call_next):
         """
         Intercepta cada request para validar autenticación.
         
+        Abre un ámbito de cache de permisos para que el usuario se lea
+        una sola vez durante todo el request.
+        
+        Args:
+            request: Request de FastAPI
+            call_next: Siguiente handler en la cadena
+            
+        Returns:
+            Response del handler o error de autenticación
+        """
+        with request_scope():
+            return await self._authorize(request, call_next)
+    
+    async def _authorize(self, request: Request, call_next):
+        """
+        Valida autenticación y, si aplica, el rol super_admin.
+        
         Args:
             request: Request de FastAPI
             call_next: Siguiente handler en la cadena
@@ -128,24 +166,17 @@ class AuthorizationMiddleware(BaseHTTPMiddleware):
         try:
             # Extraer y verificar token
             id_token = auth_header.split("Bearer ")[1]
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = await self._token_cache.verify_async(id_token)
             
-            # Agregar usuario al request state
-            request.state.user = {
-                'uid': decoded_token['uid'],
-                'email': decoded_token.get('email'),
-                'email_verified': decoded_token.get('email_verified', False),
-                'token': decoded_token
-            }
+            # Agregar usuario al request state (lo reutilizan los decoradores)
+            request.state.user = build_user_context(decoded_token)
             
             # Verificar si requiere super_admin
             if self.is_admin_only_path(path):
                 # Obtener roles del usuario
-                from database.config import get_firestore_client
-                db = get_firestore_client()
-                user_doc = db.collection('users').document(decoded_token['uid']).get()
+                user_data = await get_permission_cache().get_user_data_async(decoded_token['uid'])
                 
-                if not user_doc.exists:
+                if user_data is None:
                     return JSONResponse(
                         status_code=403,
                         content={
@@ -154,7 +185,6 @@ class AuthorizationMiddleware(BaseHTTPMiddleware):
                         }
                     )
                 
-                user_data = user_doc.to_dict()
                 user_roles = user_data.get('roles', [])
                 
                 if 'super_admin' not in user_roles:
@@ -221,16 +251,18 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
     - Resultado (éxito/error)
     """
     
-    def __init__(self, app, enable_logging: bool = True):
+    def __init__(self, app, enable_logging: bool = True, sink: AuditLogSink = None):
         """
         Inicializa el middleware de auditoría.
         
         Args:
             app: Aplicación FastAPI
             enable_logging: Si False, desactiva el logging (útil para testing)
+            sink: Cola de audit logs (por defecto la compartida)
         """
         super().__init__(app)
         self.enable_logging = enable_logging
+        self.sink = sink or get_audit_sink()
     
     async def dispatch(self, request: Request, call_next):
         """
@@ -246,7 +278,6 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
         if not self.enable_logging:
             return await call_next(request)
         
-        from datetime import datetime
         import uuid
         
         start_time = datetime.utcnow()
@@ -326,7 +357,10 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
         timestamp: datetime
     ):
         """
-        Registra la acción en Firestore (colección audit_logs).
+        Encola la acción para la colección audit_logs.
+        
+        El nombre y los roles del usuario se agregan en la cola de audit logs
+        (ver audit_sink.py), que escribe por lotes fuera del request.
         
         Args:
             user_info: Información del usuario
@@ -338,15 +372,8 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
             execution_time_ms: Tiempo de ejecución en ms
             timestamp: Timestamp del inicio del request
         """
-        from database.config import get_firestore_client
         import uuid
         
-        db = get_firestore_client()
-        
-        # Obtener información adicional del usuario
-        user_doc = db.collection('users').document(user_info['uid']).get()
-        user_data = user_doc.to_dict() if user_doc.exists else {}
-        
         # Crear log entry
         log_data = {
             'log_id': f"log_{uuid.uuid4()}",
@@ -356,8 +383,6 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
             # Usuario
             'user_uid': user_info['uid'],
             'user_email': user_info.get('email'),
-            'user_name': user_data.get('full_name'),
-            'user_roles': user_data.get('roles', []),
             
             # Request
             'request_method': request.method,
@@ -376,8 +401,8 @@ class AuditLogMiddleware(BaseHTTPMiddleware):
             'requires_review': not success and status_code >= 500
         }
         
-        # Guardar en Firestore
-        db.collection('audit_logs').document(log_data['log_id']).set(log_data)
+        # Encolar para escritura por lotes
+        self.sink.enqueue(log_data)
     
     def _classify_risk(self, method: str, path: str) -> str:
         """
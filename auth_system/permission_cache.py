@@ -0,0 +1,343 @@
+"""
+Cache de Roles y Permisos
+
+Cache en proceso de los documentos de usuarios (`users`) y de las
+definiciones de roles (`roles`) usados en las verificaciones de permisos.
+
+- Cada entrada expira después de un TTL (PERMISSION_CACHE['ttl_seconds']).
+- Un listener `on_snapshot` sobre `roles` actualiza los roles en cuanto
+  cambian en Firestore. El listener sobre `users` es opcional
+  (PERMISSION_CACHE['listen_collections']) e invalida solo los usuarios
+  modificados; sin él los usuarios se renuevan por TTL.
+- Los datos retornados son copias: modificarlos no altera el cache.
+- Dentro de un request (`request_scope`) cada usuario se resuelve una sola
+  vez, aunque se llamen varias funciones de permisos.
+- Las variantes `*_async` ejecutan las lecturas a Firestore en el threadpool
+  para no bloquear el event loop de FastAPI.
+
+Autor: Juan Pablo GM
+Fecha: 23 de Noviembre 2025
+"""
+
+import copy
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from database.config import get_firestore_client
+from starlette.concurrency import run_in_threadpool
+
+from .constants import PERMISSION_CACHE
+
+
+# Memoización por request: {('user', uid): datos} mientras dure el request
+_request_memo: ContextVar[Optional[Dict[Tuple[str, str], Any]]] = ContextVar(
+    'auth_request_memo', default=None
+)
+
+
+@contextmanager
+def request_scope():
+    """
+    Abre un ámbito de memoización para un request.
+
+    Uso:
+        with request_scope():
+            response = await call_next(request)
+    """
+    token = _request_memo.set({})
+    try:
+        yield
+    finally:
+        _request_memo.reset(token)
+
+
+class PermissionCache:
+    """
+    Cache con TTL de usuarios y roles, invalidado por listeners de Firestore.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        enable_listeners: Optional[bool] = None
+    ):
+        """
+        Inicializa el cache.
+
+        Args:
+            ttl_seconds: Vigencia de cada entrada (por defecto PERMISSION_CACHE)
+            enable_listeners: Si True, registra listeners on_snapshot al primer uso
+        """
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else PERMISSION_CACHE['ttl_seconds']
+        self.enable_listeners = (
+            enable_listeners if enable_listeners is not None else PERMISSION_CACHE['enable_listeners']
+        )
+        self._lock = threading.RLock()
+        self._users: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._roles: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        # Se incrementa en cada invalidación para descartar lecturas en vuelo
+        self._generation = 0
+        # Igual que _generation, pero por usuario (invalidaciones individuales)
+        self._user_generations: Dict[str, int] = {}
+        self._watches: List[Any] = []
+        self._listeners_started = False
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def get_user_data(self, user_uid: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el documento de un usuario (None si no existe).
+
+        Args:
+            user_uid: UID del usuario en Firebase
+
+        Returns:
+            Diccionario con los datos del usuario o None
+        """
+        found, user_data, generation = self._lookup_user(user_uid)
+        if not found:
+            user_data = self._fetch_user(user_uid, generation)
+        return copy.deepcopy(self._remember_user(user_uid, user_data))
+
+    async def get_user_data_async(self, user_uid: str) -> Optional[Dict[str, Any]]:
+        """
+        Versión asíncrona de `get_user_data`.
+
+        Los aciertos de cache se resuelven sin salir del event loop; solo la
+        lectura a Firestore se ejecuta en el threadpool.
+        """
+        found, user_data, generation = self._lookup_user(user_uid)
+        if not found:
+            user_data = await run_in_threadpool(self._fetch_user, user_uid, generation)
+        return copy.deepcopy(self._remember_user(user_uid, user_data))
+
+    def get_roles(self, role_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene las definiciones de varios roles.
+
+        Los roles que no están en cache se leen en una sola llamada
+        `get_all`. Los roles inexistentes se omiten del resultado.
+
+        Args:
+            role_ids: IDs de roles
+
+        Returns:
+            Diccionario {role_id: datos del rol}
+        """
+        roles, missing, generation = self._lookup_roles(role_ids)
+        if missing:
+            roles.update(self._fetch_roles(missing, generation))
+        return copy.deepcopy(roles)
+
+    async def get_roles_async(self, role_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Versión asíncrona de `get_roles` (lecturas en el threadpool)."""
+        roles, missing, generation = self._lookup_roles(role_ids)
+        if missing:
+            roles.update(await run_in_threadpool(self._fetch_roles, missing, generation))
+        return copy.deepcopy(roles)
+
+    def _user_generation(self, user_uid: str) -> Tuple[int, int]:
+        """Generación global y del usuario (llamar con el lock tomado)."""
+        return self._generation, self._user_generations.get(user_uid, 0)
+
+    def _lookup_user(self, user_uid: str) -> Tuple[bool, Optional[Dict[str, Any]], Tuple[int, int]]:
+        """Busca un usuario en la memoización del request y en el cache."""
+        memo = _request_memo.get()
+        if memo is not None and ('user', user_uid) in memo:
+            return True, memo[('user', user_uid)], (self._generation, 0)
+
+        with self._lock:
+            entry = self._users.get(user_uid)
+            generation = self._user_generation(user_uid)
+
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return True, entry[1], generation
+        self.misses += 1
+        return False, None, generation
+
+    def _fetch_user(self, user_uid: str, generation: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        """Lee un usuario de Firestore y lo guarda en cache (bloqueante)."""
+        self._ensure_listeners()
+        db = get_firestore_client()
+        user_doc = db.collection('users').document(user_uid).get()
+        user_data = user_doc.to_dict() if user_doc.exists else None
+        with self._lock:
+            if generation == self._user_generation(user_uid):
+                self._users[user_uid] = (time.monotonic() + self.ttl_seconds, user_data)
+        return user_data
+
+    def _remember_user(self, user_uid: str, user_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Guarda el usuario en la memoización del request, si hay una activa."""
+        memo = _request_memo.get()
+        if memo is not None:
+            memo[('user', user_uid)] = user_data
+        return user_data
+
+    def _lookup_roles(self, role_ids: Iterable[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str], int]:
+        """Separa los roles vigentes en cache de los que hay que leer."""
+        now = time.monotonic()
+        roles: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            generation = self._generation
+            for role_id in dict.fromkeys(role_ids):
+                entry = self._roles.get(role_id)
+                if entry is not None and entry[0] > now:
+                    if entry[1] is not None:
+                        roles[role_id] = entry[1]
+                else:
+                    missing.append(role_id)
+
+        if missing:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return roles, missing, generation
+
+    def _fetch_roles(self, role_ids: List[str], generation: int) -> Dict[str, Dict[str, Any]]:
+        """Lee varios roles de Firestore en una llamada y los guarda en cache (bloqueante)."""
+        self._ensure_listeners()
+        db = get_firestore_client()
+        refs = [db.collection('roles').document(role_id) for role_id in role_ids]
+        fetched: Dict[str, Optional[Dict[str, Any]]] = {role_id: None for role_id in role_ids}
+        for role_doc in db.get_all(refs):
+            if role_doc.exists:
+                fetched[role_doc.id] = role_doc.to_dict()
+
+        with self._lock:
+            if generation == self._generation:
+                expires_at = time.monotonic() + self.ttl_seconds
+                for role_id, role_data in fetched.items():
+                    self._roles[role_id] = (expires_at, role_data)
+
+        return {role_id: data for role_id, data in fetched.items() if data is not None}
+
+    # ------------------------------------------------------------------
+    # Invalidación
+    # ------------------------------------------------------------------
+
+    def invalidate_user(self, user_uid: str):
+        """Elimina un usuario del cache."""
+        with self._lock:
+            self._drop_user(user_uid)
+
+    def invalidate_role(self, role_id: str):
+        """Elimina un rol del cache."""
+        with self._lock:
+            self._generation += 1
+            self._roles.pop(role_id, None)
+
+    def clear(self):
+        """Vacía el cache completo."""
+        with self._lock:
+            self._generation += 1
+            self._user_generations.clear()
+            self._users.clear()
+            self._roles.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estadísticas del cache."""
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'roles': len(self._roles),
+                'hits': self.hits,
+                'misses': self.misses,
+                'listeners': len(self._watches)
+            }
+
+    # ------------------------------------------------------------------
+    # Listeners on_snapshot
+    # ------------------------------------------------------------------
+
+    def _ensure_listeners(self):
+        """Registra los listeners la primera vez que se lee de Firestore."""
+        if self._listeners_started or not self.enable_listeners:
+            return
+        with self._lock:
+            if self._listeners_started:
+                return
+            self._listeners_started = True
+        self.start_listeners()
+
+    def start_listeners(self):
+        """
+        Registra listeners on_snapshot sobre las colecciones configuradas.
+
+        Si un listener no puede registrarse, el cache sigue funcionando
+        solo con el TTL.
+        """
+        callbacks = {'roles': self._on_roles_snapshot, 'users': self._on_users_snapshot}
+        try:
+            db = get_firestore_client()
+        except Exception as e:
+            print(f"⚠️ Cache de permisos sin listeners (Firestore no disponible): {e}")
+            return
+
+        for collection_name in PERMISSION_CACHE['listen_collections']:
+            callback = callbacks.get(collection_name)
+            if callback is None:
+                continue
+            try:
+                self._watches.append(db.collection(collection_name).on_snapshot(callback))
+            except Exception as e:
+                print(f"⚠️ No se pudo registrar listener de '{collection_name}': {e}")
+
+    def stop_listeners(self):
+        """Cancela los listeners registrados."""
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+        self._watches = []
+        self._listeners_started = False
+
+    def _on_roles_snapshot(self, docs, changes, read_time):
+        """Actualiza los roles modificados con los datos del snapshot."""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._generation += 1
+            for change in changes:
+                role_doc = change.document
+                if change.type.name == 'REMOVED':
+                    self._roles[role_doc.id] = (expires_at, None)
+                else:
+                    self._roles[role_doc.id] = (expires_at, role_doc.to_dict())
+
+    def _on_users_snapshot(self, docs, changes, read_time):
+        """Invalida solo los usuarios modificados, sin tocar el resto del cache."""
+        with self._lock:
+            for change in changes:
+                self._drop_user(change.document.id)
+
+    def _drop_user(self, user_uid: str):
+        """
+        Elimina un usuario y descarta sus lecturas en vuelo sin afectar las de
+        otros usuarios ni las de roles (llamar con el lock tomado).
+        """
+        self._user_generations[user_uid] = self._user_generations.get(user_uid, 0) + 1
+        self._users.pop(user_uid, None)
+
+
+_permission_cache: Optional[PermissionCache] = None
+_permission_cache_lock = threading.Lock()
+
+
+def get_permission_cache() -> PermissionCache:
+    """Retorna la instancia compartida del cache de permisos."""
+    global _permission_cache
+    if _permission_cache is None:
+        with _permission_cache_lock:
+            if _permission_cache is None:
+                _permission_cache = PermissionCache()
+    return _permission_cache
@@ -2,6 +2,8 @@
 Sistema de Gestión de Permisos
 
 Funciones para verificar y obtener permisos de usuarios.
+Los documentos de usuarios y roles se leen a través del cache de permisos
+(ver permission_cache.py).
 
 Autor: Juan Pablo GM
 Fecha: 23 de Noviembre 2025
@@ -9,7 +11,38 @@ Fecha: 23 de Noviembre 2025
 
 from typing import List, Dict, Optional, Set
 from datetime import datetime
-from database.config import get_firestore_client
+from .permission_cache import get_permission_cache
+
+
+def _active_temporary_permissions(user_data: Dict) -> List[str]:
+    """
+    Retorna los permisos temporales de un usuario que aún no han expirado.
+    
+    Args:
+        user_data: Documento del usuario
+        
+    Returns:
+        Lista de permisos temporales vigentes
+    """
+    active_temp_perms = []
+    now = datetime.utcnow()
+    
+    for temp_perm in user_data.get('temporary_permissions', []):
+        expires_at = temp_perm.get('expires_at')
+        if expires_at and isinstance(expires_at, datetime):
+            if expires_at > now:
+                active_temp_perms.append(temp_perm['permission'])
+        elif expires_at:
+            # Si es string, intentar parsear
+            try:
+                from dateutil import parser
+                expires_dt = parser.parse(str(expires_at))
+                if expires_dt > now:
+                    active_temp_perms.append(temp_perm['permission'])
+            except:
+                pass
+    
+    return active_temp_perms
 
 
 async def get_user_permissions(user_uid: str) -> List[str]:
@@ -21,6 +54,9 @@ async def get_user_permissions(user_uid: str) -> List[str]:
     - Permisos personalizados
     - Permisos temporales activos
     
+    El usuario y sus roles se leen del cache de permisos; los permisos
+    temporales se evalúan en cada llamada.
+    
     Args:
         user_uid: UID del usuario en Firebase
         
@@ -28,47 +64,22 @@ async def get_user_permissions(user_uid: str) -> List[str]:
         Lista de permisos (ej: ["read:proyectos", "write:proyectos"])
     """
     try:
-        db = get_firestore_client()
+        cache = get_permission_cache()
         
-        # Obtener usuario de Firestore
-        user_doc = db.collection('users').document(user_uid).get()
-        if not user_doc.exists:
+        # Obtener usuario (cache / Firestore)
+        user_data = await cache.get_user_data_async(user_uid)
+        if user_data is None:
             return []
         
-        user_data = user_doc.to_dict()
         user_roles = user_data.get('roles', [])
         custom_permissions = user_data.get('custom_permissions', [])
         
-        # Permisos temporales activos
-        temporary_permissions = user_data.get('temporary_permissions', [])
-        active_temp_perms = []
-        
-        now = datetime.utcnow()
-        
-        for temp_perm in temporary_permissions:
-            expires_at = temp_perm.get('expires_at')
-            if expires_at and isinstance(expires_at, datetime):
-                if expires_at > now:
-                    active_temp_perms.append(temp_perm['permission'])
-            elif expires_at:
-                # Si es string, intentar parsear
-                try:
-                    from dateutil import parser
-                    expires_dt = parser.parse(str(expires_at))
-                    if expires_dt > now:
-                        active_temp_perms.append(temp_perm['permission'])
-                except:
-                    pass
+        # Permisos personalizados y temporales activos
+        all_permissions: Set[str] = set(custom_permissions + _active_temporary_permissions(user_data))
         
         # Obtener permisos de cada rol
-        all_permissions: Set[str] = set(custom_permissions + active_temp_perms)
-        
-        for role_id in user_roles:
-            role_doc = db.collection('roles').document(role_id).get()
-            if role_doc.exists:
-                role_data = role_doc.to_dict()
-                role_permissions = role_data.get('permissions', [])
-                all_permissions.update(role_permissions)
+        for role_data in (await cache.get_roles_async(user_roles)).values():
+            all_permissions.update(role_data.get('permissions', []))
         
         return list(all_permissions)
         
@@ -122,10 +133,8 @@ async def check_permission(
         if resource_data and len(parts) == 3:
             action, resource, scope = parts
             if scope == 'own_centro':
-                db = get_firestore_client()
-                user_doc = db.collection('users').document(user_uid).get()
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()
+                user_data = await get_permission_cache().get_user_data_async(user_uid)
+                if user_data is not None:
                     user_centro = user_data.get('centro_gestor_assigned')
                     resource_centro = resource_data.get('nombre_centro_gestor')
                     
@@ -151,13 +160,11 @@ async def get_user_roles(user_uid: str) -> List[str]:
         Lista de roles (ej: ["editor_datos", "gestor_contratos"])
     """
     try:
-        db = get_firestore_client()
-        user_doc = db.collection('users').document(user_uid).get()
+        user_data = await get_permission_cache().get_user_data_async(user_uid)
         
-        if not user_doc.exists:
+        if user_data is None:
             return []
         
-        user_data = user_doc.to_dict()
         return user_data.get('roles', [])
         
     except Exception as e:
@@ -0,0 +1,164 @@
+"""
+Cache de Tokens Verificados
+
+Cache LRU acotado de tokens de Firebase ya verificados, indexado por el
+SHA-256 del token (el token en sí no se guarda como llave).
+
+- Un token en cache se retorna sin volver a verificar la firma.
+- Al llegar a su `exp` el token se verifica de nuevo, de modo que Firebase
+  lanza `ExpiredIdTokenError` igual que sin cache.
+- Cada TOKEN_CACHE['revocation_check_seconds'] se vuelve a verificar con
+  `check_revoked=True`.
+- Los tokens retornados son copias: modificarlos no altera el cache.
+
+Autor: Juan Pablo GM
+Fecha: 23 de Noviembre 2025
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from firebase_admin import auth
+from starlette.concurrency import run_in_threadpool
+
+from .constants import TOKEN_CACHE
+
+
+_DEFAULT = object()
+
+class TokenCache:
+    """
+    Cache LRU de tokens decodificados.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        revocation_check_seconds: Any = _DEFAULT
+    ):
+        """
+        Inicializa el cache.
+
+        Args:
+            max_entries: Máximo de tokens en cache (por defecto TOKEN_CACHE)
+            revocation_check_seconds: Intervalo de verificación de revocación;
+                None la desactiva (por defecto TOKEN_CACHE)
+        """
+        self.max_entries = max_entries or TOKEN_CACHE['max_entries']
+        self.revocation_check_seconds = (
+            TOKEN_CACHE['revocation_check_seconds'] if revocation_check_seconds is _DEFAULT
+            else revocation_check_seconds
+        )
+        self._lock = threading.Lock()
+        # digest -> (token decodificado, exp, instante de la última verificación)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(id_token: str) -> str:
+        return hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+
+    def _lookup(self, digest: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Busca un token en cache.
+
+        Returns:
+            Tupla (token decodificado o None, si requiere check_revoked)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            decoded, expires_at, checked_at = entry
+            if expires_at <= now:
+                del self._entries[digest]
+                self.misses += 1
+                return None, False
+            if (self.revocation_check_seconds is not None
+                    and now - checked_at >= self.revocation_check_seconds):
+                self.misses += 1
+                return None, True
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return decoded, False
+
+    def _verify(self, id_token: str, digest: str, check_revoked: bool) -> Dict[str, Any]:
+        """Verifica el token con Firebase y lo guarda en cache (bloqueante)."""
+        try:
+            decoded = auth.verify_id_token(id_token, check_revoked=check_revoked)
+        except Exception:
+            self.invalidate(id_token)
+            raise
+        with self._lock:
+            self._entries[digest] = (decoded, float(decoded.get('exp', 0)), time.time())
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(decoded)
+
+    def verify(self, id_token: str) -> Dict[str, Any]:
+        """
+        Retorna el token decodificado, verificándolo solo si no está en cache.
+
+        Raises:
+            Las mismas excepciones de `firebase_admin.auth.verify_id_token`
+        """
+        digest = self._digest(id_token)
+        decoded, check_revoked = self._lookup(digest)
+        if decoded is not None:
+            return copy.deepcopy(decoded)
+        return self._verify(id_token, digest, check_revoked)
+
+    async def verify_async(self, id_token: str) -> Dict[str, Any]:
+        """Versión asíncrona de `verify` (la verificación corre en el threadpool)."""
+        digest = self._digest(id_token)
+        decoded, check_revoked = self._lookup(digest)
+        if decoded is not None:
+            return copy.deepcopy(decoded)
+        return await run_in_threadpool(self._verify, id_token, digest, check_revoked)
+
+    def invalidate(self, id_token: str):
+        """Elimina un token del cache."""
+        with self._lock:
+            self._entries.pop(self._digest(id_token), None)
+
+    def clear(self):
+        """Vacía el cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estadísticas del cache."""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_token_cache: Optional[TokenCache] = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    """Retorna la instancia compartida del cache de tokens."""
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache()
+    return _token_cache
+
+
+def build_user_context(decoded_token: Dict[str, Any]) -> Dict[str, Any]:
+    """Construye el diccionario `current_user` a partir del token decodificado."""
+    return {
+        'uid': decoded_token['uid'],
+        'email': decoded_token.get('email'),
+        'email_verified': decoded_token.get('email_verified', False),
+        'token': decoded_token
+    }
@@ -6,7 +6,6 @@ Usa módulos específicos para cada etapa del pipeline
 
 import functions_framework
 from flask import jsonify
-import os
 import sys
 import json
 import tempfile
@@ -17,13 +16,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 
-# Agregar paths para importar módulos del proyecto
-# En Cloud Functions, los módulos están en el mismo directorio
-sys.path.insert(0, os.path.dirname(__file__))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'transformation_app'))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'load_app'))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'extraction_app'))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'utils'))
+# Imports pesados, clientes y basemaps se cargan por etapa y se reutilizan en
+# instancias tibias; runtime configura sys.path en la primera etapa
+import runtime
 
 
 @functions_framework.http
@@ -42,6 +37,7 @@ def etl_pipeline_hourly(request):
     Returns:
         JSON con resultados de la operación completa
     """
+    invocacion = runtime.iniciar_invocacion()
     result = {
         'success': False,
         'timestamp': datetime.now().isoformat(),
@@ -54,6 +50,10 @@ def etl_pipeline_hourly(request):
         'errors': []
     }
     
+    def responder(status: int):
+        result['runtime'] = invocacion.reporte()
+        return jsonify(result), status
+    
     try:
         print("="*80)
         print("🚀 INICIANDO PIPELINE ETL SERVERLESS COMPLETO")
@@ -66,12 +66,11 @@ def etl_pipeline_hourly(request):
         print("="*80)
         
         try:
-            # Importar función de transformación (incluye extracción integrada)
-            from transformation_app.data_transformation_unidades_proyecto import transform_and_save_unidades_proyecto
-            
             # Ejecutar transformación (incluye extracción desde Google Drive)
+            # El módulo, los basemaps y el cliente S3 se cargan en la primera invocación de la instancia
             print("\n🔄 Ejecutando extracción y transformación...")
-            gdf_result = transform_and_save_unidades_proyecto()
+            with invocacion.etapa('transformation'):
+                gdf_result = runtime.transformar()
             
             if gdf_result is not None and len(gdf_result) > 0:
                 result['pipeline_stages']['extraction']['success'] = True
@@ -82,14 +81,14 @@ def etl_pipeline_hourly(request):
                 print(f"\n✅ Transformación completada: {len(gdf_result)} registros")
             else:
                 result['errors'].append("Transformación no produjo datos válidos")
-                return jsonify(result), 500
+                return responder(500)
                 
         except Exception as e:
             print(f"\n❌ Error en extracción/transformación: {e}")
             import traceback
             traceback.print_exc()
             result['errors'].append(f"Extraction/Transformation error: {str(e)}")
-            return jsonify(result), 500
+            return responder(500)
         
         # ========== ETAPA 3: CARGA A FIREBASE ==========
         print("\n" + "="*80)
@@ -97,8 +96,8 @@ def etl_pipeline_hourly(request):
         print("="*80)
         
         try:
-            # Importar función de carga específica
-            from load_app.data_loading_unidades_proyecto import load_unidades_proyecto_to_firebase
+            # Módulo de carga (reutilizado en instancias tibias)
+            carga = runtime.modulo_carga()
             
             # Buscar el archivo GeoJSON generado por transformación
             transformation_output_dir = Path(__file__).parent.parent / 'transformation_app' / 'app_outputs' / 'unidades_proyecto_outputs'
@@ -111,17 +110,20 @@ def etl_pipeline_hourly(request):
             
             if not geojson_file.exists():
                 result['errors'].append(f"Archivo GeoJSON no encontrado en rutas esperadas")
-                return jsonify(result), 500
+                return responder(500)
             
             print(f"\n📂 Usando archivo: {geojson_file}")
             
             # Ejecutar carga a Firebase con actualización selectiva
             print("\n🔥 Cargando a Firebase con actualizaciones selectivas por upid...")
-            load_success = load_unidades_proyecto_to_firebase(
-                input_file=str(geojson_file),
-                collection_name="unidades_proyecto",
-                batch_size=100
-            )
+            with invocacion.etapa('load'):
+                # Cliente Firestore compartido por la instancia
+                runtime.cliente_firestore()
+                load_success = carga.load_unidades_proyecto_to_firebase(
+                    input_file=str(geojson_file),
+                    collection_name="unidades_proyecto",
+                    batch_size=100
+                )
             
             if load_success:
                 result['pipeline_stages']['load']['success'] = True
@@ -130,14 +132,14 @@ def etl_pipeline_hourly(request):
                 print("\n✅ Carga a Firebase completada exitosamente")
             else:
                 result['errors'].append("Carga a Firebase falló")
-                return jsonify(result), 500
+                return responder(500)
                 
         except Exception as e:
             print(f"\n❌ Error en carga a Firebase: {e}")
             import traceback
             traceback.print_exc()
             result['errors'].append(f"Firebase load error: {str(e)}")
-            return jsonify(result), 500
+            return responder(500)
         
         # ========== RESUMEN FINAL ==========
         print("\n" + "="*80)
@@ -150,7 +152,7 @@ def etl_pipeline_hourly(request):
         print("🎉 PIPELINE ETL COMPLETADO EXITOSAMENTE")
         print("="*80)
         
-        return jsonify(result), 200
+        return responder(200)
         
     except Exception as e:
         print(f"\n❌ Error general en pipeline: {e}")
@@ -158,7 +160,7 @@ def etl_pipeline_hourly(request):
         traceback.print_exc()
         
         result['errors'].append(str(e))
-        return jsonify(result), 500
+        return responder(500)
 
 
 @functions_framework.http
@@ -1,26 +1,38 @@
 import functions_framework
-from google.cloud import firestore
 from datetime import datetime
 import json
 import os
 
-# Initialize Firestore
+# Firestore client, created on first use and reused by warm instances.
+# main.py imports this module, so creating it at import time would add to the
+# cold start of every function deployed from main.py.
 # Note: In Cloud Functions, default credentials are usually sufficient.
-try:
-    db = firestore.Client()
-except Exception as e:
-    print(f"Warning: Could not initialize Firestore Client: {e}")
-    db = None
+db = None
+
+def get_db():
+    """Return the shared Firestore client, creating it on first use."""
+    global db
+    if db is None:
+        try:
+            from google.cloud import firestore
+            db = firestore.Client()
+        except Exception as e:
+            print(f"Warning: Could not initialize Firestore Client: {e}")
+            return None
+    return db
 
 def create_notification(notification_data):
     """
     Helper function to write a notification to the 'notifications' collection.
     """
+    db = get_db()
     if not db:
         print("Firestore client not initialized. Cannot send notification.")
         return
 
     try:
+        from google.cloud import firestore
+
         # Add basic metadata
         notification_data['createdAt'] = firestore.SERVER_TIMESTAMP
         notification_data['read'] = False
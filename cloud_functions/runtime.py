@@ -0,0 +1,208 @@
+"""
+Runtime del Pipeline ETL para Cloud Functions
+Reduce el arranque en frío de etl_pipeline_hourly y reutiliza estado en instancias tibias:
+- Los módulos pesados (transformación con geopandas/sklearn/rapidfuzz, carga con
+  Firebase) se importan al iniciar la etapa que los usa, no al importar main.py
+- Los clientes inicializados (Firestore, S3) y los basemaps cargados se guardan
+  en el ámbito global del proceso; las invocaciones siguientes en la misma
+  instancia los reutilizan
+- sys.path se configura una sola vez, en la primera etapa
+- Cada invocación reporta cuánto tardó en importar e inicializar lo que no
+  encontró en memoria y qué reutilizó
+
+Uso (main.py):
+    invocacion = runtime.iniciar_invocacion()
+    with invocacion.etapa('transformation'):
+        gdf = runtime.transformar()
+    ...
+    result['runtime'] = invocacion.reporte()
+"""
+
+import importlib
+import inspect
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+# En Cloud Functions los módulos del proyecto se copian junto a main.py (prepare_deployment.py)
+RUTAS_MODULOS = ['utils', 'extraction_app', 'load_app', 'transformation_app']
+
+MODULO_TRANSFORMACION = 'transformation_app.data_transformation_unidades_proyecto'
+MODULO_CARGA = 'load_app.data_loading_unidades_proyecto'
+MODULO_CONFIG_FIREBASE = 'database.config'
+MODULO_S3 = 's3_uploader'
+
+BASEMAPS = ('barrios_veredas', 'comunas_corregimientos')
+CREDENCIALES_AWS = 'aws_credentials.json'
+
+# Estado global de la instancia (sobrevive entre invocaciones tibias)
+_INICIO_INSTANCIA = time.perf_counter()
+_INICIO_INSTANCIA_ISO = datetime.now().isoformat()
+_recursos: Dict[str, Any] = {}
+_tiempos_instancia: Dict[str, Dict[str, float]] = {'imports': {}, 'init': {}}
+_invocaciones = 0
+_rutas_configuradas = False
+_invocacion_actual: Optional['Invocacion'] = None
+
+
+class Invocacion:
+    """Tiempos de una invocación: imports, inicializaciones y etapas."""
+
+    def __init__(self, numero: int):
+        self.numero = numero
+        self.inicio = time.perf_counter()
+        self.imports: Dict[str, float] = {}
+        self.init: Dict[str, float] = {}
+        self.etapas: Dict[str, float] = {}
+        self.reutilizados: List[str] = []
+
+    @property
+    def arranque_en_frio(self) -> bool:
+        return self.numero == 1
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        """Mide la duración de una etapa del pipeline."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nombre] = round(time.perf_counter() - inicio, 3)
+
+    def reporte(self) -> Dict[str, Any]:
+        """Resumen para la respuesta JSON de la función."""
+        return {
+            'cold_start': self.arranque_en_frio,
+            'invocation': self.numero,
+            'instance_started_at': _INICIO_INSTANCIA_ISO,
+            'instance_uptime_seconds': round(time.perf_counter() - _INICIO_INSTANCIA, 3),
+            'duration_seconds': round(time.perf_counter() - self.inicio, 3),
+            'import_seconds': dict(self.imports),
+            'init_seconds': dict(self.init),
+            'import_total_seconds': round(sum(self.imports.values()), 3),
+            'init_total_seconds': round(sum(self.init.values()), 3),
+            'stage_seconds': dict(self.etapas),
+            'reused': list(self.reutilizados),
+        }
+
+
+def iniciar_invocacion() -> Invocacion:
+    """Registra el inicio de una invocación y la deja como actual."""
+    global _invocaciones, _invocacion_actual
+    _invocaciones += 1
+    _invocacion_actual = Invocacion(_invocaciones)
+    estado = "ARRANQUE EN FRÍO" if _invocacion_actual.arranque_en_frio else "INSTANCIA TIBIA"
+    print(f"🧊 Runtime: invocación #{_invocaciones} ({estado}), recursos en memoria: {len(_recursos)}")
+    return _invocacion_actual
+
+
+def configurar_rutas():
+    """Agrega los directorios del paquete a sys.path (una sola vez por instancia)."""
+    global _rutas_configuradas
+    if _rutas_configuradas:
+        return
+    for ruta in [RAIZ] + [os.path.join(RAIZ, nombre) for nombre in RUTAS_MODULOS]:
+        if ruta not in sys.path:
+            sys.path.insert(0, ruta)
+    _rutas_configuradas = True
+
+
+def _recurso(nombre: str, tipo: str, fabrica: Callable[[], Any]) -> Any:
+    """
+    Retorna el recurso `nombre`, creándolo con `fabrica` si la instancia aún
+    no lo tiene. Los fallos no se guardan: la siguiente invocación reintenta.
+    """
+    invocacion = _invocacion_actual
+    if nombre in _recursos:
+        if invocacion is not None and nombre not in invocacion.reutilizados:
+            invocacion.reutilizados.append(nombre)
+        return _recursos[nombre]
+
+    inicio = time.perf_counter()
+    valor = fabrica()
+    duracion = round(time.perf_counter() - inicio, 3)
+
+    _recursos[nombre] = valor
+    _tiempos_instancia[tipo][nombre] = duracion
+    if invocacion is not None:
+        getattr(invocacion, tipo)[nombre] = duracion
+    print(f"   ⏱️ {'Import' if tipo == 'imports' else 'Inicialización'} {nombre}: {duracion:.2f}s")
+    return valor
+
+
+def importar(modulo: str):
+    """Importa `modulo` midiendo el tiempo del primer import de la instancia."""
+    def fabrica():
+        configurar_rutas()
+        return importlib.import_module(modulo)
+    return _recurso(modulo, 'imports', fabrica)
+
+
+# ========== ETAPAS ==========
+
+def modulo_transformacion():
+    """Módulo de transformación de unidades de proyecto (geopandas, sklearn, rapidfuzz)."""
+    return importar(MODULO_TRANSFORMACION)
+
+
+def basemaps() -> Dict[str, Any]:
+    """Basemaps de las intersecciones espaciales, cargados una vez por instancia."""
+    cargar = getattr(modulo_transformacion(), 'load_basemap', None)
+    if cargar is None:
+        # Paquete desplegado sin el cache de basemaps: la transformación los lee por su cuenta
+        print("⚠️ El módulo de transformación no expone load_basemap; ejecutar prepare_deployment.py")
+        return {}
+    return {
+        nombre: _recurso(f'basemap:{nombre}', 'init', lambda nombre=nombre: cargar(nombre))
+        for nombre in BASEMAPS
+    }
+
+
+def transformar():
+    """
+    Ejecuta transform_and_save_unidades_proyecto reutilizando el cliente S3
+    de la instancia (la subida se omite si no hay credenciales).
+    """
+    funcion = modulo_transformacion().transform_and_save_unidades_proyecto
+    basemaps()
+    if 's3_uploader' not in inspect.signature(funcion).parameters:
+        return funcion()
+
+    s3_uploader = cliente_s3()
+    return funcion(upload_to_s3=s3_uploader is not None, s3_uploader=s3_uploader)
+
+
+def cliente_s3():
+    """S3Uploader inicializado, o None si no hay credenciales (la subida se omite)."""
+    try:
+        return _recurso('s3', 'init', lambda: importar(MODULO_S3).S3Uploader(CREDENCIALES_AWS))
+    except Exception as e:
+        print(f"⚠️ Cliente S3 no disponible, se omite la subida: {e}")
+        return None
+
+
+def modulo_carga():
+    """Módulo de carga de unidades de proyecto a Firebase."""
+    return importar(MODULO_CARGA)
+
+
+def cliente_firestore():
+    """Cliente de Firestore compartido por la instancia."""
+    return _recurso('firestore', 'init', lambda: importar(MODULO_CONFIG_FIREBASE).get_firestore_client())
+
+
+def estado_instancia() -> Dict[str, Any]:
+    """Tiempos acumulados de la instancia (todas las invocaciones)."""
+    return {
+        'invocations': _invocaciones,
+        'instance_started_at': _INICIO_INSTANCIA_ISO,
+        'resources': sorted(_recursos),
+        'import_seconds': dict(_tiempos_instancia['imports']),
+        'init_seconds': dict(_tiempos_instancia['init']),
+    }
@@ -57,6 +57,8 @@ except ImportError:
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from database.config import get_firestore_client
+from utils import contexto_pdf_index, emprestito_data
+from utils.chart_renderer import ServicioGraficos
 
 # Importar visualizaciones avanzadas
 try:
@@ -74,6 +76,115 @@ plt.rcParams['axes.titlesize'] = 13
 plt.rcParams['axes.labelsize'] = 11
 plt.rcParams['figure.dpi'] = 100
 
+# Estilo aplicado a cada gráfico en los procesos de renderizado
+ESTILO_GRAFICOS = {
+    **sns.axes_style("whitegrid"),
+    **{clave: plt.rcParams[clave] for clave in
+       ('figure.figsize', 'font.size', 'axes.titlesize', 'axes.labelsize', 'figure.dpi')}
+}
+
+
+# ============================================================================
+# GRÁFICOS (funciones de módulo: se renderizan en el pool de ServicioGraficos)
+# ============================================================================
+
+def grafico_evolucion_pagos(pagos_mensuales):
+    """Línea de pagos mensuales"""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    pagos_mensuales.plot(kind='line', marker='o', linewidth=2, markersize=8, ax=ax)
+    ax.set_title('Evolución Mensual de Pagos - Recursos de Empréstito 2025', 
+                fontsize=14, fontweight='bold', pad=20)
+    ax.set_xlabel('Mes', fontsize=12)
+    ax.set_ylabel('Valor Total Pagado (COP)', fontsize=12)
+    ax.grid(True, alpha=0.3)
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x/1e9:.1f}B'))
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
+def grafico_procesos_por_organismo(dist_org_top):
+    """Barras horizontales de procesos por organismo"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    colores = plt.cm.viridis(np.linspace(0.3, 0.9, len(dist_org_top)))
+    bars = ax.barh(range(len(dist_org_top)), dist_org_top.values, color=colores)
+    ax.set_yticks(range(len(dist_org_top)))
+    ax.set_yticklabels([str(x)[:40] for x in dist_org_top.index])
+    ax.set_xlabel('Número de Procesos', fontsize=12)
+    ax.set_title('Top 10 Organismos por Número de Procesos Publicados', 
+                fontsize=14, fontweight='bold', pad=20)
+    ax.grid(True, alpha=0.3, axis='x')
+    
+    # Agregar valores en las barras
+    for i, (bar, value) in enumerate(zip(bars, dist_org_top.values)):
+        ax.text(value + 0.5, bar.get_y() + bar.get_height()/2, 
+               f'{value}', va='center', fontsize=10)
+    
+    plt.tight_layout()
+    return fig
+
+
+def grafico_modalidades(dist_mod):
+    """Gráfico circular de modalidades de contratación"""
+    fig, ax = plt.subplots(figsize=(10, 8))
+    
+    colores = plt.cm.Set3(np.linspace(0, 1, len(dist_mod)))
+    wedges, texts, autotexts = ax.pie(dist_mod.values, labels=dist_mod.index, autopct='%1.1f%%',
+                                        colors=colores, startangle=90, textprops={'fontsize': 10})
+    
+    # Mejorar legibilidad
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+    
+    ax.set_title('Distribución de Procesos por Modalidad de Contratación', 
+                fontsize=14, fontweight='bold', pad=20)
+    
+    plt.tight_layout()
+    return fig
+
+
+def grafico_valores_por_organismo(top_10_valores):
+    """Barras horizontales de valor contratado por organismo"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    colores = plt.cm.plasma(np.linspace(0.2, 0.9, len(top_10_valores)))
+    bars = ax.barh(range(len(top_10_valores)), top_10_valores['Total']/1e9, color=colores)
+    ax.set_yticks(range(len(top_10_valores)))
+    ax.set_yticklabels([str(x)[:40] for x in top_10_valores.index])
+    ax.set_xlabel('Valor Total Contratado (Miles de Millones COP)', fontsize=12)
+    ax.set_title('Top 10 Organismos por Valor Total Contratado', 
+                fontsize=14, fontweight='bold', pad=20)
+    ax.grid(True, alpha=0.3, axis='x')
+    
+    # Agregar valores en las barras
+    for i, (bar, value) in enumerate(zip(bars, top_10_valores['Total']/1e9)):
+        ax.text(value + 0.5, bar.get_y() + bar.get_height()/2, 
+               f'${value:.1f}B', va='center', fontsize=9)
+    
+    plt.tight_layout()
+    return fig
+
+
+def grafico_distribucion_cpi(cpi_validos, cpi_promedio):
+    """Histograma del índice de desempeño de costos"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    
+    ax.hist(cpi_validos, bins=20, color='steelblue', edgecolor='black', alpha=0.7)
+    ax.axvline(1.0, color='red', linestyle='--', linewidth=2, label='CPI = 1.0 (Objetivo)')
+    ax.axvline(cpi_promedio, color='green', linestyle='--', linewidth=2, label=f'Promedio = {cpi_promedio:.2f}')
+    ax.set_xlabel('Índice de Desempeño de Costos (CPI)', fontsize=12)
+    ax.set_ylabel('Número de Contratos', fontsize=12)
+    ax.set_title('Distribución del Índice de Desempeño de Costos (CPI)', 
+                fontsize=14, fontweight='bold', pad=20)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    return fig
+
+
 class InformeEmprestitoCompleto:
     """
     Generador de informe técnico, financiero y jurídico exhaustivo
@@ -90,11 +201,13 @@ class InformeEmprestitoCompleto:
         self.datos = self.inicializar_datos_vacios()
         self.document = Document()
         self.imagenes_temp = []
+        self.graficos = ServicioGraficos(estilo=ESTILO_GRAFICOS)
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.conteo_graficos = 0
         self.conteo_tablas = 0
         self.contexto_pdfs = {}
         self.documentos_contexto = []
+        self.directorios_contexto = ['emprestito_context']
         self.output_dir = 'informes_emprestito'
         
         # Crear directorio de salida
@@ -199,86 +312,59 @@ class InformeEmprestitoCompleto:
             return ""
         
         try:
-            doc = fitz.open(ruta_pdf)
-            texto_completo = []
-            
-            for pagina_num in range(len(doc)):
-                pagina = doc[pagina_num]
-                texto = pagina.get_text()
-                texto_completo.append(texto)
-            
-            doc.close()
-            return "\n".join(texto_completo)
+            return contexto_pdf_index.extraer_texto_pdf(ruta_pdf)
         except Exception as e:
             print(f"Error extrayendo texto de {ruta_pdf}: {str(e)}")
             return ""
     
     def procesar_pdfs_contexto(self):
-        """Procesar todos los PDFs en emprestito_context"""
+        """
+        Procesar todos los PDFs de contexto.
+        
+        Texto, tipo y palabras clave se sirven desde el índice en cache
+        (utils/contexto_pdf_index.py); solo los PDFs nuevos o modificados
+        se extraen, en paralelo.
+        """
         print("\n" + "="*100)
-        print("PROCESANDO DOCUMENTOS DE CONTEXTO (OCR)")
+        print("PROCESANDO DOCUMENTOS DE CONTEXTO")
         print("="*100 + "\n")
         
-        directorio_contexto = 'emprestito_context'
-        if not os.path.exists(directorio_contexto):
-            print(f"Advertencia: Directorio {directorio_contexto} no existe")
-            return
-        
-        archivos_pdf = [f for f in os.listdir(directorio_contexto) if f.endswith('.pdf')]
+        indice = contexto_pdf_index.ContextoPDFIndex()
+        entradas = indice.indexar_directorios(self.directorios_contexto)
         
-        for archivo in archivos_pdf:
-            ruta_completa = os.path.join(directorio_contexto, archivo)
-            print(f"Procesando: {archivo}")
-            
-            texto_extraido = self.extraer_texto_pdf(ruta_completa)
-            
-            if texto_extraido:
-                # Analizar el contenido del documento
-                self.contexto_pdfs[archivo] = {
-                    'texto': texto_extraido,
-                    'tipo': self.clasificar_documento(archivo, texto_extraido),
-                    'palabras_clave': self.extraer_palabras_clave(texto_extraido)
-                }
-                print(f"  ✓ Extraídas {len(texto_extraido)} caracteres")
-                print(f"  Tipo: {self.contexto_pdfs[archivo]['tipo']}")
-            else:
-                print(f"  ✗ No se pudo extraer texto")
-        
-        print(f"\nTotal documentos procesados: {len(self.contexto_pdfs)}")
+        for archivo, entrada in entradas.items():
+            self.contexto_pdfs[archivo] = {
+                'texto': entrada['texto'],
+                'tipo': entrada['tipo'],
+                'palabras_clave': entrada['palabras_clave']
+            }
+            self.documentos_contexto.append({
+                'nombre': archivo,
+                'ruta': entrada['ruta'],
+                'tamano_mb': entrada['tamano_mb'],
+                'tipo': entrada['tipo']
+            })
+            print(f"  ✓ {archivo} ({entrada['tamano_mb']:.2f} MB, {entrada['paginas']} páginas)")
+            print(f"    Tipo: {entrada['tipo']} | {len(entrada['texto'])} caracteres")
+        
+        estadisticas = indice.stats()
+        print(f"\nTotal documentos procesados: {len(self.contexto_pdfs)} "
+              f"(cache: {estadisticas['hits']}, extraídos: {estadisticas['misses']})")
         print("="*100 + "\n")
+        
+        return self.documentos_contexto
     
     def clasificar_documento(self, nombre_archivo, texto):
         """Clasificar tipo de documento basado en contenido"""
-        nombre_lower = nombre_archivo.lower()
-        texto_lower = texto.lower()
-        
-        if 'acuerdo' in nombre_lower or 'acuerdo' in texto_lower:
-            return 'Acuerdo del Concejo'
-        elif 'decreto' in nombre_lower or 'decreto' in texto_lower:
-            return 'Decreto Municipal'
-        elif 'solicitud' in nombre_lower:
-            return 'Solicitud Administrativa'
-        elif 'informe' in nombre_lower:
-            return 'Informe Técnico'
-        else:
-            return 'Documento de Soporte'
+        return contexto_pdf_index.clasificar_documento(nombre_archivo, texto)
     
     def extraer_palabras_clave(self, texto):
         """Extraer palabras clave del documento"""
-        palabras_relevantes = [
-            'empréstito', 'crédito', 'endeudamiento', 'capacidad de pago',
-            'inversión', 'infraestructura', 'concejo', 'autorización',
-            'desembolso', 'garantía', 'amortización', 'plazo'
-        ]
-        
-        texto_lower = texto.lower()
-        encontradas = [palabra for palabra in palabras_relevantes if palabra in texto_lower]
-        
-        return encontradas
+        return contexto_pdf_index.extraer_palabras_clave(texto)
     
     def descargar_datos_firebase(self):
-        """Descargar todas las colecciones de Firebase"""
-        if self.db is None:
+        """Descargar todas las colecciones de Firebase (en paralelo, o desde snapshot)"""
+        if self.db is None and emprestito_data.snapshot_configurado() is None:
             print("\n⚠ Firebase no está configurado. Usando datos por defecto.\n")
             self.generar_datos_ejemplo()
             return
@@ -287,39 +373,25 @@ class InformeEmprestitoCompleto:
         print("DESCARGANDO DATOS DE FIREBASE")
         print("="*100 + "\n")
         
-        colecciones = {
-            'procesos_emprestito': 'Procesos Contractuales Publicados',
-            'contratos_emprestito': 'Contratos Adjudicados',
-            'ordenes_compra_emprestito': 'Órdenes de Compra',
-            'convenios_transferencias_emprestito': 'Convenios y Transferencias',
-            'montos_emprestito_asignados_centro_gestor': 'Distribución por Centro Gestor',
-            'pagos_emprestito': 'Desembolsos y Pagos',
-            'reportes_contratos': 'Reportes de Avance',
-            'reservas_presupuestales': 'Reservas Presupuestales',
-            'vigencias_futuras': 'Vigencias Futuras'
-        }
+        colecciones = emprestito_data.COLECCIONES_EMPRESTITO
+        resultados, origen = emprestito_data.cargar_datos_emprestito(self.db, colecciones)
+        if origen == 'snapshot':
+            print(f"Usando snapshot local: {emprestito_data.snapshot_configurado()}\n")
         
         total_registros = 0
         for coleccion, descripcion in colecciones.items():
             print(f"Descargando: {descripcion} ({coleccion})")
-            try:
-                docs = self.db.collection(coleccion).stream()
-                registros = []
-                for doc in docs:
-                    data = doc.to_dict()
-                    data['doc_id'] = doc.id
-                    registros.append(data)
-                
-                if registros:
-                    self.datos[coleccion] = pd.DataFrame(registros)
-                    print(f"  ✓ {len(registros)} registros descargados")
-                    total_registros += len(registros)
-                else:
-                    self.datos[coleccion] = pd.DataFrame()
-                    print(f"  - Sin datos")
-            except Exception as e:
-                print(f"  ✗ Error: {str(e)}")
+            resultado = resultados[coleccion]
+            if isinstance(resultado, Exception):
+                print(f"  ✗ Error: {str(resultado)}")
+                self.datos[coleccion] = pd.DataFrame()
+            elif not resultado.empty:
+                self.datos[coleccion] = resultado
+                print(f"  ✓ {len(resultado)} registros descargados")
+                total_registros += len(resultado)
+            else:
                 self.datos[coleccion] = pd.DataFrame()
+                print(f"  - Sin datos")
         
         # Asegurar que montos_emprestito exista (alias)
         if 'montos_emprestito' not in self.datos:
@@ -416,16 +488,17 @@ class InformeEmprestitoCompleto:
             p_desc.paragraph_format.space_after = Pt(12)
             p_desc.alignment = WD_ALIGN_PARAGRAPH.LEFT
     
-    def guardar_grafico_temp(self, fig, nombre):
-        """Guardar gráfico temporal y retornar ruta"""
-        ruta = os.path.join(self.output_dir, f'grafico_{self.conteo_graficos}_{nombre}_{self.timestamp}.png')
-        fig.savefig(ruta, dpi=300, bbox_inches='tight', facecolor='white')
-        self.imagenes_temp.append(ruta)
-        plt.close(fig)
-        return ruta
+    def solicitar_grafico(self, funcion, **datos):
+        """Solicitar el renderizado de un gráfico y retornar su clave"""
+        return self.graficos.solicitar(funcion, **datos)
     
-    def agregar_grafico(self, ruta_imagen, titulo="", descripcion="", ancho=6):
-        """Agregar gráfico al documento con descripción"""
+    def agregar_grafico(self, grafico, titulo="", descripcion="", ancho=6):
+        """
+        Agregar gráfico al documento con descripción.
+        
+        `grafico` es la clave de `solicitar_grafico` (la imagen se inserta al
+        completar el servicio de gráficos) o la ruta de una imagen existente.
+        """
         self.conteo_graficos += 1
         
         if titulo:
@@ -435,9 +508,12 @@ class InformeEmprestitoCompleto:
             run_titulo.font.size = Pt(11)
             p_titulo.alignment = WD_ALIGN_PARAGRAPH.CENTER
         
-        self.document.add_picture(ruta_imagen, width=Inches(ancho))
-        last_paragraph = self.document.paragraphs[-1]
-        last_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        if os.path.isfile(grafico):
+            self.document.add_picture(grafico, width=Inches(ancho))
+            last_paragraph = self.document.paragraphs[-1]
+            last_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        else:
+            self.graficos.insertar(self.document, grafico, ancho)
         
         if descripcion:
             p_desc = self.document.add_paragraph()
@@ -1060,20 +1136,9 @@ class InformeEmprestitoCompleto:
                             
                             pagos_mensuales = df_pagos_temporal.groupby('mes')['valor_pago'].sum()
                             
-                            fig, ax = plt.subplots(figsize=(12, 6))
-                            pagos_mensuales.plot(kind='line', marker='o', linewidth=2, markersize=8, ax=ax)
-                            ax.set_title('Evolución Mensual de Pagos - Recursos de Empréstito 2025', 
-                                        fontsize=14, fontweight='bold', pad=20)
-                            ax.set_xlabel('Mes', fontsize=12)
-                            ax.set_ylabel('Valor Total Pagado (COP)', fontsize=12)
-                            ax.grid(True, alpha=0.3)
-                            ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x/1e9:.1f}B'))
-                            plt.xticks(rotation=45, ha='right')
-                            plt.tight_layout()
-                            
-                            ruta_grafico = self.guardar_grafico_temp(fig, 'evolucion_pagos')
+                            grafico = self.solicitar_grafico(grafico_evolucion_pagos, pagos_mensuales=pagos_mensuales)
                             self.agregar_grafico(
-                                ruta_grafico,
+                                grafico,
                                 'Evolución Mensual de Pagos - Recursos de Empréstito 2025',
                                 'El gráfico muestra la tendencia de ejecución de pagos a lo largo del año, '
                                 'permitiendo identificar patrones de concentración temporal y ritmo de ejecución. '
@@ -1240,28 +1305,9 @@ class InformeEmprestitoCompleto:
                 self.document.add_paragraph()
                 
                 # Gráfico de barras
-                fig, ax = plt.subplots(figsize=(12, 8))
-                dist_org_top = dist_org.head(10)
-                
-                colores = plt.cm.viridis(np.linspace(0.3, 0.9, len(dist_org_top)))
-                bars = ax.barh(range(len(dist_org_top)), dist_org_top.values, color=colores)
-                ax.set_yticks(range(len(dist_org_top)))
-                ax.set_yticklabels([str(x)[:40] for x in dist_org_top.index])
-                ax.set_xlabel('Número de Procesos', fontsize=12)
-                ax.set_title('Top 10 Organismos por Número de Procesos Publicados', 
-                            fontsize=14, fontweight='bold', pad=20)
-                ax.grid(True, alpha=0.3, axis='x')
-                
-                # Agregar valores en las barras
-                for i, (bar, value) in enumerate(zip(bars, dist_org_top.values)):
-                    ax.text(value + 0.5, bar.get_y() + bar.get_height()/2, 
-                           f'{value}', va='center', fontsize=10)
-                
-                plt.tight_layout()
-                
-                ruta_grafico = self.guardar_grafico_temp(fig, 'procesos_por_organismo')
+                grafico = self.solicitar_grafico(grafico_procesos_por_organismo, dist_org_top=dist_org.head(10))
                 self.agregar_grafico(
-                    ruta_grafico,
+                    grafico,
                     'Distribución de Procesos Contractuales por Organismo',
                     f'El gráfico muestra que {dist_org.index[0]} lidera con {dist_org.iloc[0]} procesos, '
                     f'representando el {(dist_org.iloc[0]/len(df_procesos)*100):.1f}% del total. '
@@ -1313,25 +1359,9 @@ class InformeEmprestitoCompleto:
                 self.document.add_paragraph()
                 
                 # Gráfico circular de modalidades
-                fig, ax = plt.subplots(figsize=(10, 8))
-                
-                colores = plt.cm.Set3(np.linspace(0, 1, len(dist_mod)))
-                wedges, texts, autotexts = ax.pie(dist_mod.values, labels=dist_mod.index, autopct='%1.1f%%',
-                                                    colors=colores, startangle=90, textprops={'fontsize': 10})
-                
-                # Mejorar legibilidad
-                for autotext in autotexts:
-                    autotext.set_color('white')
-                    autotext.set_fontweight('bold')
-                
-                ax.set_title('Distribución de Procesos por Modalidad de Contratación', 
-                            fontsize=14, fontweight='bold', pad=20)
-                
-                plt.tight_layout()
-                
-                ruta_grafico = self.guardar_grafico_temp(fig, 'modalidades_contratacion')
+                grafico = self.solicitar_grafico(grafico_modalidades, dist_mod=dist_mod)
                 self.agregar_grafico(
-                    ruta_grafico,
+                    grafico,
                     'Modalidades de Contratación Utilizadas',
                     'La distribución de modalidades refleja la naturaleza y complejidad de los proyectos ejecutados. '
                     'Las licitaciones públicas predominan para obras de infraestructura de gran envergadura, mientras que '
@@ -1452,28 +1482,11 @@ class InformeEmprestitoCompleto:
                     self.document.add_paragraph()
                     
                     # Gráfico de valores por organismo
-                    fig, ax = plt.subplots(figsize=(12, 8))
                     top_10_valores = contratos_por_org.head(10)
                     
-                    colores = plt.cm.plasma(np.linspace(0.2, 0.9, len(top_10_valores)))
-                    bars = ax.barh(range(len(top_10_valores)), top_10_valores['Total']/1e9, color=colores)
-                    ax.set_yticks(range(len(top_10_valores)))
-                    ax.set_yticklabels([str(x)[:40] for x in top_10_valores.index])
-                    ax.set_xlabel('Valor Total Contratado (Miles de Millones COP)', fontsize=12)
-                    ax.set_title('Top 10 Organismos por Valor Total Contratado', 
-                                fontsize=14, fontweight='bold', pad=20)
-                    ax.grid(True, alpha=0.3, axis='x')
-                    
-                    # Agregar valores en las barras
-                    for i, (bar, value) in enumerate(zip(bars, top_10_valores['Total']/1e9)):
-                        ax.text(value + 0.5, bar.get_y() + bar.get_height()/2, 
-                               f'${value:.1f}B', va='center', fontsize=9)
-                    
-                    plt.tight_layout()
-                    
-                    ruta_grafico = self.guardar_grafico_temp(fig, 'valores_por_organismo')
+                    grafico = self.solicitar_grafico(grafico_valores_por_organismo, top_10_valores=top_10_valores)
                     self.agregar_grafico(
-                        ruta_grafico,
+                        grafico,
                         'Valor Total Contratado por Organismo Ejecutor',
                         f'El organismo con mayor valor contratado es {top_10_valores.index[0]}, con un total de '
                         f'${top_10_valores.iloc[0]["Total"]:,.0f}, representando el '
@@ -1581,25 +1594,13 @@ class InformeEmprestitoCompleto:
                         p4.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
                         
                         # Gráfico de distribución de CPI
-                        fig, ax = plt.subplots(figsize=(10, 6))
-                        
-                        # Histograma
                         cpi_validos = df_reportes_clean['cpi_aproximado'].clip(lower=0, upper=2)
-                        ax.hist(cpi_validos, bins=20, color='steelblue', edgecolor='black', alpha=0.7)
-                        ax.axvline(1.0, color='red', linestyle='--', linewidth=2, label='CPI = 1.0 (Objetivo)')
-                        ax.axvline(cpi_promedio, color='green', linestyle='--', linewidth=2, label=f'Promedio = {cpi_promedio:.2f}')
-                        ax.set_xlabel('Índice de Desempeño de Costos (CPI)', fontsize=12)
-                        ax.set_ylabel('Número de Contratos', fontsize=12)
-                        ax.set_title('Distribución del Índice de Desempeño de Costos (CPI)', 
-                                    fontsize=14, fontweight='bold', pad=20)
-                        ax.legend()
-                        ax.grid(True, alpha=0.3)
-                        
-                        plt.tight_layout()
                         
-                        ruta_grafico = self.guardar_grafico_temp(fig, 'distribucion_cpi')
+                        grafico = self.solicitar_grafico(
+                            grafico_distribucion_cpi, cpi_validos=cpi_validos, cpi_promedio=cpi_promedio
+                        )
                         self.agregar_grafico(
-                            ruta_grafico,
+                            grafico,
                             'Distribución del Índice de Desempeño de Costos (CPI)',
                             'La distribución muestra la variabilidad del desempeño de costos entre los diferentes contratos. '
                             'Los contratos con CPI superior a 1.0 demuestran eficiencia en el uso de recursos, mientras que '
@@ -1894,6 +1895,7 @@ class InformeEmprestitoCompleto:
         """Guardar documento y retornar nombre de archivo"""
         nombre_archivo = f'Informe_Emprestito_Completo_{self.timestamp}.docx'
         ruta_salida = os.path.join(self.output_dir, nombre_archivo)
+        self.graficos.completar()
         self.document.save(ruta_salida)
         return nombre_archivo
     
@@ -1906,58 +1908,6 @@ class InformeEmprestitoCompleto:
             except Exception as e:
                 print(f"⚠ No se pudo eliminar {imagen}: {e}")
     
-    def procesar_pdfs_contexto(self):
-        """Procesar PDFs de contexto y extraer información relevante"""
-        directorio_contexto = 'emprestito_context'
-        documentos_contexto = []
-        
-        if not os.path.exists(directorio_contexto):
-            print(f"ℹ No se encontró directorio de contexto: {directorio_contexto}")
-            return documentos_contexto
-        
-        print(f"\n📂 Procesando documentos de contexto desde: {directorio_contexto}")
-        
-        # Listar archivos PDF
-        archivos_pdf = [f for f in os.listdir(directorio_contexto) if f.lower().endswith('.pdf')]
-        
-        if not archivos_pdf:
-            print("   ⚠ No se encontraron archivos PDF en el directorio")
-            return documentos_contexto
-        
-        print(f"   📄 Encontrados {len(archivos_pdf)} documentos PDF:")
-        
-        for pdf_file in archivos_pdf:
-            ruta_completa = os.path.join(directorio_contexto, pdf_file)
-            tamano_mb = os.path.getsize(ruta_completa) / (1024 * 1024)
-            
-            doc_info = {
-                'nombre': pdf_file,
-                'ruta': ruta_completa,
-                'tamano_mb': round(tamano_mb, 2)
-            }
-            
-            # Identificar tipo de documento por nombre
-            nombre_lower = pdf_file.lower()
-            if 'acuerdo' in nombre_lower:
-                doc_info['tipo'] = 'Acuerdo Municipal'
-            elif 'decreto' in nombre_lower:
-                doc_info['tipo'] = 'Decreto'
-            elif 'solicitud' in nombre_lower:
-                doc_info['tipo'] = 'Solicitud'
-            elif 'informe' in nombre_lower:
-                doc_info['tipo'] = 'Informe'
-            else:
-                doc_info['tipo'] = 'Documento Técnico'
-            
-            documentos_contexto.append(doc_info)
-            print(f"      ✓ {pdf_file} ({tamano_mb:.2f} MB) - {doc_info['tipo']}")
-        
-        # Almacenar información de documentos para uso posterior
-        self.documentos_contexto = documentos_contexto
-        print(f"\n   ✅ {len(documentos_contexto)} documentos de contexto catalogados")
-        
-        return documentos_contexto
-    
     def generar_informe_completo(self):
         """Generar informe completo de 100+ páginas"""
         print("\n" + "="*100)
@@ -2005,6 +1955,12 @@ class InformeEmprestitoCompleto:
         print("Generando anexos...")
         self.agregar_anexos()
         
+        # Insertar gráficos renderizados en paralelo
+        print("Insertando gráficos...")
+        self.graficos.completar()
+        estadisticas = self.graficos.stats()
+        print(f"  Gráficos desde cache: {estadisticas['hits']}, renderizados: {estadisticas['misses']}")
+        
         # Guardar documento
         nombre_archivo = f'Informe_Tecnico_Emprestito_Completo_{self.timestamp}.docx'
         ruta_salida = os.path.join(self.output_dir, nombre_archivo)
@@ -26,6 +26,7 @@ warnings.filterwarnings('ignore')
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from database.config import get_firestore_client
+from utils import emprestito_data
 
 # Configuración profesional de gráficos
 sns.set_style("whitegrid")
@@ -39,7 +40,12 @@ class InformeEmprestitoTecnico:
     """Generador de informe técnico exhaustivo sobre gestión de empréstito"""
     
     def __init__(self):
-        self.db = get_firestore_client()
+        try:
+            self.db = get_firestore_client()
+        except Exception as e:
+            # Sin Firebase solo es posible generar el informe desde un snapshot local
+            print(f"⚠ Advertencia: No se pudo conectar a Firebase: {e}")
+            self.db = None
         self.datos = {}
         self.document = Document()
         self.imagenes_temp = []
@@ -77,39 +83,25 @@ class InformeEmprestitoTecnico:
         print("Alcaldía de Santiago de Cali")
         print("="*100 + "\n")
         
-        colecciones = {
-            'procesos_emprestito': 'Procesos Contractuales Publicados',
-            'contratos_emprestito': 'Contratos Adjudicados',
-            'ordenes_compra_emprestito': 'Órdenes de Compra',
-            'convenios_transferencias_emprestito': 'Convenios y Transferencias',
-            'montos_emprestito_asignados_centro_gestor': 'Distribución por Centro Gestor',
-            'pagos_emprestito': 'Desembolsos y Pagos',
-            'reportes_contratos': 'Reportes de Avance',
-            'reservas_presupuestales': 'Reservas Presupuestales',
-            'vigencias_futuras': 'Vigencias Futuras'
-        }
+        colecciones = emprestito_data.COLECCIONES_EMPRESTITO
+        resultados, origen = emprestito_data.cargar_datos_emprestito(self.db, colecciones)
+        if origen == 'snapshot':
+            print(f"Usando snapshot local: {emprestito_data.snapshot_configurado()}\n")
         
         total_registros = 0
         for coleccion, descripcion in colecciones.items():
             print(f"Descargando: {descripcion} ({coleccion})")
-            try:
-                docs = self.db.collection(coleccion).stream()
-                registros = []
-                for doc in docs:
-                    data = doc.to_dict()
-                    data['doc_id'] = doc.id
-                    registros.append(data)
-                
-                if registros:
-                    self.datos[coleccion] = pd.DataFrame(registros)
-                    print(f"  ✓ {len(registros)} registros descargados")
-                    total_registros += len(registros)
-                else:
-                    self.datos[coleccion] = pd.DataFrame()
-                    print(f"  - Sin datos")
-            except Exception as e:
-                print(f"  ✗ Error: {str(e)}")
+            resultado = resultados[coleccion]
+            if isinstance(resultado, Exception):
+                print(f"  ✗ Error: {str(resultado)}")
+                self.datos[coleccion] = pd.DataFrame()
+            elif not resultado.empty:
+                self.datos[coleccion] = resultado
+                print(f"  ✓ {len(resultado)} registros descargados")
+                total_registros += len(resultado)
+            else:
                 self.datos[coleccion] = pd.DataFrame()
+                print(f"  - Sin datos")
         
         print(f"\n{'='*100}")
         print(f"Total de registros descargados: {total_registros:,}")
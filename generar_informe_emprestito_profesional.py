@@ -31,6 +31,7 @@ warnings.filterwarnings('ignore')
 # Importar utilidades de Firebase
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from database.config import get_firestore_client
+from utils import emprestito_data
 
 # Configuración de estilo para gráficos
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -132,42 +133,31 @@ class InformeEmprestitoProfesional:
         print("DESCARGA DE DATOS DE FIREBASE - GESTIÓN DE EMPRÉSTITO")
         print("="*100 + "\n")
         
-        if not self.db:
+        if not self.db and emprestito_data.snapshot_configurado() is None:
             print("[ERROR] No hay conexión a Firebase")
             self.generar_datos_ejemplo()
             return
         
-        colecciones = {
-            'procesos_emprestito': 'Procesos Contractuales',
-            'contratos_emprestito': 'Contratos Adjudicados',
-            'ordenes_compra_emprestito': 'Órdenes de Compra',
-            'convenios_transferencias_emprestito': 'Convenios y Transferencias',
-            'montos_emprestito_asignados_centro_gestor': 'Distribución por Centro Gestor',
-            'pagos_emprestito': 'Desembolsos y Pagos',
-            'reportes_contratos': 'Reportes de Avance',
-            'reservas_presupuestales': 'Reservas Presupuestales',
-            'vigencias_futuras': 'Vigencias Futuras'
-        }
+        colecciones = emprestito_data.COLECCIONES_EMPRESTITO
+        resultados, origen = emprestito_data.cargar_datos_emprestito(self.db, colecciones)
+        if origen == 'snapshot':
+            print(f"[INFO] Usando snapshot local: {emprestito_data.snapshot_configurado()}\n")
         
         total_registros = 0
         
         for coleccion, descripcion in colecciones.items():
-            try:
-                print(f"Descargando: {descripcion} ({coleccion})")
-                docs = list(self.db.collection(coleccion).stream())
-                
-                if docs:
-                    datos_lista = [doc.to_dict() for doc in docs]
-                    self.datos[coleccion] = pd.DataFrame(datos_lista)
-                    print(f"  [OK] {len(datos_lista)} registros descargados")
-                    total_registros += len(datos_lista)
-                else:
-                    self.datos[coleccion] = pd.DataFrame()
-                    print(f"  [INFO] Sin datos")
-                    
-            except Exception as e:
-                print(f"  [ERROR] Error al descargar {coleccion}: {str(e)[:100]}")
+            print(f"Descargando: {descripcion} ({coleccion})")
+            resultado = resultados[coleccion]
+            if isinstance(resultado, Exception):
+                print(f"  [ERROR] Error al descargar {coleccion}: {str(resultado)[:100]}")
+                self.datos[coleccion] = pd.DataFrame()
+            elif not resultado.empty:
+                self.datos[coleccion] = resultado
+                print(f"  [OK] {len(resultado)} registros descargados")
+                total_registros += len(resultado)
+            else:
                 self.datos[coleccion] = pd.DataFrame()
+                print(f"  [INFO] Sin datos")
         
         print(f"\n[OK] Total de registros descargados: {total_registros}")
         print("="*100 + "\n")
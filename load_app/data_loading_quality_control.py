@@ -24,6 +24,34 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.config import get_firestore_client, secure_log
 
 
+class _BatchWriter:
+    """
+    Acumula escrituras en un batch compartido y lo confirma al llegar al límite.
+    """
+    
+    def __init__(self, db, max_writes: int = 500):
+        self.db = db
+        self.max_writes = max_writes
+        self.batch = db.batch()
+        self.pending = 0
+        self.commits = 0
+    
+    def set(self, doc_ref, data: Dict[str, Any]):
+        """Agrega una escritura al batch, confirmándolo si está lleno."""
+        self.batch.set(doc_ref, data)
+        self.pending += 1
+        if self.pending >= self.max_writes:
+            self.commit()
+    
+    def commit(self):
+        """Confirma las escrituras pendientes."""
+        if self.pending:
+            self.batch.commit()
+            self.commits += 1
+            self.batch = self.db.batch()
+            self.pending = 0
+
+
 class QualityControlFirebaseLoader:
     """
     Carga reportes de control de calidad a Firebase Firestore.
@@ -37,12 +65,26 @@ class QualityControlFirebaseLoader:
     COLLECTION_METADATA = "unidades_proyecto_quality_control_metadata"
     COLLECTION_CHANGELOG = "unidades_proyecto_quality_control_changelog"
     
+    # Campos monitoreados para detectar cambios en reportes
+    MONITOR_FIELDS = [
+        'total_issues', 'max_severity', 'priority', 'quality_score',
+        'error_rate', 'requires_immediate_action', 'severity_counts'
+    ]
+    
+    # Proyección de lectura de reportes existentes
+    EXISTING_RECORD_FIELDS = MONITOR_FIELDS + ['report_id']
+    
+    # Documentos por llamada get_all y escrituras por batch (límite Firestore: 500)
+    GET_ALL_CHUNK_SIZE = 300
+    MAX_BATCH_WRITES = 500
+    
     def __init__(self, batch_size: int = 100):
         """
         Inicializa el cargador.
         
         Args:
-            batch_size: Tamaño de lote para operaciones batch
+            batch_size: Tamaño de lote para operaciones batch (en los reportes
+                por registro, escrituras por batch; máximo MAX_BATCH_WRITES)
         """
         self.batch_size = batch_size
         self.db = None
@@ -135,6 +177,11 @@ class QualityControlFirebaseLoader:
         Carga reportes de registros individuales a Firebase con UPSERT inteligente.
         Detecta cambios y registra en changelog.
         
+        Los documentos existentes se leen con `get_all` por lotes (solo los campos
+        monitoreados), se comparan en memoria y los reportes y entradas de
+        changelog se escriben en batches compartidos de `batch_size` operaciones
+        (máximo MAX_BATCH_WRITES = 500).
+        
         Args:
             reports: Lista de reportes por registro
             verbose: Si True, imprime progreso
@@ -146,37 +193,36 @@ class QualityControlFirebaseLoader:
             collection_ref = self.db.collection(self.COLLECTION_RECORDS)
             changelog_ref = self.db.collection(self.COLLECTION_CHANGELOG)
             
-            # Procesar en lotes
             total_processed = 0
             records_created = 0
             records_updated = 0
-            
-            for i in range(0, len(reports), self.batch_size):
-                batch = self.db.batch()
-                batch_reports = reports[i:i + self.batch_size]
+            writer = _BatchWriter(self.db, max(1, min(self.batch_size, self.MAX_BATCH_WRITES)))
+            
+            # Leer documentos existentes por lotes (solo campos monitoreados)
+            for i in range(0, len(reports), self.GET_ALL_CHUNK_SIZE):
+                chunk = reports[i:i + self.GET_ALL_CHUNK_SIZE]
+                doc_refs = [collection_ref.document(report['document_id']) for report in chunk]
+                existing_by_id = {
+                    snapshot.id: snapshot.to_dict() or {}
+                    for snapshot in self.db.get_all(doc_refs, field_paths=self.EXISTING_RECORD_FIELDS)
+                    if snapshot.exists
+                }
                 
-                for report in batch_reports:
+                for report, doc_ref in zip(chunk, doc_refs):
                     doc_id = report['document_id']
-                    doc_ref = collection_ref.document(doc_id)
-                    
-                    # Verificar si existe documento anterior
-                    existing_doc = doc_ref.get()
-                    
-                    # Preparar nuevo documento
                     doc_data = self._prepare_record_document(report)
+                    old_data = existing_by_id.get(doc_id)
                     
-                    if existing_doc.exists:
+                    if old_data is not None:
                         # UPSERT: Actualizar solo si hay cambios
-                        old_data = existing_doc.to_dict()
                         changes = self._detect_changes(old_data, doc_data, ['upid', 'nombre_up'])
                         
                         if changes:
-                            # Hay cambios, actualizar
-                            batch.set(doc_ref, doc_data)
+                            writer.set(doc_ref, doc_data)
                             records_updated += 1
                             
                             # Registrar en changelog
-                            changelog_entry = {
+                            writer.set(changelog_ref.document(), {
                                 'collection': self.COLLECTION_RECORDS,
                                 'document_id': doc_id,
                                 'upid': report.get('upid'),
@@ -185,34 +231,29 @@ class QualityControlFirebaseLoader:
                                 'old_report_id': old_data.get('report_id'),
                                 'new_report_id': report.get('report_id'),
                                 'timestamp': datetime.now().isoformat()
-                            }
-                            changelog_doc_ref = changelog_ref.document()
-                            batch.set(changelog_doc_ref, changelog_entry)
+                            })
                         # Si no hay cambios, no hacer nada (optimización)
                     else:
                         # Documento nuevo, crear
-                        batch.set(doc_ref, doc_data)
+                        writer.set(doc_ref, doc_data)
                         records_created += 1
                         
                         # Registrar en changelog
-                        changelog_entry = {
+                        writer.set(changelog_ref.document(), {
                             'collection': self.COLLECTION_RECORDS,
                             'document_id': doc_id,
                             'upid': report.get('upid'),
                             'action': 'created',
                             'report_id': report.get('report_id'),
                             'timestamp': datetime.now().isoformat()
-                        }
-                        changelog_doc_ref = changelog_ref.document()
-                        batch.set(changelog_doc_ref, changelog_entry)
+                        })
                     
                     total_processed += 1
                 
-                # Commit batch
-                batch.commit()
-                
-                if verbose and (i + self.batch_size) % 500 == 0:
-                    print(f"  Procesados: {min(i + self.batch_size, len(reports))}/{len(reports)}")
+                if verbose:
+                    print(f"  Procesados: {total_processed}/{len(reports)}")
+            
+            writer.commit()
             
             self.load_stats['records_loaded'] = total_processed
             self.load_stats['records_created'] = records_created
@@ -223,6 +264,7 @@ class QualityControlFirebaseLoader:
                 print(f"    • Nuevos: {records_created}")
                 print(f"    • Actualizados: {records_updated}")
                 print(f"    • Sin cambios: {total_processed - records_created - records_updated}")
+                print(f"    • Lecturas get_all: {-(-len(reports) // self.GET_ALL_CHUNK_SIZE)}, commits: {writer.commits}")
             
             return True
             
@@ -487,13 +529,7 @@ class QualityControlFirebaseLoader:
         """
         changes = {}
         
-        # Campos importantes a monitorear
-        monitor_fields = [
-            'total_issues', 'max_severity', 'priority', 'quality_score',
-            'error_rate', 'requires_immediate_action', 'severity_counts'
-        ]
-        
-        for field in monitor_fields:
+        for field in self.MONITOR_FIELDS:
             old_value = old_data.get(field)
             new_value = new_data.get(field)
             
@@ -556,7 +592,8 @@ def load_quality_reports_to_firebase(
         record_reports: Lista de reportes por registro
         centro_reports: Lista de reportes por centro gestor
         summary_report: Reporte resumen general
-        batch_size: Tamaño de lote para operaciones batch
+        batch_size: Tamaño de lote para operaciones batch (en los reportes
+            por registro, escrituras por batch; máximo 500)
         verbose: Si True, imprime progreso
         
     Returns:
@@ -574,6 +611,22 @@ def load_quality_reports_to_firebase(
     return stats
 
 
+def quality_upload_succeeded(stats: Optional[Dict[str, Any]], expected_records: int) -> bool:
+    """
+    Indica si la carga de reportes de calidad terminó sin errores.
+    
+    Args:
+        stats: Estadísticas retornadas por `load_quality_reports_to_firebase`
+        expected_records: Número de reportes por registro enviados a cargar
+        
+    Returns:
+        True si hubo conexión, no se registraron errores y se cargaron todos los registros
+    """
+    if not stats or 'error' in stats or stats.get('errors'):
+        return False
+    return stats.get('records_loaded', 0) >= expected_records
+
+
 if __name__ == "__main__":
     """
     Prueba del cargador de control de calidad.
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Etapas de los Pipelines de Empréstito
+=====================================
+
+Catálogo de etapas (extracción, transformación y carga de contratos y
+procesos SECOP de empréstito) compartido por contratacion_emprestito_pipeline,
+contratos_emprestito_pipeline y procesos_emprestito_pipeline. Cada etapa
+declara los archivos que lee y escribe para que utils.pipeline_dag pueda
+omitirla cuando su contenido no cambió.
+
+Los módulos de cada etapa se importan al ejecutarla.
+
+Autor: Sistema ETL Alcaldía de Cali
+Fecha: 2025-11-24
+"""
+
+import os
+import sys
+from typing import Iterable, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pipeline_dag import Stage
+
+
+# Rutas relativas a la raíz del proyecto (directorio de trabajo de los pipelines)
+INDICE_PROCESOS = 'transformation_app/app_inputs/indice_procesos_emprestito/indice_procesos.json'
+CONTRATOS_SECOP_INPUT = 'transformation_app/app_inputs/contratos_secop_input'
+PROCESOS_SECOP_INPUT = 'transformation_app/app_inputs/procesos_secop_input'
+DATOS_PROYECTOS = 'transformation_app/app_outputs/ejecucion_presupuestal_outputs/datos_caracteristicos_proyectos.json'
+
+CONTRATOS_EXTRAIDOS = f'{CONTRATOS_SECOP_INPUT}/contratos_secop_emprestito.json'
+PROCESOS_EXTRAIDOS = f'{PROCESOS_SECOP_INPUT}/procesos_secop_emprestito.json'
+CONTRATOS_TRANSFORMADOS = 'transformation_app/app_outputs/emprestito_outputs/contratos_secop_emprestito_transformed.json'
+PROCESOS_TRANSFORMADOS = 'transformation_app/app_outputs/emprestito_outputs/procesos_secop_emprestito_transformed.json'
+INDICE_CONTRATOS_PROYECTOS = 'transformation_app/app_outputs/contratos_secop_outputs/contratos_proyectos_index.json'
+INDICE_PROCESOS_PROYECTOS = 'transformation_app/app_outputs/procesos_secop_outputs/procesos_proyectos_index.json'
+
+# Las extracciones consultan SECOP: se repiten aunque el índice no cambie
+MAX_AGE_EXTRACCION = 12 * 3600
+
+
+def extraer_contratos():
+    """Extrae de SECOP los contratos del índice de procesos de empréstito."""
+    from extraction_app.data_extraction_contratos_emprestito import ContractosEmprestitoExtractor
+
+    resultado = ContractosEmprestitoExtractor().run_extraction()
+    if 'error' in resultado:
+        raise RuntimeError(resultado['error'])
+    return resultado
+
+
+def extraer_procesos():
+    """Extrae de SECOP los procesos del índice de procesos de empréstito."""
+    from extraction_app.data_extraction_procesos_emprestito import main
+
+    return main()
+
+
+def transformar_contratos():
+    """Transforma los contratos SECOP y genera el índice contratos-proyectos."""
+    from transformation_app.data_transformation_contratos_secop import main
+
+    return main()
+
+
+def transformar_procesos():
+    """Transforma los procesos SECOP y genera el índice procesos-proyectos."""
+    from transformation_app.data_transformation_procesos_secop import main
+
+    return main()
+
+
+def _verificar_carga(resultado):
+    if not resultado or resultado.get('status') != 'success':
+        error = (resultado or {}).get('error', 'La carga no retornó resultados')
+        raise RuntimeError(error)
+    return resultado
+
+
+def cargar_contratos():
+    """Carga incremental de contratos transformados a Firebase."""
+    from load_app.data_loading_contratos_emprestito import load_contratos_emprestito_data
+
+    return _verificar_carga(load_contratos_emprestito_data())
+
+
+def cargar_procesos():
+    """Carga incremental de procesos transformados a Firebase."""
+    from load_app.data_loading_procesos_emprestito import load_procesos_emprestito_data
+
+    return _verificar_carga(load_procesos_emprestito_data())
+
+
+ETAPAS_EMPRESTITO: List[Stage] = [
+    Stage(
+        name='extraction_contratos',
+        func=extraer_contratos,
+        description='Extracción de Contratos',
+        inputs=(INDICE_PROCESOS,),
+        outputs=(CONTRATOS_EXTRAIDOS,),
+        max_age_seconds=MAX_AGE_EXTRACCION
+    ),
+    Stage(
+        name='extraction_procesos',
+        func=extraer_procesos,
+        description='Extracción de Procesos SECOP',
+        inputs=(INDICE_PROCESOS,),
+        outputs=(PROCESOS_EXTRAIDOS,),
+        max_age_seconds=MAX_AGE_EXTRACCION
+    ),
+    Stage(
+        name='transformation_contratos',
+        func=transformar_contratos,
+        description='Transformación de Contratos',
+        inputs=(CONTRATOS_SECOP_INPUT, DATOS_PROYECTOS),
+        outputs=(CONTRATOS_TRANSFORMADOS, INDICE_CONTRATOS_PROYECTOS),
+        depends_on=('extraction_contratos',)
+    ),
+    Stage(
+        name='transformation_procesos',
+        func=transformar_procesos,
+        description='Transformación de Procesos SECOP',
+        # Lee el índice de contratos para asignar el centro gestor
+        inputs=(PROCESOS_SECOP_INPUT, INDICE_CONTRATOS_PROYECTOS, DATOS_PROYECTOS),
+        outputs=(PROCESOS_TRANSFORMADOS, INDICE_PROCESOS_PROYECTOS),
+        depends_on=('extraction_procesos', 'transformation_contratos')
+    ),
+    Stage(
+        name='loading_contratos',
+        func=cargar_contratos,
+        description='Carga de Contratos a Firebase',
+        inputs=(CONTRATOS_TRANSFORMADOS,),
+        depends_on=('transformation_contratos',)
+    ),
+    Stage(
+        name='loading_procesos',
+        func=cargar_procesos,
+        description='Carga de Procesos a Firebase',
+        inputs=(PROCESOS_TRANSFORMADOS,),
+        depends_on=('transformation_procesos',)
+    ),
+]
+
+
+def etapas(nombres: Iterable[str]) -> List[Stage]:
+    """Retorna las etapas del catálogo con los nombres indicados."""
+    nombres = set(nombres)
+    return [stage for stage in ETAPAS_EMPRESTITO if stage.name in nombres]
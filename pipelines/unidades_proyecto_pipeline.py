@@ -34,7 +34,7 @@ sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='repla
 import json
 import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple, Callable
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Callable
 from functools import reduce, partial, wraps
 import hashlib
 import uuid
@@ -48,7 +48,7 @@ from transformation_app.data_transformation_unidades_proyecto import transform_a
 from transformation_app.data_transformation_unidades_proyecto_infraestructura import main as transform_infraestructura
 from load_app.data_loading_unidades_proyecto import load_unidades_proyecto_to_firebase
 from load_app.data_loading_unidades_proyecto_infraestructura import load_infraestructura_vial_to_firebase
-from load_app.data_loading_quality_control import load_quality_reports_to_firebase
+from load_app.data_loading_quality_control import load_quality_reports_to_firebase, quality_upload_succeeded
 from database.config import get_firestore_client, secure_log
 
 # Importar módulos de control de calidad
@@ -56,6 +56,10 @@ from utils.quality_control import validate_geojson, DataQualityValidator
 from utils.quality_reporter import QualityReporter
 from utils.quality_s3_exporter import export_quality_reports_to_s3
 from utils.quality_control_firebase import run_quality_control_on_firebase_data
+from utils.quality_issue_store import QualityIssueStore, validate_features_incremental
+
+# Métricas por fase (tiempo, CPU, memoria, filas y RPC de Firestore)
+from utils.pipeline_metrics import contar_filas, ejecucion_medida, span
 
 
 # Utilidades de programación funcional
@@ -104,7 +108,9 @@ def log_step(step_name: str) -> Callable:
             print(f"{'='*60}")
             start_time = datetime.now()
             
-            result = func(*args, **kwargs)
+            with span(step_name, filas_entrada=contar_filas(args[0]) if args else None) as metrics_span:
+                result = func(*args, **kwargs)
+                metrics_span.filas(salida=contar_filas(result))
             
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
@@ -802,7 +808,10 @@ def run_load_infraestructura(
 def run_quality_control(
     geojson_path: str,
     enable_firebase_upload: bool = True,
-    enable_s3_upload: bool = True
+    enable_s3_upload: bool = True,
+    incremental: bool = False,
+    changed_upids: Optional[Iterable[str]] = None,
+    store_path: Optional[str] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Ejecuta validaciones de control de calidad sobre datos transformados.
@@ -810,10 +819,17 @@ def run_quality_control(
     Este paso NO altera los datos originales, solo genera reportes detallados
     que se cargan a Firebase y S3 para administración y corrección de datos.
     
+    En modo incremental solo se validan los registros nuevos o modificados y
+    los reportes agregados se recalculan desde el almacén persistente de
+    problemas por registro (ver utils.quality_issue_store).
+    
     Args:
         geojson_path: Ruta al archivo GeoJSON transformado
         enable_firebase_upload: Si True, carga reportes a Firebase
         enable_s3_upload: Si True, exporta reportes a S3
+        incremental: Si True, valida solo registros nuevos o modificados
+        changed_upids: UPIDs que se sabe que cambiaron (p. ej. de compare_and_filter_changes)
+        store_path: Ruta del almacén de problemas (modo incremental)
         
     Returns:
         Diccionario con estadísticas de control de calidad o None si falla
@@ -821,8 +837,23 @@ def run_quality_control(
     try:
         print(f"\n📋 Ejecutando validaciones ISO 19157...")
         
-        # 1. Validar GeoJSON completo
-        validation_result = validate_geojson(geojson_path, verbose=False)
+        import json
+        with open(geojson_path, 'r', encoding='utf-8') as f:
+            geojson_data = json.load(f)
+        
+        # 1. Validar GeoJSON (completo o solo registros modificados)
+        issue_store = None
+        revalidated_keys = None
+        if incremental:
+            issue_store = QualityIssueStore(store_path)
+            validation_result, revalidated_keys = validate_features_incremental(
+                geojson_data.get('features', []),
+                store=issue_store,
+                changed_keys=changed_upids
+            )
+            print(f"  [OK] Revalidados: {validation_result['revalidated_records']} registros nuevos o modificados")
+        else:
+            validation_result = validate_geojson(geojson_path, verbose=False)
         
         if not validation_result or 'issues' not in validation_result:
             print("[WARNING] No se pudieron generar reportes de calidad")
@@ -842,10 +873,6 @@ def run_quality_control(
         print(f"  [OK] Reportes por registro: {len(record_reports)}")
         
         # Contar registros totales por centro gestor
-        import json
-        with open(geojson_path, 'r', encoding='utf-8') as f:
-            geojson_data = json.load(f)
-        
         total_by_centro = {}
         for feature in geojson_data.get('features', []):
             centro = feature.get('properties', {}).get('nombre_centro_gestor', 'Sin Centro Gestor')
@@ -868,15 +895,23 @@ def run_quality_control(
         print(f"  [OK] Reporte resumen generado")
         
         # 3. Cargar a Firebase (si está habilitado)
+        reports_uploaded = False
         if enable_firebase_upload:
             print(f"\n🔥 Cargando reportes a Firebase...")
+            # En modo incremental solo se cargan los registros revalidados
+            records_to_upload = record_reports
+            if revalidated_keys is not None:
+                revalidated = set(revalidated_keys)
+                records_to_upload = [r for r in record_reports if r['document_id'] in revalidated]
+            
             firebase_stats = load_quality_reports_to_firebase(
-                record_reports=record_reports,
+                record_reports=records_to_upload,
                 centro_reports=centro_reports,
                 summary_report=summary_report,
                 batch_size=100,
                 verbose=False
             )
+            reports_uploaded = quality_upload_succeeded(firebase_stats, len(records_to_upload))
             print(f"  [OK] Cargados a Firebase: {firebase_stats.get('records_loaded', 0) + firebase_stats.get('centros_loaded', 0) + firebase_stats.get('summary_loaded', 0)} documentos")
         
         # 4. Exportar a S3 (si está habilitado)
@@ -896,6 +931,17 @@ def run_quality_control(
                 print(f"  [WARNING] No se pudo exportar a S3: {e}")
                 print(f"  ℹ️  Los reportes siguen disponibles en Firebase")
         
+        # Persistir almacén solo si los reportes revalidados quedaron en Firebase;
+        # si no, la siguiente ejecución los detecta de nuevo como modificados
+        if issue_store is not None:
+            if reports_uploaded:
+                try:
+                    issue_store.save()
+                except Exception as e:
+                    print(f"  [WARNING] No se pudo guardar almacén de calidad: {e}")
+            else:
+                print(f"  [WARNING] Carga a Firebase incompleta u omitida, no se actualiza el almacén de calidad")
+        
         # 5. Retornar estadísticas
         return {
             'quality_score': validation_result['statistics']['quality_score'],
@@ -905,7 +951,9 @@ def run_quality_control(
             'dimension_counts': validation_result['statistics']['by_dimension'],
             'report_id': reporter.report_id,
             'firebase_uploaded': enable_firebase_upload,
-            's3_uploaded': enable_s3_upload
+            's3_uploaded': enable_s3_upload,
+            'incremental': incremental,
+            'revalidated_records': validation_result.get('revalidated_records', validation_result['total_records'])
         }
         
     except Exception as e:
@@ -1086,17 +1134,22 @@ def create_unidades_proyecto_pipeline() -> Callable[[], Dict[str, Any]]:
                     print(f"\n[WAIT] Esperando {wait_time}s para que Firebase complete conversiones...")
                     print(f"   ({records_uploaded} registros estándar + {infra_features} registros infraestructura)")
                     import time
-                    time.sleep(wait_time)
+                    with span("ESPERA CONVERSIONES FIREBASE", segundos=wait_time):
+                        time.sleep(wait_time)
                     print("   [OK] Continuando con análisis de calidad\n")
                 else:
                     print("\n[SKIP] Sin cambios recientes, continuando inmediatamente...\n")
                 
-                quality_result = run_quality_control_on_firebase_data(
-                    collection_name=collection_name,
-                    enable_firebase_upload=True,
-                    enable_s3_upload=True,
-                    verbose=True
-                )
+                # Incremental: solo se revalidan registros cuyo hash cambió
+                # (incluye cambios de infraestructura, no solo los del paso 3)
+                with span("CONTROL DE CALIDAD (DATOS COMPLETOS)"):
+                    quality_result = run_quality_control_on_firebase_data(
+                        collection_name=collection_name,
+                        enable_firebase_upload=True,
+                        enable_s3_upload=True,
+                        verbose=True,
+                        incremental=True
+                    )
                 
                 if quality_result:
                     results['quality_control'] = quality_result
@@ -1134,7 +1187,14 @@ def create_unidades_proyecto_pipeline() -> Callable[[], Dict[str, Any]]:
             results['duration_seconds'] = (pipeline_end - pipeline_start).total_seconds()
             return results
     
-    return pipeline
+    def measured_pipeline(collection_name: str = "unidades_proyecto") -> Dict[str, Any]:
+        """Ejecuta el pipeline registrando métricas por fase (JSONL en app_outputs/logs/metrics)."""
+        with ejecucion_medida("unidades_proyecto", coleccion=collection_name) as metrics_run:
+            results = pipeline(collection_name)
+        results['metrics_file'] = str(metrics_run.ruta)
+        return results
+    
+    return measured_pipeline
 
 
 def print_pipeline_summary(results: Dict[str, Any]):
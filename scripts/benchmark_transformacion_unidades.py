@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Fases de la Transformación de Unidades de Proyecto
+
+Mide las funciones críticas de transformation_app/data_transformation_unidades_proyecto.py
+sobre datos sintéticos de Cali (utils.datos_sinteticos_cali) de 1k, 10k y 100k filas:
+- normalize_categorical_column (clase_up, tipo_equipamiento, tipo_intervencion, fuente_financiacion)
+- agrupar_datos_geoespacial
+- generate_upid_for_records
+- perform_spatial_intersection (por cada basemap disponible)
+- restructure_by_upid
+- export_to_geojson
+
+Cada fase recibe una copia nueva de su entrada, preparada fuera de la medición.
+Las fases posteriores al clustering usan los upid del generador, de modo que
+no dependen del tiempo de agrupación. La salida de consola de las funciones
+medidas se descarta.
+
+Los resultados se comparan con una línea base en JSON; una fase cuya mediana
+supere la de la línea base en más de la tolerancia se reporta como regresión
+y el script termina con código 1.
+
+Uso:
+    python scripts/benchmark_transformacion_unidades.py --tamanos 1000 10000
+    python scripts/benchmark_transformacion_unidades.py --guardar-linea-base
+    python scripts/benchmark_transformacion_unidades.py --fases reestructuracion_upid exportacion_geojson
+
+Nota: agrupacion_geoespacial, generacion_upid y reestructuracion_upid
+recorren los grupos fila por fila; a 100k filas cada una tarda varios minutos.
+"""
+
+import os
+import sys
+import io
+import json
+import argparse
+import platform
+import statistics
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Agregar rutas necesarias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.datos_sinteticos_cali import SEMILLA_DEFAULT, generar_intervenciones
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+TAMANOS_DEFAULT = [1_000, 10_000, 100_000]
+REPETICIONES_DEFAULT = 3
+
+# Una fase es regresión si su mediana supera la línea base en más de este porcentaje
+TOLERANCIA_DEFAULT = 0.20
+
+LINEA_BASE_PATH = Path(__file__).resolve().parent / 'benchmarks' / 'linea_base_transformacion_unidades.json'
+
+COLUMNAS_CATEGORICAS = ['clase_up', 'tipo_equipamiento', 'tipo_intervencion', 'fuente_financiacion']
+BASEMAPS = [('barrios_veredas', 'barrio_vereda_2'), ('comunas_corregimientos', 'comuna_corregimiento_2')]
+
+FASES = [
+    'normalizacion_categorias',
+    'agrupacion_geoespacial',
+    'generacion_upid',
+    'interseccion_espacial',
+    'reestructuracion_upid',
+    'exportacion_geojson',
+]
+
+VERSION_LINEA_BASE = 1
+
+
+# ============================================================================
+# PREPARACIÓN DE ENTRADAS
+# ============================================================================
+
+def silencioso(funcion: Callable, *args, **kwargs) -> Any:
+    """Ejecuta `funcion` descartando lo que imprime."""
+    with redirect_stdout(io.StringIO()):
+        return funcion(*args, **kwargs)
+
+
+class Entradas:
+    """
+    Entradas de cada fase para un tamaño, generadas una sola vez y bajo demanda.
+    """
+
+    def __init__(self, n: int, semilla: int):
+        self.n = n
+        self.semilla = semilla
+        self._crudo = None
+        self._geo = None
+        self._geo_completo = None
+        self.directorio_salida = tempfile.TemporaryDirectory(prefix='benchmark_unidades_')
+
+    @property
+    def crudo(self):
+        """Tabla sintética tal como llega de la hoja (sin upid)."""
+        if self._crudo is None:
+            self._crudo = generar_intervenciones(self.n, semilla=self.semilla)
+        return self._crudo
+
+    @property
+    def geo(self):
+        """GeoDataFrame con upid y geometría, como sale de la fase geoespacial."""
+        if self._geo is None:
+            from transformation_app import data_transformation_unidades_proyecto as t
+
+            df = generar_intervenciones(self.n, semilla=self.semilla, con_upid=True)
+            gdf = silencioso(t.convert_to_geodataframe, df)
+            gdf = silencioso(t.correct_coordinate_formats, gdf)
+            self._geo = silencioso(t.create_final_geometry, gdf)
+        return self._geo
+
+    @property
+    def geo_completo(self):
+        """GeoDataFrame con intersecciones y fechas estandarizadas, listo para exportar."""
+        if self._geo_completo is None:
+            from transformation_app import data_transformation_unidades_proyecto as t
+
+            gdf = self.geo.copy()
+            for basemap_name, output_column in BASEMAPS:
+                gdf = silencioso(t.perform_spatial_intersection, gdf, basemap_name, output_column)
+            gdf = silencioso(t.standardize_dates, gdf)
+            self._geo_completo = silencioso(t.add_frente_activo, gdf)
+        return self._geo_completo
+
+
+def basemap_disponible(basemap_name: str) -> bool:
+    ruta = Path(__file__).resolve().parent.parent / 'basemaps' / f'{basemap_name}.geojson'
+    return ruta.exists()
+
+
+def casos_de_fase(fase: str, entradas: Entradas) -> Dict[str, Callable[[], Callable[[], Any]]]:
+    """
+    Retorna {nombre del caso: preparar}, donde preparar() copia la entrada
+    (fuera de la medición) y retorna la llamada a medir.
+    """
+    from transformation_app import data_transformation_unidades_proyecto as t
+    from transformation_app.geospatial_clustering import agrupar_datos_geoespacial
+
+    if fase == 'normalizacion_categorias':
+        def preparar():
+            df = entradas.crudo.copy()
+
+            def llamada():
+                resultado = df
+                for columna in COLUMNAS_CATEGORICAS:
+                    resultado = t.normalize_categorical_column(resultado, columna, threshold=0.75)
+                return resultado
+            return llamada
+        return {fase: preparar}
+
+    if fase == 'agrupacion_geoespacial':
+        def preparar():
+            df = entradas.crudo.copy()
+            return lambda: agrupar_datos_geoespacial(df)
+        return {fase: preparar}
+
+    if fase == 'generacion_upid':
+        def preparar():
+            df = entradas.crudo.copy()
+            return lambda: t.generate_upid_for_records(df)
+        return {fase: preparar}
+
+    if fase == 'interseccion_espacial':
+        casos = {}
+        for basemap_name, output_column in BASEMAPS:
+            if not basemap_disponible(basemap_name):
+                print(f"   ⚠️ Basemap no disponible, se omite: {basemap_name}")
+                continue
+
+            def preparar(basemap_name=basemap_name, output_column=output_column):
+                gdf = entradas.geo.copy()
+                return lambda: t.perform_spatial_intersection(gdf, basemap_name, output_column)
+            casos[f"{fase}[{basemap_name}]"] = preparar
+        return casos
+
+    if fase == 'reestructuracion_upid':
+        def preparar():
+            gdf = entradas.geo_completo.copy()
+            return lambda: t.restructure_by_upid(gdf)
+        return {fase: preparar}
+
+    if fase == 'exportacion_geojson':
+        def preparar():
+            gdf = entradas.geo_completo.copy()
+            return lambda: t.export_to_geojson(gdf, Path(entradas.directorio_salida.name))
+        return {fase: preparar}
+
+    raise ValueError(f"Fase desconocida: {fase}")
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+
+def medir(preparar: Callable[[], Callable[[], Any]], repeticiones: int) -> Dict[str, Any]:
+    """Mide `repeticiones` ejecuciones; cada una con su propia copia de la entrada."""
+    tiempos = []
+    for _ in range(repeticiones):
+        llamada = preparar()
+        with redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            llamada()
+            tiempos.append(time.perf_counter() - inicio)
+    return {
+        'mediana_s': round(statistics.median(tiempos), 6),
+        'min_s': round(min(tiempos), 6),
+        'max_s': round(max(tiempos), 6),
+        'repeticiones': repeticiones,
+    }
+
+
+def ejecutar_benchmark(
+    tamanos: List[int],
+    fases: List[str],
+    repeticiones: int,
+    semilla: int
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Retorna {tamaño: {caso: medición}}."""
+    resultados: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for n in tamanos:
+        print(f"\n{'='*80}")
+        print(f"📊 {n:,} FILAS (semilla {semilla})")
+        print(f"{'='*80}")
+        entradas = Entradas(n, semilla)
+        resultados[str(n)] = {}
+        for fase in fases:
+            for caso, preparar in casos_de_fase(fase, entradas).items():
+                medicion = medir(preparar, repeticiones)
+                medicion['filas_por_s'] = round(n / medicion['mediana_s'], 1) if medicion['mediana_s'] else None
+                resultados[str(n)][caso] = medicion
+                print(f"   {caso:<50} mediana {medicion['mediana_s']:>10.4f}s   "
+                      f"min {medicion['min_s']:>10.4f}s   {medicion['filas_por_s'] or 0:>12,.0f} filas/s")
+        entradas.directorio_salida.cleanup()
+    return resultados
+
+
+# ============================================================================
+# LÍNEA BASE
+# ============================================================================
+
+def descripcion_entorno() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def cargar_linea_base(ruta: Path) -> Optional[Dict[str, Any]]:
+    if not ruta.exists():
+        return None
+    with open(ruta, 'r', encoding='utf-8') as f:
+        linea_base = json.load(f)
+    if linea_base.get('version') != VERSION_LINEA_BASE:
+        print(f"⚠️ Línea base con versión distinta, se ignora: {ruta}")
+        return None
+    return linea_base
+
+
+def guardar_linea_base(ruta: Path, resultados: Dict[str, Any], semilla: int, previa: Optional[Dict[str, Any]]):
+    """Guarda los resultados, conservando los tamaños/casos no medidos de la línea base previa."""
+    combinados = dict(previa['resultados']) if previa and previa.get('semilla') == semilla else {}
+    for n, casos in resultados.items():
+        combinados[n] = {**combinados.get(n, {}), **casos}
+
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix('.tmp')
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': VERSION_LINEA_BASE,
+            'semilla': semilla,
+            'generado': datetime.now().isoformat(),
+            'entorno': descripcion_entorno(),
+            'resultados': combinados,
+        }, f, ensure_ascii=False, indent=2)
+    temporal.replace(ruta)
+    print(f"\n💾 Línea base guardada: {ruta}")
+
+
+def comparar(resultados: Dict[str, Any], linea_base: Dict[str, Any], tolerancia: float) -> List[str]:
+    """Imprime la comparación con la línea base y retorna las regresiones."""
+    regresiones = []
+    print(f"\n{'='*80}")
+    print(f"📈 COMPARACIÓN CON LÍNEA BASE ({linea_base.get('generado', '?')}, tolerancia {tolerancia:.0%})")
+    print(f"{'='*80}")
+    if linea_base.get('semilla') is not None:
+        print(f"   Semilla de la línea base: {linea_base['semilla']}")
+    for n, casos in resultados.items():
+        for caso, medicion in casos.items():
+            base = linea_base['resultados'].get(n, {}).get(caso)
+            if not base:
+                print(f"   {n:>7} {caso:<50} sin línea base")
+                continue
+            razon = medicion['mediana_s'] / base['mediana_s'] if base['mediana_s'] else float('inf')
+            if razon > 1 + tolerancia:
+                estado = '❌ REGRESIÓN'
+                regresiones.append(f"{caso} @ {n} filas: {base['mediana_s']:.4f}s → {medicion['mediana_s']:.4f}s ({razon:.2f}x)")
+            elif razon < 1 - tolerancia:
+                estado = '🚀 MEJORA'
+            else:
+                estado = '✅ igual'
+            print(f"   {n:>7} {caso:<50} {base['mediana_s']:>10.4f}s → {medicion['mediana_s']:>10.4f}s  {razon:>5.2f}x  {estado}")
+    return regresiones
+
+
+# ============================================================================
+# EJECUCIÓN
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de las fases de transformación de unidades de proyecto')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS_DEFAULT, help='Filas por tabla sintética')
+    parser.add_argument('--fases', nargs='+', choices=FASES, default=FASES, help='Fases a medir')
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES_DEFAULT)
+    parser.add_argument('--semilla', type=int, default=SEMILLA_DEFAULT)
+    parser.add_argument('--linea-base', type=Path, default=LINEA_BASE_PATH, help='Archivo JSON de línea base')
+    parser.add_argument('--guardar-linea-base', action='store_true', help='Guardar los resultados como línea base')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_DEFAULT,
+                        help='Aumento relativo de la mediana tolerado antes de reportar regresión')
+    parser.add_argument('--salida', type=Path, help='Guardar también los resultados de esta ejecución en JSON')
+    args = parser.parse_args(argv)
+
+    print(f"\n{'='*80}")
+    print("⏱️  BENCHMARK DE TRANSFORMACIÓN DE UNIDADES DE PROYECTO")
+    print(f"{'='*80}")
+    print(f"   • Tamaños: {', '.join(f'{n:,}' for n in args.tamanos)}")
+    print(f"   • Fases: {', '.join(args.fases)}")
+    print(f"   • Repeticiones: {args.repeticiones}")
+
+    resultados = ejecutar_benchmark(args.tamanos, args.fases, args.repeticiones, args.semilla)
+
+    if args.salida:
+        args.salida.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({'semilla': args.semilla, 'entorno': descripcion_entorno(), 'resultados': resultados},
+                      f, ensure_ascii=False, indent=2)
+
+    linea_base = cargar_linea_base(args.linea_base)
+    regresiones = []
+    if linea_base:
+        if linea_base.get('semilla') != args.semilla:
+            print(f"\n⚠️ La línea base usa la semilla {linea_base.get('semilla')}; no se compara")
+        else:
+            regresiones = comparar(resultados, linea_base, args.tolerancia)
+    else:
+        print(f"\nℹ️  Sin línea base en {args.linea_base}")
+
+    if args.guardar_linea_base:
+        guardar_linea_base(args.linea_base, resultados, args.semilla, linea_base)
+
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} regresiones:")
+        for regresion in regresiones:
+            print(f"   - {regresion}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,11 @@ import pandas as pd
 import os
 import re
 import json
+import math
+import numpy as np
 from datetime import datetime
 from tqdm import tqdm
+from unidecode import unidecode
 
 def clean_column_names(df):
     """
@@ -211,66 +214,217 @@ def clean_nan_values(df):
     
     return df
 
-def enrich_bpin_from_projects(df):
-    """
-    Enriquece los contratos con BPIN desde datos de proyectos presupuestales
-    cuando el BPIN no está disponible o es 0 en SECOP
+PROJECTS_FILE = 'transformation_app/app_outputs/ejecucion_presupuestal_outputs/datos_caracteristicos_proyectos.json'
+
+
+def load_projects_data(projects_file=PROJECTS_FILE):
     """
-    print("🔄 Enriqueciendo BPIN desde datos de proyectos presupuestales...")
+    Carga una sola vez los datos característicos de proyectos presupuestales.
     
-    # Verificar si existe el archivo de proyectos
-    projects_file = 'transformation_app/app_outputs/ejecucion_presupuestal_outputs/datos_caracteristicos_proyectos.json'
+    Returns:
+        list: Registros de proyectos, o None si el archivo no existe o no se puede leer
+    """
     if not os.path.exists(projects_file):
         print(f"⚠️ Archivo de proyectos no encontrado: {projects_file}")
-        return df
+        return None
     
     try:
-        # Cargar datos de proyectos
         with open(projects_file, 'r', encoding='utf-8') as f:
             projects_data = json.load(f)
+        print(f"✅ Cargados {len(projects_data)} proyectos presupuestales")
+        return projects_data
+    except Exception as e:
+        print(f"❌ Error cargando proyectos presupuestales: {e}")
+        return None
+
+
+def build_bpin_to_centro_gestor(projects_data):
+    """
+    Crea el mapeo BPIN -> nombre_centro_gestor a partir de los proyectos cargados
+    """
+    bpin_to_centro_gestor = {}
+    for project in projects_data or []:
+        bpin = project.get('bpin')
+        nombre_centro_gestor = project.get('nombre_centro_gestor')
+        if bpin and nombre_centro_gestor:
+            bpin_to_centro_gestor[int(bpin)] = nombre_centro_gestor
+    return bpin_to_centro_gestor
+
+
+# Parámetros del matching de BPIN por texto (contrato SECOP -> proyecto presupuestal)
+BPIN_MATCH_MIN_TOKEN_LENGTH = 5
+BPIN_MATCH_MIN_SHARED_TOKENS = 2
+BPIN_MATCH_PROJECT_TEXT_FIELDS = ['nombre_proyecto', 'nombre_actividad']
+
+
+def tokenize_for_bpin_match(text):
+    """
+    Normaliza un texto (minúsculas, sin acentos) y retorna el conjunto de palabras
+    clave usadas para relacionar contratos con proyectos presupuestales
+    """
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return set()
+    
+    text = unidecode(str(text).lower())
+    return {token for token in re.findall(r'\w+', text) if len(token) >= BPIN_MATCH_MIN_TOKEN_LENGTH}
+
+
+def build_project_token_index(df_projects):
+    """
+    Construye un índice invertido palabra -> proyectos sobre los nombres y
+    actividades de los proyectos presupuestales, con pesos IDF por palabra.
+    
+    Se construye una sola vez por ejecución; cada contrato solo se compara contra
+    los proyectos que comparten al menos una palabra con su descripción.
+    
+    Returns:
+        dict: bpins, nombres, postings (palabra -> posiciones), idf y normas por proyecto
+    """
+    text_fields = [field for field in BPIN_MATCH_PROJECT_TEXT_FIELDS if field in df_projects.columns]
+    valid_projects = df_projects[pd.to_numeric(df_projects['bpin'], errors='coerce').notna()]
+    
+    bpins = []
+    nombres = []
+    project_tokens = []
+    postings = {}
+    
+    for record in valid_projects[['bpin'] + text_fields].to_dict('records'):
+        tokens = set()
+        for field in text_fields:
+            tokens |= tokenize_for_bpin_match(record.get(field))
+        if not tokens:
+            continue
         
+        position = len(bpins)
+        bpins.append(int(float(record['bpin'])))
+        nombres.append(str(record.get('nombre_proyecto', '')))
+        project_tokens.append(tokens)
+        for token in tokens:
+            postings.setdefault(token, []).append(position)
+    
+    total_projects = len(bpins)
+    idf = {
+        token: math.log((1 + total_projects) / (1 + len(positions))) + 1.0
+        for token, positions in postings.items()
+    }
+    norms = [math.sqrt(sum(idf[token] ** 2 for token in tokens)) for tokens in project_tokens]
+    
+    return {
+        'bpins': bpins,
+        'nombres': nombres,
+        'postings': postings,
+        'idf': idf,
+        'norms': norms
+    }
+
+
+def match_contract_to_project(descripcion, project_index, min_shared_tokens=BPIN_MATCH_MIN_SHARED_TOKENS):
+    """
+    Busca el proyecto presupuestal que mejor corresponde a la descripción de un contrato.
+    
+    La confianza es la similitud coseno TF-IDF (0-1) entre las palabras clave del
+    contrato y las del proyecto, calculada solo sobre los proyectos candidatos del
+    índice invertido que comparten al menos `min_shared_tokens` palabras.
+    
+    Returns:
+        tuple: (bpin, nombre_proyecto, confianza) o None si no hay coincidencia
+    """
+    idf = project_index['idf']
+    all_tokens = tokenize_for_bpin_match(descripcion)
+    tokens = [token for token in all_tokens if token in idf]
+    if len(tokens) < min_shared_tokens:
+        return None
+    
+    # Las palabras que no aparecen en ningún proyecto pesan como las más raras
+    unseen_idf = math.log(1 + len(project_index['bpins'])) + 1.0
+    
+    # Acumular peso compartido solo para proyectos candidatos
+    shared_weight = {}
+    shared_count = {}
+    for token in tokens:
+        weight = idf[token] ** 2
+        for position in project_index['postings'][token]:
+            shared_weight[position] = shared_weight.get(position, 0.0) + weight
+            shared_count[position] = shared_count.get(position, 0) + 1
+    
+    contract_norm = math.sqrt(sum(idf.get(token, unseen_idf) ** 2 for token in all_tokens))
+    best_position = None
+    best_key = (0.0, 0)
+    for position, count in shared_count.items():
+        if count < min_shared_tokens:
+            continue
+        score = shared_weight[position] / (contract_norm * project_index['norms'][position])
+        if (score, count) > best_key:
+            best_key = (score, count)
+            best_position = position
+    
+    if best_position is None:
+        return None
+    
+    return (
+        project_index['bpins'][best_position],
+        project_index['nombres'][best_position],
+        round(min(best_key[0], 1.0), 4)
+    )
+
+
+def enrich_bpin_from_projects(df, projects_data=None, min_shared_tokens=BPIN_MATCH_MIN_SHARED_TOKENS,
+                              min_confidence=0.0):
+    """
+    Enriquece los contratos con BPIN desde datos de proyectos presupuestales
+    cuando el BPIN no está disponible o es 0 en SECOP.
+    
+    Usa un índice invertido de palabras sobre los proyectos, de modo que el costo
+    crece con los candidatos de cada contrato y no con contratos × proyectos.
+    La columna 'confianza_bpin' registra la confianza (0-1) de cada BPIN asignado;
+    queda en None para los contratos cuyo BPIN proviene de SECOP.
+    
+    Args:
+        df: DataFrame de contratos
+        projects_data: Proyectos ya cargados con load_projects_data(); si es None se leen del archivo
+    """
+    print("🔄 Enriqueciendo BPIN desde datos de proyectos presupuestales...")
+    
+    df['confianza_bpin'] = None
+    
+    if projects_data is None:
+        projects_data = load_projects_data()
+    if projects_data is None:
+        return df
+    
+    try:
         df_projects = pd.DataFrame(projects_data)
-        print(f"✅ Cargados {len(df_projects)} proyectos presupuestales")
         
         # Contar contratos sin BPIN válido
-        contratos_sin_bpin = len(df[(df['bpin'] == 0) | (df['bpin'].isna())])
+        mask_sin_bpin = (df['bpin'] == 0) | (df['bpin'].isna())
+        contratos_sin_bpin = int(mask_sin_bpin.sum())
         print(f"📊 Contratos sin BPIN válido: {contratos_sin_bpin}")
         
         if contratos_sin_bpin == 0:
             print("✅ Todos los contratos ya tienen BPIN válido")
             return df
         
-        # Crear índice de búsqueda por palabras clave
+        # Construir índice invertido una sola vez
+        project_index = build_project_token_index(df_projects)
+        print(f"✅ Índice de proyectos: {len(project_index['bpins'])} proyectos, "
+              f"{len(project_index['postings'])} palabras clave")
+        
         enriched_count = 0
+        descripciones = df.loc[mask_sin_bpin, 'descripcion_proceso'] if 'descripcion_proceso' in df.columns \
+            else pd.Series(None, index=df.index[mask_sin_bpin])
         
-        for idx, row in df.iterrows():
-            # Solo procesar contratos sin BPIN válido
-            if row['bpin'] != 0 and not pd.isna(row['bpin']):
+        for idx, descripcion in descripciones.items():
+            match = match_contract_to_project(descripcion, project_index, min_shared_tokens)
+            if match is None or match[2] < min_confidence:
                 continue
-                
-            descripcion = str(row.get('descripcion_proceso', '')).lower()
-            referencia = str(row.get('referencia_contrato', ''))
-            
-            # Buscar coincidencias por palabras clave en descripción
-            palabras_clave = [palabra for palabra in descripcion.split() if len(palabra) > 4][:10]
-            
-            mejor_coincidencia = None
-            max_coincidencias = 0
-            
-            for _, project in df_projects.iterrows():
-                nombre_proyecto = str(project['nombre_proyecto']).lower()
-                coincidencias = sum(1 for palabra in palabras_clave if palabra in nombre_proyecto)
-                
-                if coincidencias > max_coincidencias and coincidencias >= 2:  # Mínimo 2 palabras
-                    max_coincidencias = coincidencias
-                    mejor_coincidencia = project
             
-            # Si se encontró una buena coincidencia, asignar el BPIN
-            if mejor_coincidencia is not None:
-                df.at[idx, 'bpin'] = int(mejor_coincidencia['bpin'])
-                enriched_count += 1
-                print(f"  ✅ BPIN {mejor_coincidencia['bpin']} asignado a contrato {referencia}")
-                print(f"     Proyecto: {mejor_coincidencia['nombre_proyecto'][:60]}...")
+            bpin, nombre_proyecto, confianza = match
+            df.at[idx, 'bpin'] = bpin
+            df.at[idx, 'confianza_bpin'] = confianza
+            enriched_count += 1
+            referencia = df.at[idx, 'referencia_contrato'] if 'referencia_contrato' in df.columns else idx
+            print(f"  ✅ BPIN {bpin} asignado a contrato {referencia} (confianza {confianza:.2f})")
+            print(f"     Proyecto: {nombre_proyecto[:60]}...")
         
         print(f"🎉 Enriquecimiento completado: {enriched_count} contratos actualizados")
         
@@ -280,33 +434,26 @@ def enrich_bpin_from_projects(df):
     return df
 
 
-def add_nombre_centro_gestor(df):
+def add_nombre_centro_gestor(df, bpin_to_centro_gestor=None):
     """
     Añade la columna 'nombre_centro_gestor' basada en el BPIN desde datos de proyectos presupuestales
+    
+    Args:
+        df: DataFrame de contratos
+        bpin_to_centro_gestor: Mapeo BPIN -> nombre_centro_gestor ya construido con
+            build_bpin_to_centro_gestor(); si es None se cargan los proyectos del archivo
     """
     print("🔄 Añadiendo nombre_centro_gestor desde datos de proyectos presupuestales...")
     
-    # Verificar si existe el archivo de proyectos
-    projects_file = 'transformation_app/app_outputs/ejecucion_presupuestal_outputs/datos_caracteristicos_proyectos.json'
-    if not os.path.exists(projects_file):
-        print(f"⚠️ Archivo de proyectos no encontrado: {projects_file}")
-        df['nombre_centro_gestor'] = None
-        return df
+    if bpin_to_centro_gestor is None:
+        projects_data = load_projects_data()
+        if projects_data is None:
+            df['nombre_centro_gestor'] = None
+            return df
+        bpin_to_centro_gestor = build_bpin_to_centro_gestor(projects_data)
     
     try:
-        # Cargar datos de proyectos
-        with open(projects_file, 'r', encoding='utf-8') as f:
-            projects_data = json.load(f)
-        
-        # Crear mapeo BPIN -> nombre_centro_gestor
-        bpin_to_centro_gestor = {}
-        for project in projects_data:
-            bpin = project.get('bpin')
-            nombre_centro_gestor = project.get('nombre_centro_gestor')
-            if bpin and nombre_centro_gestor:
-                bpin_to_centro_gestor[int(bpin)] = nombre_centro_gestor
-        
-        print(f"✅ Creado mapeo de {len(bpin_to_centro_gestor)} BPIN -> nombre_centro_gestor")
+        print(f"✅ Mapeo de {len(bpin_to_centro_gestor)} BPIN -> nombre_centro_gestor")
         
         # Añadir columna nombre_centro_gestor
         df['nombre_centro_gestor'] = df['bpin'].map(bpin_to_centro_gestor)
@@ -366,9 +513,37 @@ def rename_and_convert_bpin(df):
     
     return df
 
+def _sorted_bpin_slices(df):
+    """
+    Ordena una sola vez los registros con BPIN válido y retorna los rangos
+    contiguos de cada BPIN.
+    
+    Returns:
+        tuple: (DataFrame ordenado, {bpin: (inicio, fin)}, BPINs en orden de aparición)
+    """
+    valid_df = df[(df['bpin'] != 0) & df['bpin'].notna()]
+    
+    # Orden estable: cada grupo conserva el orden original de sus contratos
+    sorted_df = valid_df.sort_values('bpin', kind='stable').reset_index(drop=True)
+    bpin_values = sorted_df['bpin'].to_numpy()
+    
+    if len(bpin_values) == 0:
+        return sorted_df, {}, []
+    
+    starts = np.flatnonzero(np.r_[True, bpin_values[1:] != bpin_values[:-1]])
+    ends = np.r_[starts[1:], len(bpin_values)]
+    slices = {bpin_values[start]: (int(start), int(end)) for start, end in zip(starts, ends)}
+    
+    return sorted_df, slices, list(pd.unique(valid_df['bpin']))
+
+
 def group_by_bpin_and_optimize(df):
     """
-    Agrupa los registros por BPIN conservando TODOS los datos de cada registro
+    Agrupa los registros por BPIN conservando TODOS los datos de cada registro.
+    
+    Ordena una sola vez, calcula los totales con agregaciones nombradas y arma la
+    lista de contratos de cada BPIN desde su rango contiguo, por lo que el costo
+    es lineal en el número de contratos.
     """
     print("🔄 Agrupando registros por BPIN (conservando todos los datos)...")
     
@@ -376,58 +551,68 @@ def group_by_bpin_and_optimize(df):
         print("❌ Columna 'bpin' no encontrada para agrupar")
         return df
     
-    # Agrupar por BPIN
-    grouped_data = {}
+    sorted_df, slices, unique_bpins = _sorted_bpin_slices(df)
     
-    # Obtener estadísticas generales
-    unique_bpins = df[df['bpin'] != 0]['bpin'].unique()  # Excluir valores 0
+    # Estadísticas por BPIN en una sola pasada
+    stats_df = sorted_df.assign(
+        _valor=pd.to_numeric(sorted_df['valor_contrato'], errors='coerce'),
+        _fecha=pd.to_datetime(sorted_df['fecha_firma'], errors='coerce')
+    )
+    stats = stats_df.groupby('bpin', sort=False).agg(
+        total_contratos=('bpin', 'size'),
+        valor_total=('_valor', 'sum'),
+        valor_promedio=('_valor', 'mean'),
+        entidades_participantes=('nombre_entidad', 'unique'),
+        tipos_contrato=('tipo_contrato', 'unique'),
+        estados_contrato=('estado_contrato', 'unique'),
+        fecha_primer_contrato=('_fecha', 'min'),
+        fecha_ultimo_contrato=('_fecha', 'max')
+    ).to_dict('index')
+    
+    # Convertir a registros una sola vez; cada BPIN toma su rango contiguo
+    records = sorted_df.to_dict('records')
     
+    grouped_data = {}
     for bpin_value in tqdm(unique_bpins, desc="Procesando BPINs"):
-        bpin_records = df[df['bpin'] == bpin_value]
-        
-        # Crear estructura con todos los datos
-        # Filtrar fechas válidas para estadísticas
-        fechas_validas = pd.to_datetime(bpin_records['fecha_firma'], errors='coerce').dropna()
+        start, end = slices[bpin_value]
+        bpin_stats = stats[bpin_value]
         
         bpin_data = {
             'bpin': int(bpin_value),
             'resumen': {
-                'total_contratos': len(bpin_records),
-                'valor_total': int(bpin_records['valor_contrato'].sum()),
-                'valor_promedio': int(bpin_records['valor_contrato'].mean()),
-                'entidades_participantes': list(bpin_records['nombre_entidad'].unique()),
-                'tipos_contrato': list(bpin_records['tipo_contrato'].unique()),
-                'estados_contrato': list(bpin_records['estado_contrato'].unique()),
-                'fecha_primer_contrato': fechas_validas.min().strftime('%Y-%m-%d') if len(fechas_validas) > 0 else None,
-                'fecha_ultimo_contrato': fechas_validas.max().strftime('%Y-%m-%d') if len(fechas_validas) > 0 else None
+                'total_contratos': int(bpin_stats['total_contratos']),
+                'valor_total': int(bpin_stats['valor_total']),
+                'valor_promedio': int(bpin_stats['valor_promedio']) if pd.notna(bpin_stats['valor_promedio']) else 0,
+                'entidades_participantes': list(bpin_stats['entidades_participantes']),
+                'tipos_contrato': list(bpin_stats['tipos_contrato']),
+                'estados_contrato': list(bpin_stats['estados_contrato']),
+                'fecha_primer_contrato': bpin_stats['fecha_primer_contrato'].strftime('%Y-%m-%d') if pd.notna(bpin_stats['fecha_primer_contrato']) else None,
+                'fecha_ultimo_contrato': bpin_stats['fecha_ultimo_contrato'].strftime('%Y-%m-%d') if pd.notna(bpin_stats['fecha_ultimo_contrato']) else None
             },
-            'contratos': []
+            # TODOS los contratos con TODOS sus datos
+            'contratos': records[start:end]
         }
         
-        # Agregar TODOS los contratos con TODOS sus datos
-        for _, record in bpin_records.iterrows():
-            # Convertir la fila completa a diccionario, preservando todos los campos
-            contract = record.to_dict()
-            bpin_data['contratos'].append(contract)
-        
         grouped_data[str(bpin_value)] = bpin_data
     
+    total_contratos = len(sorted_df)
+    
     # Crear estructura final con metadata
     result = {
         'metadata': {
             'fecha_procesamiento': pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
             'total_bpins': len(grouped_data),
-            'total_contratos': len(df[df['bpin'] != 0]),
-            'contratos_por_bpin_promedio': len(df[df['bpin'] != 0]) / len(grouped_data) if len(grouped_data) > 0 else 0,
-            'valor_total_todos_contratos': int(df[df['bpin'] != 0]['valor_contrato'].sum())
+            'total_contratos': total_contratos,
+            'contratos_por_bpin_promedio': total_contratos / len(grouped_data) if len(grouped_data) > 0 else 0,
+            'valor_total_todos_contratos': int(stats_df['_valor'].sum())
         },
         'datos_por_bpin': grouped_data
     }
     
     print(f"✅ Agrupación completada:")
     print(f"  📊 Total BPINs únicos: {len(grouped_data)}")
-    print(f"  📊 Total contratos: {len(df[df['bpin'] != 0])}")
-    print(f"  📊 Promedio contratos por BPIN: {len(df[df['bpin'] != 0])/len(grouped_data):.1f}")
+    print(f"  📊 Total contratos: {total_contratos}")
+    print(f"  📊 Promedio contratos por BPIN: {result['metadata']['contratos_por_bpin_promedio']:.1f}")
     
     return result
 
@@ -442,34 +627,17 @@ def create_bpin_summary(df):
         print("❌ Columna 'bpin' no encontrada para el resumen")
         return {}
     
-    # Filtrar solo registros con BPIN válido (diferente de 0)
-    valid_bpin_df = df[df['bpin'] != 0].copy()
-    
     # Seleccionar solo las columnas necesarias
     required_columns = ['bpin', 'referencia_contrato', 'proceso_compra', 'id_contrato', 'urlproceso']
-    summary_df = valid_bpin_df[required_columns].copy()
+    sorted_df, slices, unique_bpins = _sorted_bpin_slices(df[required_columns])
     
-    # Agrupar por BPIN
-    grouped_summary = {}
-    unique_bpins = summary_df['bpin'].unique()
+    # Crear lista de contratos una sola vez; cada BPIN toma su rango contiguo
+    records = sorted_df[required_columns[1:]].to_dict('records')
     
+    grouped_summary = {}
     for bpin_value in tqdm(unique_bpins, desc="Procesando BPINs para resumen"):
-        # Verificar que el BPIN no sea NaN
-        if pd.isna(bpin_value):
-            continue
-            
-        bpin_records = summary_df[summary_df['bpin'] == bpin_value]
-        
-        # Crear lista de contratos para este BPIN
-        contratos = []
-        for _, record in bpin_records.iterrows():
-            contrato = {
-                'referencia_contrato': record['referencia_contrato'],
-                'proceso_compra': record['proceso_compra'],
-                'id_contrato': record['id_contrato'],
-                'urlproceso': record['urlproceso']
-            }
-            contratos.append(contrato)
+        start, end = slices[bpin_value]
+        contratos = records[start:end]
         
         grouped_summary[str(int(bpin_value))] = {
             'bpin': int(bpin_value),
@@ -683,11 +851,15 @@ def transform_dataframe(df):
     # 4. Renombrar y convertir BPIN
     df = rename_and_convert_bpin(df)
     
-    # 5. Enriquecer BPIN desde datos de proyectos presupuestales
-    df = enrich_bpin_from_projects(df)
+    # 5. Enriquecer BPIN desde datos de proyectos presupuestales (cargados una sola vez)
+    projects_data = load_projects_data()
+    df = enrich_bpin_from_projects(df, projects_data=projects_data)
     
     # 6. Añadir nombre_centro_gestor basado en BPIN
-    df = add_nombre_centro_gestor(df)
+    if projects_data is None:
+        df['nombre_centro_gestor'] = None
+    else:
+        df = add_nombre_centro_gestor(df, build_bpin_to_centro_gestor(projects_data))
     
     # 7. Renombrar link_proceso a urlProceso
     if 'link_proceso' in df.columns:
@@ -12,34 +12,61 @@ import os
 import pandas as pd
 import numpy as np
 import re
+import hashlib
 import unicodedata
 import time
+from functools import lru_cache
 try:
     import psutil
 except ImportError:
     psutil = None
+try:
+    import pyarrow  # noqa: F401  (motor de Parquet para la caché de archivos procesados)
+except ImportError:
+    pyarrow = None
 from tqdm import tqdm
 from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 
+@lru_cache(maxsize=None)
+def _normalize_column_name(col: str) -> str:
+    """Normaliza un nombre de columna (resultado cacheado: los encabezados se repiten entre archivos)"""
+    # Convert to lowercase
+    col = col.lower()
+    # Replace spaces with underscores
+    col = col.replace(' ', '_')
+    # Remove leading/trailing underscores
+    col = col.strip('_')
+    # Remove accents (tildes)
+    col = unicodedata.normalize('NFD', col).encode('ascii', 'ignore').decode('utf-8')
+    # Replace 'ñ' with 'n'
+    col = col.replace('ñ', 'n')
+    return col
+
+
 def normalize_column_names(columns: List[str]) -> List[str]:
     """Normaliza nombres de columnas eliminando espacios, acentos y conectores"""
-    normalized_cols = []
-    for col in columns:
-        # Convert to lowercase
-        col = col.lower()
-        # Replace spaces with underscores
-        col = col.replace(' ', '_')
-        # Remove leading/trailing underscores
-        col = col.strip('_')
-        # Remove accents (tildes)
-        col = unicodedata.normalize('NFD', col).encode('ascii', 'ignore').decode('utf-8')
-        # Replace 'ñ' with 'n'
-        col = col.replace('ñ', 'n')
-        normalized_cols.append(col)
-    return normalized_cols
+    return [_normalize_column_name(col) for col in columns]
+
+
+@lru_cache(maxsize=64)
+def detect_keyword_columns(columns: Tuple[str, ...], include_keywords: Tuple[str, ...],
+                           exclude_keywords: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+    """
+    Detecta las columnas cuyo nombre contiene alguna palabra clave de `include_keywords`
+    y ninguna de `exclude_keywords`, conservando el orden original.
+    
+    La detección se evalúa sobre todo el índice de columnas a la vez y el resultado
+    se cachea por (columnas, palabras clave), ya que el esquema consolidado se repite
+    entre movimientos y ejecución y entre ejecuciones del pipeline.
+    """
+    index = pd.Index(columns, dtype=object).str.lower()
+    mask = index.str.contains('|'.join(map(re.escape, include_keywords)), regex=True)
+    if exclude_keywords:
+        mask &= ~index.str.contains('|'.join(map(re.escape, exclude_keywords)), regex=True)
+    return tuple(col for col, keep in zip(columns, mask) if keep)
 
 
 def clean_monetary_value(value: Union[str, float, int]) -> int:
@@ -70,72 +97,81 @@ def is_program_column(column: pd.Series) -> bool:
     return first_value is not None and (str(first_value) == '4599' or (isinstance(first_value, (int, float)) and first_value == 4599))
 
 
+def list_input_files(input_dir: str) -> List[str]:
+    """Lista los archivos Excel (.xlsx, .xls) y CSV (.csv) del directorio de entrada"""
+    excel_files = [f for f in os.listdir(input_dir) if f.endswith(('.xlsx', '.xls'))]
+    csv_files = [f for f in os.listdir(input_dir) if f.endswith('.csv')]
+    print(f"Archivos encontrados: {len(excel_files)} Excel, {len(csv_files)} CSV")
+    return excel_files + csv_files
+
+
+def read_input_file(file_path: str) -> Optional[pd.DataFrame]:
+    """Lee un archivo Excel (pestaña DEFINITIVO o la primera) o CSV de ejecución presupuestal"""
+    file_name = os.path.basename(file_path)
+    df = None
+    
+    # Procesar archivos Excel
+    if file_name.endswith(('.xlsx', '.xls')):
+        # Verificar si existe la pestaña DEFINITIVO
+        xl_file = pd.ExcelFile(file_path)
+        
+        if 'DEFINITIVO' in xl_file.sheet_names:
+            df = pd.read_excel(file_path, sheet_name='DEFINITIVO')
+            print(f"Cargado desde pestaña 'DEFINITIVO' de '{file_name}' con forma {df.shape}")
+        else:
+            # Si no existe DEFINITIVO, usar la primera pestaña
+            first_sheet = xl_file.sheet_names[0]
+            df = pd.read_excel(file_path, sheet_name=first_sheet)
+            print(f"Pestaña 'DEFINITIVO' no encontrada en '{file_name}', usando '{first_sheet}' con forma {df.shape}")
+    
+    # Procesar archivos CSV (código original)
+    elif file_name.endswith('.csv'):
+        # Try different separators and encodings
+        separators = [',', ';', '\t']
+        encodings = ['utf-8', 'latin-1', 'cp1252']
+        
+        for encoding in encodings:
+            for sep in separators:
+                try:
+                    df = pd.read_csv(file_path, sep=sep, encoding=encoding, on_bad_lines='skip')
+                    if df.shape[1] > 1:  # Check if we have multiple columns
+                        break
+                except:
+                    continue
+            if df is not None and df.shape[1] > 1:
+                break
+        
+        if df is None or df.shape[1] == 1:
+            # Last resort: try automatic detection
+            df = pd.read_csv(file_path, sep=None, engine='python', encoding='utf-8', on_bad_lines='skip')
+        
+        print(f"Cargado CSV '{file_name}' con forma {df.shape}")
+    
+    if df is not None and not df.empty:
+        print(f"Columnas originales en '{file_name}': {df.columns.tolist()[:10]}...")  # Show first 10 columns
+        return df
+    
+    print(f"Advertencia: El archivo '{file_name}' está vacío o no se pudo cargar correctamente")
+    return None
+
+
 def load_excel_files(input_dir: str) -> Dict[str, pd.DataFrame]:
     """Carga todos los archivos Excel del directorio de entrada, específicamente la pestaña DEFINITIVO"""
     print(f"Cargando archivos Excel desde {input_dir}")
     
-    # Detectar archivos Excel y CSV
-    excel_files = [f for f in os.listdir(input_dir) if f.endswith(('.xlsx', '.xls'))]
-    csv_files = [f for f in os.listdir(input_dir) if f.endswith('.csv')]
-    
-    all_files = excel_files + csv_files
+    all_files = list_input_files(input_dir)
     dfs = {}
     
     if not all_files:
         print("No se encontraron archivos Excel (.xlsx, .xls) o CSV (.csv) en el directorio")
         return dfs
     
-    print(f"Archivos encontrados: {len(excel_files)} Excel, {len(csv_files)} CSV")
-    
     for file_name in tqdm(all_files, desc="Cargando archivos"):
         file_path = os.path.join(input_dir, file_name)
         try:
-            df = None
-            
-            # Procesar archivos Excel
-            if file_name.endswith(('.xlsx', '.xls')):
-                # Verificar si existe la pestaña DEFINITIVO
-                xl_file = pd.ExcelFile(file_path)
-                
-                if 'DEFINITIVO' in xl_file.sheet_names:
-                    df = pd.read_excel(file_path, sheet_name='DEFINITIVO')
-                    print(f"Cargado desde pestaña 'DEFINITIVO' de '{file_name}' con forma {df.shape}")
-                else:
-                    # Si no existe DEFINITIVO, usar la primera pestaña
-                    first_sheet = xl_file.sheet_names[0]
-                    df = pd.read_excel(file_path, sheet_name=first_sheet)
-                    print(f"Pestaña 'DEFINITIVO' no encontrada en '{file_name}', usando '{first_sheet}' con forma {df.shape}")
-            
-            # Procesar archivos CSV (código original)
-            elif file_name.endswith('.csv'):
-                # Try different separators and encodings
-                separators = [',', ';', '\t']
-                encodings = ['utf-8', 'latin-1', 'cp1252']
-                
-                for encoding in encodings:
-                    for sep in separators:
-                        try:
-                            df = pd.read_csv(file_path, sep=sep, encoding=encoding, on_bad_lines='skip')
-                            if df.shape[1] > 1:  # Check if we have multiple columns
-                                break
-                        except:
-                            continue
-                    if df is not None and df.shape[1] > 1:
-                        break
-                
-                if df is None or df.shape[1] == 1:
-                    # Last resort: try automatic detection
-                    df = pd.read_csv(file_path, sep=None, engine='python', encoding='utf-8', on_bad_lines='skip')
-                
-                print(f"Cargado CSV '{file_name}' con forma {df.shape}")
-            
-            if df is not None and not df.empty:
-                df_name = os.path.splitext(file_name)[0]
-                dfs[df_name] = df
-                print(f"Columnas originales en '{file_name}': {df.columns.tolist()[:10]}...")  # Show first 10 columns
-            else:
-                print(f"Advertencia: El archivo '{file_name}' está vacío o no se pudo cargar correctamente")
-                
+            df = read_input_file(file_path)
+            if df is not None:
+                dfs[os.path.splitext(file_name)[0]] = df
         except Exception as e:
             print(f"Error cargando '{file_name}': {e}")
     
@@ -381,6 +417,107 @@ def add_operational_data(dfs: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame
     return dfs
 
 
+def prepare_dataframes(dfs: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Aplica a cada archivo los pasos previos a la consolidación (preprocesado a datos operacionales)"""
+    dfs = preprocess_dataframes(dfs)
+    dfs = normalize_dataframes(dfs)
+    dfs = apply_column_mappings(dfs)
+    dfs = extract_bp_from_column(dfs)
+    dfs = remove_unnecessary_columns(dfs)
+    dfs = fill_missing_columns_with_reference(dfs)
+    dfs = add_operational_data(dfs)
+    return dfs
+
+
+# Cambiar al modificar cualquier paso de prepare_dataframes para invalidar la caché
+PARSED_CACHE_VERSION = 1
+
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula el hash SHA-256 del contenido de un archivo"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_prepared_dataframes(input_dir: str, cache_dir: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Carga y prepara cada archivo de entrada, reutilizando una caché Parquet por archivo.
+    
+    Cada archivo preparado se guarda como `<nombre>_<hash>.parquet`, con el hash del
+    contenido del archivo y la versión de la caché. En las ejecuciones mensuales solo
+    se leen y procesan los archivos nuevos o modificados; el resto se carga en formato
+    columnar. Sin `cache_dir` o sin pyarrow se procesan todos los archivos.
+    
+    Args:
+        input_dir: Directorio con los archivos Excel/CSV
+        cache_dir: Directorio de la caché Parquet (None para desactivarla)
+        
+    Returns:
+        Dict[str, pd.DataFrame]: DataFrames preparados por nombre de archivo (sin extensión)
+    """
+    print(f"Cargando archivos desde {input_dir}")
+    
+    all_files = list_input_files(input_dir)
+    dfs = {}
+    
+    if not all_files:
+        print("No se encontraron archivos Excel (.xlsx, .xls) o CSV (.csv) en el directorio")
+        return dfs
+    
+    use_cache = cache_dir is not None and pyarrow is not None
+    if cache_dir is not None and pyarrow is None:
+        print("Advertencia: pyarrow no está instalado, caché Parquet desactivada")
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    cache_hits = 0
+    for file_name in tqdm(all_files, desc="Cargando archivos"):
+        file_path = os.path.join(input_dir, file_name)
+        df_name = os.path.splitext(file_name)[0]
+        
+        try:
+            cache_path = None
+            if use_cache:
+                file_hash = compute_file_hash(file_path)[:16]
+                cache_path = os.path.join(cache_dir, f"{df_name}_{file_hash}_v{PARSED_CACHE_VERSION}.parquet")
+                
+                if os.path.exists(cache_path):
+                    dfs[df_name] = pd.read_parquet(cache_path)
+                    cache_hits += 1
+                    print(f"Cargado desde caché '{file_name}' con forma {dfs[df_name].shape}")
+                    continue
+            
+            df = read_input_file(file_path)
+            if df is None:
+                continue
+            
+            prepared = prepare_dataframes({df_name: df})[df_name]
+            dfs[df_name] = prepared
+            
+            if cache_path is not None:
+                # Eliminar versiones anteriores del mismo archivo
+                stale_pattern = re.compile(rf"{re.escape(df_name)}_[0-9a-f]{{16}}_v\d+\.parquet")
+                for old_file in os.listdir(cache_dir):
+                    if stale_pattern.fullmatch(old_file):
+                        os.remove(os.path.join(cache_dir, old_file))
+                try:
+                    prepared.to_parquet(cache_path, index=False)
+                except Exception as e:
+                    # Columnas con tipos mixtos no son serializables; el archivo se reprocesará
+                    print(f"Advertencia: no se pudo cachear '{file_name}': {e}")
+                    if os.path.exists(cache_path):
+                        os.remove(cache_path)
+                
+        except Exception as e:
+            print(f"Error cargando '{file_name}': {e}")
+    
+    print(f"Total de archivos cargados exitosamente: {len(dfs)} ({cache_hits} desde caché)")
+    return dfs
+
+
 def create_period_column(df: pd.DataFrame) -> pd.DataFrame:
     """Crea columna de período_corte en formato ISO 8601"""
     
@@ -556,15 +693,11 @@ def create_movimientos_presupuestales(df: pd.DataFrame) -> pd.DataFrame:
     
     # Buscar solo columnas específicas de movimientos (EXCLUIR ppto_disponible y columnas de ejecución)
     excluded_keywords = ['disponible', 'cdp', 'rpc', 'obligac', 'pagos', 'ejecucion', 'saldos', 'acumulado', 'total']
-    found_monetary = []
-    for col in df.columns:
-        col_lower = col.lower()
-        # Solo incluir si contiene palabras de movimientos Y NO contiene palabras de ejecución
-        is_movement = any(keyword in col_lower for keyword in ['ppto', 'presupuesto', 'inicial', 'modificado', 'adicion', 'reduccion', 'credito', 'aplazamiento'])
-        is_execution = any(keyword in col_lower for keyword in excluded_keywords)
-        
-        if is_movement and not is_execution:
-            found_monetary.append(col)
+    # Solo incluir si contiene palabras de movimientos Y NO contiene palabras de ejecución
+    movement_keywords = ['ppto', 'presupuesto', 'inicial', 'modificado', 'adicion', 'reduccion', 'credito', 'aplazamiento']
+    found_monetary = list(detect_keyword_columns(
+        tuple(df.columns), tuple(movement_keywords), tuple(excluded_keywords)
+    ))
     
     print(f"Columnas monetarias encontradas: {found_monetary}")
     
@@ -649,11 +782,7 @@ def create_ejecucion_presupuestal(df: pd.DataFrame) -> pd.DataFrame:
         'acumulado', 'total'
     ]
     
-    found_execution = []
-    for col in df.columns:
-        col_lower = col.lower()
-        if any(keyword in col_lower for keyword in execution_keywords):
-            found_execution.append(col)
+    found_execution = list(detect_keyword_columns(tuple(df.columns), tuple(execution_keywords)))
     
     # Asegurar que ppto_disponible esté incluido si existe
     if 'ppto_disponible' in df.columns and 'ppto_disponible' not in found_execution:
@@ -783,31 +912,13 @@ def main():
     current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Directorio raíz del proyecto
     input_dir = os.path.join(current_dir, "app_inputs", "ejecucion_presupuestal")
     output_dir = os.path.join(current_dir, "transformation_app", "app_outputs", "ejecucion_presupuestal_outputs")
+    cache_dir = os.path.join(output_dir, "parsed_cache")
     
     try:
-        # 1. Cargar archivos Excel y CSV
-        dfs = load_excel_files(input_dir)
-        
-        # 2. Preprocesar DataFrames
-        dfs = preprocess_dataframes(dfs)
-        
-        # 3. Normalizar nombres de columnas
-        dfs = normalize_dataframes(dfs)
-        
-        # 4. Aplicar mapeos de columnas
-        dfs = apply_column_mappings(dfs)
-        
-        # 4.1. Extraer valores BP de la columna 'BP'
-        dfs = extract_bp_from_column(dfs)
-        
-        # 5. Eliminar columnas innecesarias
-        dfs = remove_unnecessary_columns(dfs)
-        
-        # 6. Completar columnas faltantes
-        dfs = fill_missing_columns_with_reference(dfs)
-        
-        # 7. Añadir datos operacionales
-        dfs = add_operational_data(dfs)
+        # 1-7. Cargar archivos Excel y CSV y prepararlos (preprocesado, normalización,
+        # mapeos, BP, columnas innecesarias y datos operacionales). Los archivos sin
+        # cambios se leen de la caché Parquet.
+        dfs = load_prepared_dataframes(input_dir, cache_dir)
         
         # 8. Consolidar DataFrames
         df_consolidado = consolidate_dataframes(dfs)
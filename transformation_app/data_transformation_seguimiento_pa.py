@@ -294,278 +294,172 @@ def read_excel_file(file_path: str) -> Tuple[Optional[pd.DataFrame], str]:
         return None, periodo_corte
 
 
+# Header resolution rules for detailed files, evaluated once per sheet.
+# 'first' groups take the first normalized column matching each field.
+# 'last' groups assign every column to the first field of the group it matches
+# and keep the last column assigned to each field.
+DETAILED_FILE_FIELD_GROUPS = [
+    ('first', {'bpin': lambda col: 'bpin' in col}),
+    ('first', {'cod_centro_gestor': lambda col: 'centro_gestor' in col}),
+    ('first', {'cod_actividad': lambda col: 'cod_actividad' in col}),
+    ('first', {'cod_producto': lambda col: 'cod_producto' in col or 'producto_mga' in col}),
+    ('last', {
+        'cod_pd_lvl_1': lambda col: 'nivel_1_pd_cod' in col,
+        'cod_pd_lvl_2': lambda col: 'nivel_2_pd_cod' in col,
+        'cod_pd_lvl_3': lambda col: 'nivel_3_pd_cod' in col,
+    }),
+    ('first', {'subdireccion_subsecretaria': lambda col: 'subdireccion' in col or 'subsecretaria' in col}),
+    ('first', {'nombre_actividad': lambda col: 'nombre_actividad' in col}),
+    ('first', {'descripcion_actividad': lambda col: 'explicacion_actividad' in col}),
+    ('last', {
+        'ppto_inicial_actividad': lambda col: 'presupuesto_inicial' in col,
+        'ppto_modificado_actividad': lambda col: 'presupuesto_modificado' in col,
+        'ejecucion_actividad': lambda col: col == 'ejecucion',
+        'obligado_actividad': lambda col: col == 'obligado',
+        'pagos_actividad': lambda col: col == 'pagos',
+    }),
+    ('last', {
+        'cantidad_programada_actividad': lambda col: 'cantidad_programada_actividad' in col,
+        'ponderacion_actividad': lambda col: 'ponderacion_de_actividad' in col,
+        'avance_actividad': lambda col: 'pct_de_avance_actividad_trimestre_i' in col,
+        'avance_real_actividad': lambda col: 'pct_de_avance_actividad_trimestre_ii' in col,
+        'avance_actividad_acumulado': lambda col: 'pct_avance_proyecto' in col,
+    }),
+    ('last', {
+        'fecha_inicio_actividad': lambda col: 'fecha_inicio' in col,
+        'fecha_fin_actividad': lambda col: 'fecha_fin' in col,
+    }),
+    ('first', {'nombre_producto': lambda col: 'nombre_producto' in col}),
+    ('first', {'tipo_meta_producto': lambda col: 'meta_pd' in col or 'denominacion_meta' in col}),
+    ('first', {'descripcion_avance_producto': lambda col: 'explicacion_producto' in col}),
+    ('last', {
+        'cantidad_programada_producto': lambda col: 'cantidad_programada_producto' in col,
+        'ponderacion_producto': lambda col: 'ponderacion_producto' in col,
+        'avance_producto': lambda col: 'ejecucion_fisica_trimestre_i' in col,
+        'ejecucion_fisica_producto': lambda col: 'ejecucion_fisica_trimestre_ii' in col,
+        'avance_real_producto': lambda col: 'pct_de_avance_producto' in col and 'pct_de_avance_producto_' not in col,
+        'avance_producto_acumulado': lambda col: 'pct_de_avance_producto_1' in col,
+        'ejecucion_ppto_producto': lambda col: col == 'ejecucion',
+    }),
+]
+
+# Field kinds for detailed files: integer codes, free text and dates; everything else is numeric
+DETAILED_FILE_INTEGER_FIELDS = ['bpin', 'cod_centro_gestor', 'cod_actividad', 'cod_producto',
+                                'cod_pd_lvl_1', 'cod_pd_lvl_2', 'cod_pd_lvl_3']
+DETAILED_FILE_TEXT_FIELDS = ['subdireccion_subsecretaria', 'nombre_actividad', 'descripcion_actividad',
+                             'nombre_producto', 'tipo_meta_producto', 'descripcion_avance_producto']
+DETAILED_FILE_DATE_FIELDS = ['fecha_inicio_actividad', 'fecha_fin_actividad']
+
+
+def resolve_detailed_columns(columns) -> Dict[str, Optional[str]]:
+    """Map each logical field of a detailed file to its physical (normalized) column, or None."""
+    resolved = {}
+    
+    for mode, rules in DETAILED_FILE_FIELD_GROUPS:
+        for field in rules:
+            resolved[field] = None
+        
+        for col in columns:
+            for field, matches in rules.items():
+                if matches(col):
+                    if mode == 'last' or resolved[field] is None:
+                        resolved[field] = col
+                    # A column only feeds the first field of its group
+                    break
+    
+    return resolved
+
+
+def extract_detailed_fields(df: pd.DataFrame, resolved: Dict[str, Optional[str]]) -> pd.DataFrame:
+    """Extract and clean every logical field of a detailed file as a whole column."""
+    fields = {}
+    
+    for field, col in resolved.items():
+        if field in DETAILED_FILE_INTEGER_FIELDS:
+            cleaner, default = clean_integer_value, None
+        elif field in DETAILED_FILE_TEXT_FIELDS:
+            cleaner, default = (lambda value: str(value) if pd.notna(value) else None), None
+        elif field in DETAILED_FILE_DATE_FIELDS:
+            cleaner, default = clean_date_value, None
+        else:
+            cleaner, default = clean_numeric_value, 0.0
+        
+        if col is None:
+            fields[field] = pd.Series([default] * len(df), index=df.index, dtype=object)
+        else:
+            # Duplicated headers resolve to the first physical column
+            source = df[col]
+            if isinstance(source, pd.DataFrame):
+                source = source.iloc[:, 0]
+            # Keep an object column so integer codes are not upcast to float next to None
+            fields[field] = pd.Series([cleaner(value) for value in source.tolist()],
+                                      index=df.index, dtype=object)
+    
+    return pd.DataFrame(fields, index=df.index)
+
+
 def process_detailed_file(df: pd.DataFrame, periodo_corte: str, filename: str) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """Process detailed Excel file and extract activities, products, and summary data."""
+    """
+    Process detailed Excel file and extract activities, products, and summary data.
+    
+    Logical fields are resolved to physical columns once per sheet and then
+    cleaned column by column, so the cost is linear in the number of rows.
+    """
     
     # Normalize column names
     df.columns = normalize_column_names(df.columns)
     
     print(f"Normalized columns for {filename}: {list(df.columns)[:10]}...")
     
-    # Column mapping for detailed files
-    column_mapping = {
-        'cod_centro_gestor': ['cod_centro_gestor', 'codigo_centro_gestor', 'centro_gestor'],
-        'bpin': ['cod_bpin', 'codigo_bpin', 'bpin'],
-        'cod_pd_lvl_1': ['nivel_1_pd_cod', 'cod_nivel_1', 'nivel1_cod'],
-        'cod_pd_lvl_2': ['nivel_2_pd_cod', 'cod_nivel_2', 'nivel2_cod'],
-        'cod_pd_lvl_3': ['nivel_3_pd_cod', 'cod_nivel_3', 'nivel3_cod'],
-        'cod_actividad': ['cod_actividad', 'codigo_actividad'],
-        'nombre_actividad': ['nombre_actividad'],
-        'cod_producto': ['cod_producto_mga', 'codigo_producto_mga', 'cod_producto'],
-        'nombre_producto': ['nombre_producto_mga', 'nombre_producto'],
-        'subdireccion_subsecretaria': ['subdireccion___subsecretaria', 'subdireccion_subsecretaria'],
-        'ponderacion_actividad': ['ponderacion_de_actividad', 'ponderacion_actividad'],
-        'avance_actividad': ['pct_de_avance_actividad_trimestre_i', 'avance_actividad_trim_1'],
-        'avance_real_actividad': ['pct_de_avance_actividad_trimestre_ii', 'avance_actividad_trim_2'],
-        'avance_actividad_acumulado': ['pct_avance_proyecto', 'avance_proyecto'],
-        'cantidad_programada_producto': ['cantidad_programada_producto'],
-        'ponderacion_producto': ['ponderacion_producto'],
-        'avance_producto': ['ejecucion_fisica_trimestre_i', 'avance_producto_trim_1'],
-        'ejecucion_fisica_producto': ['ejecucion_fisica_trimestre_ii', 'avance_producto_trim_2'],
-        'avance_real_producto': ['pct_de_avance_producto', 'avance_producto'],
-        'avance_producto_acumulado': ['pct_de_avance_producto_1', 'avance_producto_acum'],
-        'ejecucion_ppto_producto': ['ejecucion', 'ejecucion_presupuestal'],
-        'ppto_inicial_actividad': ['presupuesto_inicial'],
-        'ppto_modificado_actividad': ['presupuesto_modificado'],
-        'ejecucion_actividad': ['ejecucion'],
-        'obligado_actividad': ['obligado'],
-        'pagos_actividad': ['pagos'],
-        'fecha_inicio_actividad': ['fecha_inicio'],
-        'fecha_fin_actividad': ['fecha_fin'],
-        'tipo_meta_producto': ['meta_pd', 'denominacion_meta_pd'],
-        'descripcion_avance_producto': ['explicacion_producto_trim_i'],
-        'descripcion_actividad': ['explicacion_actividad_trim_i']
-    }
-    
-    # Create standardized dataframes
-    activities_data = []
-    products_data = []
-    summary_data = []
-    
-    # Process each row
-    for _, row in df.iterrows():
-        # Skip rows where BPIN is missing
-        bpin_val = None
-        for col in df.columns:
-            if any(keyword in col for keyword in ['bpin', 'cod_bpin']):
-                bpin_val = clean_integer_value(row[col])
-                break
-        
-        if bpin_val is None:
-            continue
-        
-        # Extract common fields
-        cod_centro_gestor = None
-        for col in df.columns:
-            if any(keyword in col for keyword in ['cod_centro_gestor', 'centro_gestor']):
-                cod_centro_gestor = clean_integer_value(row[col])
-                break
-        
-        cod_actividad = None
-        for col in df.columns:
-            if 'cod_actividad' in col:
-                cod_actividad = clean_integer_value(row[col])
-                break
-        
-        cod_producto = None
-        for col in df.columns:
-            if any(keyword in col for keyword in ['cod_producto', 'producto_mga']):
-                cod_producto = clean_integer_value(row[col])
-                break
-        
-        # Extract level codes
-        cod_pd_lvl_1 = None
-        cod_pd_lvl_2 = None
-        cod_pd_lvl_3 = None
-        for col in df.columns:
-            if 'nivel_1_pd_cod' in col:
-                cod_pd_lvl_1 = clean_integer_value(row[col])
-            elif 'nivel_2_pd_cod' in col:
-                cod_pd_lvl_2 = clean_integer_value(row[col])
-            elif 'nivel_3_pd_cod' in col:
-                cod_pd_lvl_3 = clean_integer_value(row[col])
-        
-        subdireccion = None
-        for col in df.columns:
-            if 'subdireccion' in col or 'subsecretaria' in col:
-                subdireccion = str(row[col]) if pd.notna(row[col]) else None
-                break
-        
-        # Create activities record
-        if cod_actividad is not None:
-            nombre_actividad = None
-            for col in df.columns:
-                if 'nombre_actividad' in col:
-                    nombre_actividad = str(row[col]) if pd.notna(row[col]) else None
-                    break
-            
-            descripcion_actividad = None
-            for col in df.columns:
-                if 'explicacion_actividad' in col:
-                    descripcion_actividad = str(row[col]) if pd.notna(row[col]) else None
-                    break
-            
-            # Extract activity financial data
-            ppto_inicial_actividad = 0.0
-            ppto_modificado_actividad = 0.0
-            ejecucion_actividad = 0.0
-            obligado_actividad = 0.0
-            pagos_actividad = 0.0
-            
-            for col in df.columns:
-                if 'presupuesto_inicial' in col:
-                    ppto_inicial_actividad = clean_numeric_value(row[col])
-                elif 'presupuesto_modificado' in col:
-                    ppto_modificado_actividad = clean_numeric_value(row[col])
-                elif col == 'ejecucion':
-                    ejecucion_actividad = clean_numeric_value(row[col])
-                elif col == 'obligado':
-                    obligado_actividad = clean_numeric_value(row[col])
-                elif col == 'pagos':
-                    pagos_actividad = clean_numeric_value(row[col])
-            
-            # Extract activity progress data
-            cantidad_programada_actividad = 0.0
-            avance_actividad = 0.0
-            avance_real_actividad = 0.0
-            avance_actividad_acumulado = 0.0
-            ponderacion_actividad = 0.0
-            
-            for col in df.columns:
-                if 'cantidad_programada_actividad' in col:
-                    cantidad_programada_actividad = clean_numeric_value(row[col])
-                elif 'ponderacion_de_actividad' in col:
-                    ponderacion_actividad = clean_numeric_value(row[col])
-                elif 'pct_de_avance_actividad_trimestre_i' in col:
-                    avance_actividad = clean_numeric_value(row[col])
-                elif 'pct_de_avance_actividad_trimestre_ii' in col:
-                    avance_real_actividad = clean_numeric_value(row[col])
-                elif 'pct_avance_proyecto' in col:
-                    avance_actividad_acumulado = clean_numeric_value(row[col])
-            
-            # Extract dates
-            fecha_inicio_actividad = None
-            fecha_fin_actividad = None
-            for col in df.columns:
-                if 'fecha_inicio' in col:
-                    fecha_inicio_actividad = clean_date_value(row[col])
-                elif 'fecha_fin' in col:
-                    fecha_fin_actividad = clean_date_value(row[col])
-            
-            activities_data.append({
-                'bpin': bpin_val,
-                'cod_actividad': cod_actividad,
-                'cod_centro_gestor': cod_centro_gestor,
-                'nombre_actividad': nombre_actividad,
-                'descripcion_actividad': descripcion_actividad,
-                'periodo_corte': periodo_corte,
-                'fecha_inicio_actividad': fecha_inicio_actividad,
-                'fecha_fin_actividad': fecha_fin_actividad,
-                'ppto_inicial_actividad': ppto_inicial_actividad,
-                'ppto_modificado_actividad': ppto_modificado_actividad,
-                'ejecucion_actividad': ejecucion_actividad,
-                'obligado_actividad': obligado_actividad,
-                'pagos_actividad': pagos_actividad,
-                'cantidad_programada_actividad': cantidad_programada_actividad,
-                'avance_actividad': avance_actividad,
-                'avance_real_actividad': avance_real_actividad,
-                'avance_actividad_acumulado': avance_actividad_acumulado,
-                'ponderacion_actividad': ponderacion_actividad
-            })
-        
-        # Create products record
-        if cod_producto is not None:
-            nombre_producto = None
-            for col in df.columns:
-                if 'nombre_producto' in col:
-                    nombre_producto = str(row[col]) if pd.notna(row[col]) else None
-                    break
-            
-            tipo_meta_producto = None
-            for col in df.columns:
-                if 'meta_pd' in col or 'denominacion_meta' in col:
-                    tipo_meta_producto = str(row[col]) if pd.notna(row[col]) else None
-                    break
-            
-            descripcion_avance_producto = None
-            for col in df.columns:
-                if 'explicacion_producto' in col:
-                    descripcion_avance_producto = str(row[col]) if pd.notna(row[col]) else None
-                    break
-            
-            # Extract product metrics
-            cantidad_programada_producto = 0.0
-            ponderacion_producto = 0.0
-            avance_producto = 0.0
-            ejecucion_fisica_producto = 0.0
-            avance_real_producto = 0.0
-            avance_producto_acumulado = 0.0
-            ejecucion_ppto_producto = 0.0
-            
-            for col in df.columns:
-                if 'cantidad_programada_producto' in col:
-                    cantidad_programada_producto = clean_numeric_value(row[col])
-                elif 'ponderacion_producto' in col:
-                    ponderacion_producto = clean_numeric_value(row[col])
-                elif 'ejecucion_fisica_trimestre_i' in col:
-                    avance_producto = clean_numeric_value(row[col])
-                elif 'ejecucion_fisica_trimestre_ii' in col:
-                    ejecucion_fisica_producto = clean_numeric_value(row[col])
-                elif 'pct_de_avance_producto' in col and 'pct_de_avance_producto_' not in col:
-                    avance_real_producto = clean_numeric_value(row[col])
-                elif 'pct_de_avance_producto_1' in col:
-                    avance_producto_acumulado = clean_numeric_value(row[col])
-                elif col == 'ejecucion':
-                    ejecucion_ppto_producto = clean_numeric_value(row[col])
-            
-            products_data.append({
-                'bpin': bpin_val,
-                'cod_producto': cod_producto,
-                'cod_producto_mga': cod_producto,  # Same value
-                'nombre_producto': nombre_producto,
-                'tipo_meta_producto': tipo_meta_producto,
-                'descripcion_avance_producto': descripcion_avance_producto,
-                'periodo_corte': periodo_corte,
-                'cantidad_programada_producto': cantidad_programada_producto,
-                'ponderacion_producto': ponderacion_producto,
-                'avance_producto': avance_producto,
-                'ejecucion_fisica_producto': ejecucion_fisica_producto,
-                'avance_real_producto': avance_real_producto,
-                'avance_producto_acumulado': avance_producto_acumulado,
-                'ejecucion_ppto_producto': ejecucion_ppto_producto
-            })
-        
-        # Create summary record combining activity and product data
-        # Get activity data - using variables already defined above
-        cant_prog_actividad = cantidad_programada_actividad
-        porcentaje_avance_actividad = ponderacion_actividad
-        ejecucion_fisica_actividad = 0.0  # Not available in this format
-        porcentaje_avance_fisico_acum = avance_real_actividad
-        
-        summary_data.append({
-            'bpin': bpin_val,
-            'cod_actividad': cod_actividad,
-            'cod_producto': cod_producto,
-            'periodo_corte': periodo_corte,
-            'cant_prog_actividad': cant_prog_actividad,
-            'porcentaje_avance_actividad': porcentaje_avance_actividad,
-            'avance_actividad': avance_actividad,
-            'ejecucion_fisica_actividad': ejecucion_fisica_actividad,
-            'porcentaje_avance_fisico_acum': porcentaje_avance_fisico_acum,
-            'avance_actividad_acumulado': avance_actividad_acumulado,
-            'cantidad_programada_producto': cantidad_programada_producto,
-            'ponderacion_producto': ponderacion_producto,
-            'avance_producto': avance_producto,
-            'ejecucion_fisica_producto': ejecucion_fisica_producto,
-            'avance_real_producto': avance_real_producto,
-            'avance_producto_acumulado': avance_producto_acumulado,
-            'ejecucion_ppto_producto': ejecucion_ppto_producto
-        })
-    
-    # Convert to DataFrames
-    df_activities = pd.DataFrame(activities_data) if activities_data else pd.DataFrame()
-    df_products = pd.DataFrame(products_data) if products_data else pd.DataFrame()
-    df_summary = pd.DataFrame(summary_data) if summary_data else pd.DataFrame()
+    # Resolve logical fields to physical columns once for this sheet
+    resolved = resolve_detailed_columns(df.columns)
+    missing = [field for field, col in resolved.items() if col is None]
+    if missing:
+        print(f"Fields without a matching column in {filename}: {missing}")
+    
+    # Skip rows where BPIN is missing before cleaning the remaining fields
+    bpin_values = extract_detailed_fields(df, {'bpin': resolved['bpin']})['bpin']
+    fields = extract_detailed_fields(df.loc[bpin_values.notna()], resolved)
+    fields['periodo_corte'] = periodo_corte
+    
+    def build_output(mask: pd.Series, columns: List[str]) -> pd.DataFrame:
+        if not mask.any():
+            return pd.DataFrame()
+        # Rebuild from column lists so dtypes are inferred as for list-of-dict records
+        return pd.DataFrame(fields.loc[mask, columns].to_dict('list'), columns=columns)
+    
+    # Activities records
+    df_activities = build_output(fields['cod_actividad'].notna(), [
+        'bpin', 'cod_actividad', 'cod_centro_gestor', 'nombre_actividad', 'descripcion_actividad',
+        'periodo_corte', 'fecha_inicio_actividad', 'fecha_fin_actividad',
+        'ppto_inicial_actividad', 'ppto_modificado_actividad', 'ejecucion_actividad',
+        'obligado_actividad', 'pagos_actividad', 'cantidad_programada_actividad',
+        'avance_actividad', 'avance_real_actividad', 'avance_actividad_acumulado',
+        'ponderacion_actividad'
+    ])
+    
+    # Products records
+    fields['cod_producto_mga'] = fields['cod_producto']  # Same value
+    df_products = build_output(fields['cod_producto'].notna(), [
+        'bpin', 'cod_producto', 'cod_producto_mga', 'nombre_producto', 'tipo_meta_producto',
+        'descripcion_avance_producto', 'periodo_corte', 'cantidad_programada_producto',
+        'ponderacion_producto', 'avance_producto', 'ejecucion_fisica_producto',
+        'avance_real_producto', 'avance_producto_acumulado', 'ejecucion_ppto_producto'
+    ])
+    
+    # Summary records combining activity and product data
+    fields['cant_prog_actividad'] = fields['cantidad_programada_actividad']
+    fields['porcentaje_avance_actividad'] = fields['ponderacion_actividad']
+    fields['ejecucion_fisica_actividad'] = 0.0  # Not available in this format
+    fields['porcentaje_avance_fisico_acum'] = fields['avance_real_actividad']
+    df_summary = build_output(pd.Series(True, index=fields.index), [
+        'bpin', 'cod_actividad', 'cod_producto', 'periodo_corte', 'cant_prog_actividad',
+        'porcentaje_avance_actividad', 'avance_actividad', 'ejecucion_fisica_actividad',
+        'porcentaje_avance_fisico_acum', 'avance_actividad_acumulado',
+        'cantidad_programada_producto', 'ponderacion_producto', 'avance_producto',
+        'ejecucion_fisica_producto', 'avance_real_producto', 'avance_producto_acumulado',
+        'ejecucion_ppto_producto'
+    ])
     
     return df_activities, df_products, df_summary
 
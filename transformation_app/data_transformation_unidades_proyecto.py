@@ -32,7 +32,7 @@ import re
 import unicodedata
 from typing import Optional, Dict, List, Any, Tuple, Union, Callable
 from datetime import datetime, timedelta
-from functools import reduce, partial, wraps
+from functools import reduce, partial, wraps, lru_cache
 from pathlib import Path
 from shapely.geometry import Point
 from difflib import get_close_matches
@@ -44,6 +44,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'extraction_app'))
 # Import geometry coordinate extractor
 from utils.geometry_coordinate_extractor import extract_lat_lon_from_geometry
 
+# Per-phase metrics (no-op unless the pipeline opened a measured run)
+from utils.pipeline_metrics import span
+
 # Load standard categories from JSON
 def load_standard_categories() -> Dict[str, List[str]]:
     """Load standard categories from JSON file."""
@@ -1463,16 +1466,28 @@ def consolidate_geometry_by_upid(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     return result_gdf
 
 
-def perform_spatial_intersection(gdf: gpd.GeoDataFrame, basemap_name: str, output_column: str) -> gpd.GeoDataFrame:
-    """Perform spatial intersection with basemap."""
-    current_dir = Path(__file__).parent.parent
-    basemap_path = current_dir / 'basemaps' / f'{basemap_name}.geojson'
+@lru_cache(maxsize=None)
+def load_basemap(basemap_name: str) -> Optional[gpd.GeoDataFrame]:
+    """Load basemaps/<basemap_name>.geojson once per process.
+    
+    Warm Cloud Function instances keep the module imported, so later
+    invocations reuse the loaded basemap. Callers must not modify it.
+    """
+    basemap_path = Path(__file__).parent.parent / 'basemaps' / f'{basemap_name}.geojson'
     
     if not basemap_path.exists():
         print(f"⚠ Basemap not found: {basemap_path}")
-        return gdf
+        return None
     
-    basemap_gdf = gpd.read_file(basemap_path)
+    return gpd.read_file(basemap_path)
+
+
+def perform_spatial_intersection(gdf: gpd.GeoDataFrame, basemap_name: str, output_column: str) -> gpd.GeoDataFrame:
+    """Perform spatial intersection with basemap."""
+    basemap_gdf = load_basemap(basemap_name)
+    
+    if basemap_gdf is None:
+        return gdf
     
     if gdf.crs != basemap_gdf.crs:
         basemap_gdf = basemap_gdf.to_crs(gdf.crs)
@@ -1569,22 +1584,18 @@ def find_best_match(value, standard_values, threshold=0.6):
 
 def normalize_administrative_values(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     """Normalize all comuna and barrio columns to match standard basemap values exactly."""
-    current_dir = Path(__file__).parent.parent
-    
     # Load standard values from basemaps
-    barrios_path = current_dir / 'basemaps' / 'barrios_veredas.geojson'
-    comunas_path = current_dir / 'basemaps' / 'comunas_corregimientos.geojson'
+    barrios_gdf = load_basemap('barrios_veredas')
+    comunas_gdf = load_basemap('comunas_corregimientos')
     
     standard_barrios = []
     standard_comunas = []
     
-    if barrios_path.exists():
-        barrios_gdf = gpd.read_file(barrios_path)
+    if barrios_gdf is not None:
         standard_barrios = barrios_gdf['barrio_vereda'].dropna().unique().tolist()
         print(f"  Loaded {len(standard_barrios)} standard barrios/veredas from basemap")
     
-    if comunas_path.exists():
-        comunas_gdf = gpd.read_file(comunas_path)
+    if comunas_gdf is not None:
         standard_comunas = comunas_gdf['comuna_corregimiento'].dropna().unique().tolist()
         print(f"  Loaded {len(standard_comunas)} standard comunas/corregimientos from basemap")
     
@@ -2782,7 +2793,6 @@ def _process_unidades_proyecto_dataframe(df: pd.DataFrame) -> gpd.GeoDataFrame:
     # Phase 1: Basic data cleaning and transformation
     print("\n[Phase 1: Basic Transformation]")
     basic_pipeline = compose(
-        lambda df: generate_upid_for_records(df),
         lambda df: add_computed_columns(df),
         lambda df: clean_data_types(df),
         lambda df: normalize_estado_values(df),
@@ -2792,7 +2802,14 @@ def _process_unidades_proyecto_dataframe(df: pd.DataFrame) -> gpd.GeoDataFrame:
         lambda df: normalize_categorical_column(df, 'fuente_financiacion', threshold=0.75),
         lambda df: apply_title_case_to_text_fields(df)
     )
-    df_transformed = basic_pipeline(df_clean)
+    with span('transform.basic', filas_entrada=len(df_clean)) as phase:
+        df_transformed = basic_pipeline(df_clean)
+        phase.filas(salida=len(df_transformed))
+    
+    # compose() applies right to left: UPID generation (clustering) runs last
+    with span('transform.upid_clustering', filas_entrada=len(df_transformed)) as phase:
+        df_transformed = generate_upid_for_records(df_transformed)
+        phase.filas(salida=len(df_transformed))
     
     # NOTA: NO consolidar coordenadas aquí porque ya se consolidaron en agrupar_datos_geoespacial
     # durante generate_upid_for_records. Una segunda consolidación destruye las coords originales.
@@ -2801,39 +2818,49 @@ def _process_unidades_proyecto_dataframe(df: pd.DataFrame) -> gpd.GeoDataFrame:
     
     # Phase 2: Geospatial processing
     print("\n[Phase 2: Geospatial Processing]")
-    gdf = convert_to_geodataframe(df_transformed)
-    
-    # CRITICAL FIX: Extract lat/lon from geometry if not present in properties
-    # This handles cases where GeoJSON has geometry but no explicit lat/lon fields
-    if isinstance(gdf, gpd.GeoDataFrame) and 'geometry' in gdf.columns:
-        print("\n[Phase 2.1: Extracting Coordinates from Geometry]")
-        gdf = extract_lat_lon_from_geometry(gdf)
+    with span('transform.geospatial', filas_entrada=len(df_transformed)) as phase:
+        gdf = convert_to_geodataframe(df_transformed)
+        
+        # CRITICAL FIX: Extract lat/lon from geometry if not present in properties
+        # This handles cases where GeoJSON has geometry but no explicit lat/lon fields
+        if isinstance(gdf, gpd.GeoDataFrame) and 'geometry' in gdf.columns:
+            print("\n[Phase 2.1: Extracting Coordinates from Geometry]")
+            gdf = extract_lat_lon_from_geometry(gdf)
+        
+        if isinstance(gdf, gpd.GeoDataFrame):
+            gdf = correct_coordinate_formats(gdf)
+            gdf = create_final_geometry(gdf)
+        phase.filas(salida=len(gdf))
     
     if isinstance(gdf, gpd.GeoDataFrame):
-        gdf = correct_coordinate_formats(gdf)
-        gdf = create_final_geometry(gdf)
-        
         # Phase 3: Spatial intersections
         print("\n[Phase 3: Spatial Intersections]")
-        gdf = perform_spatial_intersection(gdf, 'barrios_veredas', 'barrio_vereda_2')
-        gdf = perform_spatial_intersection(gdf, 'comunas_corregimientos', 'comuna_corregimiento_2')
+        for basemap_name, output_column in (('barrios_veredas', 'barrio_vereda_2'),
+                                            ('comunas_corregimientos', 'comuna_corregimiento_2')):
+            with span('transform.spatial_join', filas_entrada=len(gdf), basemap=basemap_name) as phase:
+                gdf = perform_spatial_intersection(gdf, basemap_name, output_column)
+                phase.filas(salida=len(gdf))
         
         # Phase 4: Normalization and validation
         print("\n[Phase 4: Normalization & Validation]")
-        gdf = normalize_administrative_values(gdf)
-        gdf = create_validation_column(gdf)
-    
-    # Phase 5: Date standardization
-    print("\n[Phase 5: Date Standardization]")
-    gdf = standardize_dates(gdf)
+        with span('transform.validation', filas_entrada=len(gdf)) as phase:
+            gdf = normalize_administrative_values(gdf)
+            gdf = create_validation_column(gdf)
+            phase.filas(salida=len(gdf))
     
-    # Phase 5.4: Infer missing categorical values
-    print("\n[Phase 5.4: Inferencia de Valores Categóricos]")
-    gdf = infer_missing_categorical_values(gdf)
-    
-    # Phase 5.5: Add frente_activo column
-    print("\n[Phase 5.5: Frente Activo]")
-    gdf = add_frente_activo(gdf)
+    with span('transform.dates_categories', filas_entrada=len(gdf)) as phase:
+        # Phase 5: Date standardization
+        print("\n[Phase 5: Date Standardization]")
+        gdf = standardize_dates(gdf)
+        
+        # Phase 5.4: Infer missing categorical values
+        print("\n[Phase 5.4: Inferencia de Valores Categóricos]")
+        gdf = infer_missing_categorical_values(gdf)
+        
+        # Phase 5.5: Add frente_activo column
+        print("\n[Phase 5.5: Frente Activo]")
+        gdf = add_frente_activo(gdf)
+        phase.filas(salida=len(gdf))
     
     # Phase 6: Export and metrics
     print("\n[Phase 6: Export & Metrics]")
@@ -2841,11 +2868,12 @@ def _process_unidades_proyecto_dataframe(df: pd.DataFrame) -> gpd.GeoDataFrame:
     output_dir = current_dir / 'app_outputs'
     logs_dir = output_dir / 'logs'
     
-    output_file = export_to_geojson(gdf, output_dir)
-    metrics, metrics_file = generate_metrics_log(gdf, df, logs_dir)
-    
-    # Generate comprehensive analysis and recommendations report
-    report_files = generate_analysis_report(metrics_file, gdf)
+    with span('transform.export', filas_entrada=len(gdf)):
+        output_file = export_to_geojson(gdf, output_dir)
+        metrics, metrics_file = generate_metrics_log(gdf, df, logs_dir)
+        
+        # Generate comprehensive analysis and recommendations report
+        report_files = generate_analysis_report(metrics_file, gdf)
     
     print(f"\n[OK] Processing completed: {len(gdf)} rows, {len(gdf.columns)} columns")
     print(f"[OK] Quality score: {metrics['summary']['data_quality_score']:.1f}%")
@@ -2862,7 +2890,8 @@ def _process_unidades_proyecto_dataframe(df: pd.DataFrame) -> gpd.GeoDataFrame:
 def transform_and_save_unidades_proyecto(
     data: Optional[pd.DataFrame] = None, 
     use_extraction: bool = True,
-    upload_to_s3: bool = True
+    upload_to_s3: bool = True,
+    s3_uploader: Optional[Any] = None
 ) -> Optional[gpd.GeoDataFrame]:
     """
     Main function to transform and save unidades de proyecto data.
@@ -2872,6 +2901,8 @@ def transform_and_save_unidades_proyecto(
         data: Optional DataFrame with extracted data (if provided, skips extraction)
         use_extraction: If True and data is None, extracts from Google Drive
         upload_to_s3: If True, uploads outputs to S3 after transformation
+        s3_uploader: Already initialized S3Uploader to reuse (created from
+            aws_credentials.json when not provided)
     """
     try:
         print("="*80)
@@ -2903,12 +2934,14 @@ def transform_and_save_unidades_proyecto(
                     print("UPLOADING OUTPUTS TO S3")
                     print("="*80)
                     
-                    # Import S3Uploader
-                    sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
-                    from s3_uploader import S3Uploader
-                    
-                    # Initialize uploader
-                    uploader = S3Uploader("aws_credentials.json")
+                    uploader = s3_uploader
+                    if uploader is None:
+                        # Import S3Uploader
+                        sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+                        from s3_uploader import S3Uploader
+                        
+                        # Initialize uploader
+                        uploader = S3Uploader("aws_credentials.json")
                     
                     # Upload all outputs
                     current_dir = Path(__file__).parent.parent
@@ -10,6 +10,7 @@ import json
 import geopandas as gpd
 import pandas as pd
 import numpy as np
+import shapely
 from pathlib import Path
 
 # Add project root to path
@@ -670,20 +671,53 @@ def add_frente_activo(gdf):
 # GENERACIÓN DEL GEOJSON
 # ============================================================================
 
+# Propiedades exportadas por feature, en orden
+GEOJSON_PROPERTIES = [
+    "upid", "geometry_type", "has_geometry", "centros_gravedad", "tipo_equipamiento",
+    "created_at", "processed_timestamp", "ano", "avance_obra", "barrio_vereda", "bpin",
+    "cantidad", "clase_obra", "comuna_corregimiento", "descripcion_intervencion",
+    "direccion", "estado", "fecha_fin", "fecha_inicio", "frente_activo",
+    "fuente_financiacion", "identificador", "nombre_centro_gestor", "nombre_up",
+    "nombre_up_detalle", "plataforma", "presupuesto_base", "referencia_contrato",
+    "referencia_proceso", "geometry_bounds", "microtio"
+]
+
+
+def geometries_to_geojson(geometries, decimals=8):
+    """
+    Serializa un arreglo de geometrías a GeoJSON en una sola operación vectorizada:
+    coordenadas 2D redondeadas a `decimals` decimales.
+    
+    Returns:
+        np.ndarray: Un string GeoJSON por geometría
+    """
+    geometries = shapely.force_2d(np.asarray(geometries))
+    geometries = shapely.transform(geometries, lambda coords: np.round(coords, decimals))
+    return shapely.to_geojson(geometries)
+
+
 def export_to_geojson(gdf_combined, output_path):
-    """Exporta el geodataframe combinado a GeoJSON compatible con Firebase"""
+    """
+    Exporta el geodataframe combinado a GeoJSON compatible con Firebase.
+    
+    Las geometrías se redondean y serializan sobre todo el arreglo, los UPIDs se
+    generan con un contador vectorizado y los features se escriben en streaming.
+    """
     print("\n" + "="*80)
     print("EXPORTANDO GEOJSON COMPATIBLE CON FIREBASE")
     print("="*80)
     
     # Filtrar solo Point y LineString geometries
-    gdf_filtered = gdf_combined[gdf_combined['geometry'].geom_type.isin(['Point', 'LineString', 'MultiLineString'])].copy()
+    geom_types = gdf_combined['geometry'].geom_type
+    gdf_filtered = gdf_combined[geom_types.isin(['Point', 'LineString', 'MultiLineString'])].copy()
+    geom_types = geom_types[gdf_filtered.index]
+    type_counts = geom_types.value_counts()
     
     print(f"📊 Geometrías filtradas:")
     print(f"  - Total features: {len(gdf_filtered)}")
-    print(f"  - LineStrings: {len(gdf_filtered[gdf_filtered.geometry.geom_type == 'LineString'])}")
-    print(f"  - MultiLineStrings: {len(gdf_filtered[gdf_filtered.geometry.geom_type == 'MultiLineString'])}")
-    print(f"  - Points: {len(gdf_filtered[gdf_filtered.geometry.geom_type == 'Point'])}")
+    print(f"  - LineStrings: {type_counts.get('LineString', 0)}")
+    print(f"  - MultiLineStrings: {type_counts.get('MultiLineString', 0)}")
+    print(f"  - Points: {type_counts.get('Point', 0)}")
     
     # Formatear tipos de datos como strings para Firebase
     gdf_filtered['ano'] = gdf_filtered['ano'].astype(str)
@@ -694,87 +728,39 @@ def export_to_geojson(gdf_combined, output_path):
     
     # GENERAR UPID PARA TODOS LOS REGISTROS
     print(f"\n🔢 Generando UPIDs...")
-    gdf_filtered['upid'] = [f"UNP-{i+1:04d}" for i in range(len(gdf_filtered))]
+    gdf_filtered['upid'] = 'UNP-' + pd.Series(np.arange(1, len(gdf_filtered) + 1), index=gdf_filtered.index).astype(str).str.zfill(4)
     print(f"✓ UPIDs generados: desde UNP-0001 hasta UNP-{len(gdf_filtered):04d}")
     
     # Agregar campos requeridos
     gdf_filtered['tipo_equipamiento'] = 'Vias'
     gdf_filtered['centros_gravedad'] = False
     gdf_filtered['has_geometry'] = True
-    gdf_filtered['geometry_type'] = gdf_filtered['geometry'].geom_type
-    
-    # Crear estructura GeoJSON
-    geojson_data = {
-        "type": "FeatureCollection",
-        "features": []
-    }
+    gdf_filtered['geometry_type'] = geom_types
+    gdf_filtered['created_at'] = None
+    gdf_filtered['processed_timestamp'] = None
+    gdf_filtered['geometry_bounds'] = None
+    gdf_filtered['microtio'] = None
     
     print(f"\n🔄 Procesando features...")
-    feature_count = 0
+    geometries_json = geometries_to_geojson(gdf_filtered.geometry.values)
+    properties = pd.DataFrame(gdf_filtered[GEOJSON_PROPERTIES]).to_dict('records')
     
-    for index, row in gdf_filtered.iterrows():
-        geom = row.geometry
-        geom_type = geom.geom_type
-        
-        # Convertir geometría a coordenadas 2D
-        if geom_type == 'LineString':
-            coords = [[round(coord[0], 8), round(coord[1], 8)] for coord in geom.coords if len(coord) >= 2]
-        elif geom_type == 'MultiLineString':
-            coords = [[[round(coord[0], 8), round(coord[1], 8)] for coord in line.coords if len(coord) >= 2] 
-                     for line in geom.geoms]
-        elif geom_type == 'Point':
-            coords = [round(geom.x, 8), round(geom.y, 8)]
-        else:
-            continue
-        
-        # Crear feature
-        feature = {
-            "type": "Feature",
-            "geometry": {
-                "type": geom_type,
-                "coordinates": coords
-            },
-            "properties": {
-                "upid": row['upid'],
-                "geometry_type": geom_type,
-                "has_geometry": True,
-                "centros_gravedad": False,
-                "tipo_equipamiento": "Vias",
-                "created_at": None,
-                "processed_timestamp": None,
-                "ano": row['ano'],
-                "avance_obra": row['avance_obra'],
-                "barrio_vereda": row['barrio_vereda'],
-                "bpin": row['bpin'],
-                "cantidad": row['cantidad'],
-                "clase_obra": row['clase_obra'],
-                "comuna_corregimiento": row['comuna_corregimiento'],
-                "descripcion_intervencion": row['descripcion_intervencion'],
-                "direccion": row['direccion'],
-                "estado": row['estado'],
-                "fecha_fin": row['fecha_fin'],
-                "fecha_inicio": row['fecha_inicio'],
-                "frente_activo": row['frente_activo'],
-                "fuente_financiacion": row['fuente_financiacion'],
-                "identificador": row['identificador'],
-                "nombre_centro_gestor": row['nombre_centro_gestor'],
-                "nombre_up": row['nombre_up'],
-                "nombre_up_detalle": row['nombre_up_detalle'],
-                "plataforma": row['plataforma'],
-                "presupuesto_base": row['presupuesto_base'],
-                "referencia_contrato": row['referencia_contrato'],
-                "referencia_proceso": row['referencia_proceso'],
-                "geometry_bounds": None,
-                "microtio": None
-            }
-        }
-        
-        geojson_data["features"].append(feature)
-        feature_count += 1
-    
-    # Guardar GeoJSON
+    # Escribir los features en streaming, sin armar la colección completa en memoria.
+    # Cada feature se serializa con indent=2 y se sangra a su nivel, de modo que el
+    # archivo es idéntico al de json.dump(geojson_data, f, ensure_ascii=False, indent=2)
+    feature_count = 0
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(geojson_data, f, ensure_ascii=False, indent=2)
+        f.write('{\n  "type": "FeatureCollection",\n  "features": [')
+        for geometry_json, feature_properties in zip(geometries_json, properties):
+            feature = {
+                "type": "Feature",
+                "geometry": json.loads(geometry_json),
+                "properties": feature_properties
+            }
+            f.write(',\n    ' if feature_count else '\n    ')
+            f.write(json.dumps(feature, ensure_ascii=False, indent=2).replace('\n', '\n    '))
+            feature_count += 1
+        f.write('\n  ]\n}' if feature_count else ']\n}')
     
     file_size_kb = os.path.getsize(output_path) / 1024
     
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Offline Administrative Resolver (barrio/vereda, comuna/corregimiento)
+
+Local backend for GoogleMapsGeocoder that answers reverse lookups with a
+point-in-polygon query over the project basemaps instead of calling the
+Maps API:
+- barrio/vereda: basemaps/barrios_veredas.geojson, or barrios/barrios.shp
+  plus veredas/Veredas.shp when the combined file is not available
+- comuna/corregimiento: basemaps/comunas_corregimientos.geojson, or
+  comunas/comunas.shp plus corregimientos/corregimientos.shp
+
+Each layer is projected to MAGNA-SIRGAS / Cali (EPSG:6249, meters) and
+indexed with a shapely STRtree. Points that fall outside every polygon
+take the nearest polygon within `tolerance_m` meters.
+
+Reverse lookups return results shaped like Google's address_components,
+so extract_barrio_vereda, extract_comuna_corregimiento, get_address_info
+and process_dataframe work unchanged.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+from shapely import STRtree
+
+from utils.geocode_cache import coordinate_key
+from utils.google_maps_geocoder import GoogleMapsGeocoder
+
+
+DEFAULT_BASEMAPS_DIR = Path(__file__).resolve().parent.parent / 'basemaps'
+
+METRIC_CRS = 'EPSG:6249'
+DEFAULT_TOLERANCE_M = 50.0
+
+# Layer -> (combined GeoJSON, name column, [(fallback shapefile, name column), ...])
+LAYER_SOURCES = {
+    'barrio_vereda': (
+        'barrios_veredas.geojson', 'barrio_vereda',
+        [('barrios/barrios.shp', 'barrio'), ('veredas/Veredas.shp', 'vereda')]
+    ),
+    'comuna_corregimiento': (
+        'comunas_corregimientos.geojson', 'comuna_corregimiento',
+        [('comunas/comunas.shp', 'nombre'), ('corregimientos/corregimientos.shp', 'corregimie')]
+    ),
+}
+
+
+def load_layer(basemaps_dir: Path, layer: str) -> gpd.GeoDataFrame:
+    """
+    Load a basemap layer as a GeoDataFrame with columns ['name', 'geometry']
+    in METRIC_CRS.
+    """
+    combined_file, combined_column, fallbacks = LAYER_SOURCES[layer]
+    combined_path = basemaps_dir / combined_file
+
+    if combined_path.exists():
+        sources = [(combined_path, combined_column)]
+    else:
+        sources = [(basemaps_dir / path, column) for path, column in fallbacks]
+
+    frames = []
+    for path, column in sources:
+        if not path.exists():
+            print(f"⚠ Basemap not found: {path}")
+            continue
+        # Basemaps are UTF-8 (some shapefiles lack the .cpg that declares it)
+        gdf = gpd.read_file(path, encoding='utf-8')
+        if gdf.crs is None:
+            gdf = gdf.set_crs('EPSG:4326')
+        gdf = gdf.to_crs(METRIC_CRS)
+        frames.append(gpd.GeoDataFrame(
+            {'name': gdf[column].astype(str).str.strip()},
+            geometry=gdf.geometry.values,
+            crs=METRIC_CRS
+        ))
+
+    if not frames:
+        raise FileNotFoundError(f"No basemap available for layer '{layer}' in {basemaps_dir}")
+
+    layer_gdf = pd.concat(frames, ignore_index=True)
+    layer_gdf = layer_gdf[layer_gdf.geometry.notna() & ~layer_gdf.geometry.is_empty]
+    return gpd.GeoDataFrame(layer_gdf.reset_index(drop=True), geometry='geometry', crs=METRIC_CRS)
+
+
+class PolygonIndex:
+    """
+    STRtree over the polygons of one layer.
+    """
+
+    def __init__(self, names: Sequence[str], geometries: Sequence, tolerance_m: float):
+        self.names = np.asarray(names, dtype=object)
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.tolerance_m = tolerance_m
+        shapely.prepare(self.geometries)
+        self.tree = STRtree(self.geometries)
+
+    def lookup(self, x: np.ndarray, y: np.ndarray) -> List[Optional[str]]:
+        """
+        Resolve the polygon name for each point (projected coordinates).
+
+        The tree returns bounding-box candidates and each candidate polygon
+        is tested once, vectorized over its points (prepared geometry).
+        Points covered by several polygons take the first one in layer order;
+        points outside every polygon take the nearest within tolerance.
+        """
+        names: List[Optional[str]] = [None] * len(x)
+        if len(x) == 0:
+            return names
+
+        point_idx, polygon_idx = self.tree.query(shapely.points(x, y))
+        hit = np.zeros(len(point_idx), dtype=bool)
+        for polygon in np.unique(polygon_idx):
+            candidates = polygon_idx == polygon
+            points = point_idx[candidates]
+            hit[candidates] = shapely.intersects_xy(self.geometries[polygon], x[points], y[points])
+
+        point_idx, polygon_idx = point_idx[hit], polygon_idx[hit]
+        if len(point_idx):
+            order = np.lexsort((polygon_idx, point_idx))
+            point_idx, polygon_idx = point_idx[order], polygon_idx[order]
+            first = np.unique(point_idx, return_index=True)[1]
+            for p, g in zip(point_idx[first], polygon_idx[first]):
+                names[p] = self.names[g]
+
+        missing = np.array([i for i, name in enumerate(names) if name is None], dtype=int)
+        if len(missing) and self.tolerance_m and self.tolerance_m > 0:
+            near_point, near_polygon = self.tree.query_nearest(
+                shapely.points(x[missing], y[missing]), max_distance=self.tolerance_m, all_matches=False
+            )
+            for p, g in zip(near_point, near_polygon):
+                names[missing[p]] = self.names[g]
+
+        return names
+
+
+class LocalAdminResolver(GoogleMapsGeocoder):
+    """
+    Offline reverse geocoder over the project basemaps.
+
+    Same interface as GoogleMapsGeocoder for reverse lookups. Forward
+    geocoding is not available offline: it warns once and returns no
+    results, so process_forward_geocoding completes without coordinates.
+    """
+
+    backend_name = 'LOCAL BASEMAPS'
+
+    def __init__(
+        self,
+        basemaps_dir: Optional[str] = None,
+        tolerance_m: float = DEFAULT_TOLERANCE_M
+    ):
+        """
+        Load the basemaps and build the spatial indexes.
+
+        Args:
+            basemaps_dir: Directory with the basemaps (default: <repo>/basemaps)
+            tolerance_m: Max distance (meters) for the nearest-polygon fallback;
+                0 disables the fallback
+        """
+        # No API client: GoogleMapsGeocoder.__init__ is intentionally not called
+        self.basemaps_dir = Path(basemaps_dir) if basemaps_dir else DEFAULT_BASEMAPS_DIR
+        self.tolerance_m = tolerance_m
+        self.client = None
+        self.cache = None
+        self.request_count = 0
+        self.max_workers = 1
+        self.requests_per_second = float('inf')
+        self._forward_warned = False
+
+        self._to_metric = Transformer.from_crs('EPSG:4326', METRIC_CRS, always_xy=True)
+        self.indexes: Dict[str, PolygonIndex] = {}
+        for layer in LAYER_SOURCES:
+            layer_gdf = load_layer(self.basemaps_dir, layer)
+            self.indexes[layer] = PolygonIndex(layer_gdf['name'].tolist(), layer_gdf.geometry.values, tolerance_m)
+
+        print(f"✅ Local administrative resolver ready ({self.basemaps_dir})")
+        for layer, index in self.indexes.items():
+            print(f"   {layer}: {len(index.names)} polygons")
+
+    def _dispatch_description(self) -> str:
+        return f"Offline point-in-polygon lookup (nearest-polygon tolerance: {self.tolerance_m:g} m)"
+
+    def resolve_many(
+        self,
+        coordinates: Sequence[Tuple[float, float]]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Resolve (barrio_vereda, comuna_corregimiento) for many coordinates.
+
+        Args:
+            coordinates: Sequence of (latitude, longitude) in WGS84
+
+        Returns:
+            List of (barrio_vereda, comuna_corregimiento), one per coordinate
+        """
+        if len(coordinates) == 0:
+            return []
+        lat = np.asarray([c[0] for c in coordinates], dtype=float)
+        lon = np.asarray([c[1] for c in coordinates], dtype=float)
+        x, y = self._to_metric.transform(lon, lat)
+
+        barrios = self.indexes['barrio_vereda'].lookup(x, y)
+        comunas = self.indexes['comuna_corregimiento'].lookup(x, y)
+        return list(zip(barrios, comunas))
+
+    @staticmethod
+    def _as_geocode_results(barrio: Optional[str], comuna: Optional[str]) -> Optional[List[Dict]]:
+        """Shape a lookup like Google results (sublocality / neighborhood)."""
+        components = []
+        if barrio:
+            components.append({'long_name': barrio, 'short_name': barrio, 'types': ['sublocality']})
+        if comuna:
+            components.append({'long_name': comuna, 'short_name': comuna, 'types': ['neighborhood']})
+        return [{'address_components': components}] if components else None
+
+    def reverse_geocode(
+        self,
+        latitude: float,
+        longitude: float,
+        language: str = 'es'
+    ) -> Optional[List[Dict]]:
+        """Reverse lookup for one coordinate (Google-shaped results or None)."""
+        return self._as_geocode_results(*self.resolve_many([(latitude, longitude)])[0])
+
+    def reverse_geocode_many(
+        self,
+        coordinates: Iterable[Tuple[float, float]],
+        language: str = 'es'
+    ) -> Dict[str, Optional[List[Dict]]]:
+        """Reverse lookup for many coordinates, keyed by coordinate_key(lat, lon)."""
+        unique = {}
+        for latitude, longitude in coordinates:
+            unique.setdefault(coordinate_key(latitude, longitude), (latitude, longitude))
+
+        print(f"   Unique locations: {len(unique)}")
+        resolved = self.resolve_many(list(unique.values()))
+        return {
+            key: self._as_geocode_results(barrio, comuna)
+            for key, (barrio, comuna) in zip(unique, resolved)
+        }
+
+    def _warn_forward_unavailable(self):
+        """Warn (once per resolver) that addresses cannot be geocoded offline."""
+        if not self._forward_warned:
+            print("⚠ Forward geocoding is not available offline; use the Google backend for addresses")
+            self._forward_warned = True
+
+    def forward_geocode(self, address: str, language: str = 'es', region: str = 'co') -> Optional[Dict]:
+        """Forward geocoding is not available offline: always None."""
+        self._warn_forward_unavailable()
+        return None
+
+    def forward_geocode_many(
+        self,
+        addresses: Iterable[str],
+        language: str = 'es',
+        region: str = 'co'
+    ) -> Dict[str, Optional[Dict]]:
+        """Forward geocoding is not available offline: no results for any address."""
+        self._warn_forward_unavailable()
+        return {}
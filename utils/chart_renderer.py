@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de Renderizado de Gráficos para Informes
+=================================================
+
+Renderiza gráficos matplotlib para los informes en Word (python-docx):
+1. Cada gráfico se describe con una función de módulo que recibe datos y
+   retorna una figura; la función se ejecuta en un pool de procesos con el
+   backend Agg y el PNG se retorna en memoria.
+2. El documento reserva un párrafo para el gráfico al solicitarlo y la
+   imagen se inserta desde el buffer al completar el servicio, de modo que
+   la construcción del documento no espera a cada gráfico.
+3. Los PNG se guardan en cache (memoria y app_outputs/cache/graficos) con
+   una clave calculada a partir de la función (nombre y código), los datos,
+   el estilo y el dpi: editar una función de gráfico invalida sus PNG.
+
+Uso:
+    servicio = ServicioGraficos(estilo=estilo_rc)
+    grafico = servicio.solicitar(grafico_barras, serie=serie)
+    servicio.insertar(document, grafico, ancho=6)
+    ...
+    servicio.completar()   # antes de guardar el documento
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import hashlib
+import inspect
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'app_outputs' / 'cache' / 'graficos'
+
+DEFAULT_DPI = 300
+
+# Incrementar si cambia la forma de renderizar o una función auxiliar que usen
+# los gráficos (invalida el cache en disco; el código de cada función de
+# gráfico ya forma parte de su clave)
+VERSION_RENDER = 1
+
+
+def renderizar_png(
+    funcion: Callable[..., Any],
+    datos: Dict[str, Any],
+    estilo: Optional[Dict[str, Any]] = None,
+    dpi: int = DEFAULT_DPI
+) -> bytes:
+    """
+    Ejecuta `funcion(**datos)` y retorna la figura como PNG.
+
+    Función de módulo para poder ejecutarse en el pool de procesos.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    with matplotlib.rc_context(estilo or {}):
+        fig = funcion(**datos)
+        try:
+            buffer = BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight', facecolor='white')
+            return buffer.getvalue()
+        finally:
+            plt.close(fig)
+
+
+def _huella(valor: Any, digest) -> None:
+    """Agrega al digest una representación estable de `valor`."""
+    if isinstance(valor, (pd.Series, pd.DataFrame)):
+        digest.update(type(valor).__name__.encode())
+        digest.update(repr(getattr(valor, 'name', None)).encode())
+        digest.update(repr(list(valor.columns) if isinstance(valor, pd.DataFrame) else valor.dtype).encode())
+        digest.update(pd.util.hash_pandas_object(valor, index=True).values.tobytes())
+    elif isinstance(valor, np.ndarray):
+        digest.update(f"{valor.dtype}{valor.shape}".encode())
+        digest.update(np.ascontiguousarray(valor).tobytes() if valor.dtype != object else repr(valor.tolist()).encode())
+    elif isinstance(valor, dict):
+        digest.update(b'{')
+        for clave in sorted(valor, key=repr):
+            digest.update(repr(clave).encode())
+            _huella(valor[clave], digest)
+        digest.update(b'}')
+    elif isinstance(valor, (list, tuple)):
+        digest.update(b'[')
+        for elemento in valor:
+            _huella(elemento, digest)
+        digest.update(b']')
+    else:
+        digest.update(repr(valor).encode())
+
+
+def _huella_codigo(codigo, digest) -> None:
+    """Agrega al digest el bytecode y las constantes de un objeto código."""
+    digest.update(codigo.co_code)
+    for constante in codigo.co_consts:
+        if inspect.iscode(constante):
+            _huella_codigo(constante, digest)
+        else:
+            digest.update(repr(constante).encode())
+
+
+def _huella_funcion(funcion: Callable[..., Any], digest) -> None:
+    """Agrega al digest el código fuente de `funcion` (o su bytecode si no hay fuente)."""
+    try:
+        digest.update(inspect.getsource(funcion).encode())
+    except (OSError, TypeError):
+        codigo = getattr(funcion, '__code__', None)
+        if codigo is not None:
+            _huella_codigo(codigo, digest)
+
+
+def clave_grafico(
+    funcion: Callable[..., Any],
+    datos: Dict[str, Any],
+    estilo: Optional[Dict[str, Any]],
+    dpi: int
+) -> str:
+    """Clave de cache de un gráfico (SHA-256)."""
+    digest = hashlib.sha256()
+    digest.update(f"{VERSION_RENDER}|{funcion.__module__}.{funcion.__qualname__}|{dpi}|".encode())
+    _huella_funcion(funcion, digest)
+    _huella(estilo or {}, digest)
+    _huella(datos, digest)
+    return digest.hexdigest()
+
+
+class ServicioGraficos:
+    """
+    Renderizado paralelo de gráficos con inserción diferida en el documento.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        estilo: Optional[Dict[str, Any]] = None,
+        dpi: int = DEFAULT_DPI,
+        cache_dir: Optional[str] = None,
+        usar_cache_disco: bool = True
+    ):
+        """
+        Inicializa el servicio (el pool se crea con el primer gráfico).
+
+        Args:
+            max_workers: Procesos de renderizado (por defecto os.cpu_count())
+            estilo: rcParams de matplotlib aplicados a cada gráfico
+            dpi: Resolución de los PNG
+            cache_dir: Directorio del cache en disco (por defecto app_outputs/cache/graficos)
+            usar_cache_disco: Si False, solo se usa el cache en memoria
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.estilo = dict(estilo or {})
+        self.dpi = dpi
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.usar_cache_disco = usar_cache_disco
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: Dict[str, Future] = {}
+        self._pendientes: List[Tuple[Any, str, float]] = []
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def solicitar(self, funcion: Callable[..., Any], **datos) -> str:
+        """
+        Solicita un gráfico; el renderizado comienza de inmediato.
+
+        Args:
+            funcion: Función de módulo que recibe `datos` y retorna una figura
+            **datos: Datos del gráfico (deben poder serializarse con pickle)
+
+        Returns:
+            Clave del gráfico, para `insertar` o `obtener_png`
+        """
+        clave = clave_grafico(funcion, datos, self.estilo, self.dpi)
+        if clave in self._cache:
+            self.hits += 1
+            return clave
+
+        png = self._leer_cache(clave)
+        if png is not None:
+            self.hits += 1
+            futuro: Future = Future()
+            futuro.set_result(png)
+        else:
+            self.misses += 1
+            futuro = self._enviar(funcion, datos)
+        self._cache[clave] = futuro
+        return clave
+
+    def insertar(self, document, clave: str, ancho: float):
+        """
+        Reserva un párrafo centrado en el documento para el gráfico.
+
+        La imagen se agrega al párrafo en `completar`.
+
+        Args:
+            document: Documento python-docx
+            clave: Clave retornada por `solicitar`
+            ancho: Ancho de la imagen en pulgadas
+        """
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+        parrafo = document.add_paragraph()
+        parrafo.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        self._pendientes.append((parrafo, clave, ancho))
+
+    def obtener_png(self, clave: str) -> bytes:
+        """Espera el renderizado y retorna el PNG de un gráfico."""
+        png = self._cache[clave].result()
+        self._escribir_cache(clave, png)
+        return png
+
+    def completar(self) -> int:
+        """
+        Inserta los gráficos pendientes en sus párrafos y cierra el pool.
+
+        Un gráfico que falla se reemplaza por una nota en el documento.
+
+        Returns:
+            Número de gráficos insertados
+        """
+        from docx.shared import Inches
+
+        insertados = 0
+        for parrafo, clave, ancho in self._pendientes:
+            try:
+                png = self.obtener_png(clave)
+            except Exception as e:
+                print(f"Error generando gráfico: {str(e)}")
+                parrafo.add_run('[Gráfico no disponible]').italic = True
+                continue
+            parrafo.add_run().add_picture(BytesIO(png), width=Inches(ancho))
+            insertados += 1
+
+        self._pendientes = []
+        self.cerrar()
+        return insertados
+
+    def cerrar(self):
+        """Cierra el pool de procesos."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna estadísticas del cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'pendientes': len(self._pendientes)}
+
+    # ------------------------------------------------------------------
+    # Renderizado
+    # ------------------------------------------------------------------
+
+    def _enviar(self, funcion: Callable[..., Any], datos: Dict[str, Any]) -> Future:
+        """Envía el gráfico al pool; si no hay pool disponible, lo renderiza aquí."""
+        if self.max_workers > 1:
+            try:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                return self._executor.submit(renderizar_png, funcion, datos, self.estilo, self.dpi)
+            except (OSError, NotImplementedError) as e:
+                print(f"⚠️ Pool de procesos no disponible ({e}), renderizando en el proceso actual")
+                self.max_workers = 1
+
+        futuro: Future = Future()
+        try:
+            futuro.set_result(renderizar_png(funcion, datos, self.estilo, self.dpi))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+    # ------------------------------------------------------------------
+    # Cache en disco
+    # ------------------------------------------------------------------
+
+    def _leer_cache(self, clave: str) -> Optional[bytes]:
+        if not self.usar_cache_disco:
+            return None
+        ruta = self.cache_dir / f"{clave}.png"
+        try:
+            return ruta.read_bytes() if ruta.exists() else None
+        except OSError:
+            return None
+
+    def _escribir_cache(self, clave: str, png: bytes):
+        if not self.usar_cache_disco:
+            return
+        ruta = self.cache_dir / f"{clave}.png"
+        if ruta.exists():
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temporal = ruta.with_suffix(f'.{os.getpid()}.tmp')
+            temporal.write_bytes(png)
+            temporal.replace(ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el gráfico en cache: {e}")
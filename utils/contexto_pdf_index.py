@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de Documentos de Contexto (PDF)
+======================================
+
+Indexador de los PDFs de contexto usados por los generadores de informes
+de empréstito:
+1. Cada PDF se identifica por el SHA-256 de su contenido.
+2. Los PDFs que no están en cache se extraen con PyMuPDF en un pool de
+   procesos, repartiendo las páginas en bloques, de modo que un documento
+   grande también se procesa en paralelo.
+3. El texto, la clasificación y las palabras clave se guardan en disco
+   (app_outputs/cache/contexto_pdf/<sha256>.json); al regenerar un informe
+   los documentos sin cambios se sirven desde el cache.
+
+Las entradas guardan la versión de las reglas de clasificación y palabras
+clave; si las reglas cambian, la entrada se recalcula a partir del texto
+en cache, sin volver a leer el PDF.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - dependencia opcional
+    fitz = None
+
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'app_outputs' / 'cache' / 'contexto_pdf'
+
+# Páginas por tarea del pool de procesos
+PAGINAS_POR_BLOQUE = 25
+
+PALABRAS_RELEVANTES = [
+    'empréstito', 'crédito', 'endeudamiento', 'capacidad de pago',
+    'inversión', 'infraestructura', 'concejo', 'autorización',
+    'desembolso', 'garantía', 'amortización', 'plazo'
+]
+
+# Incrementar al cambiar clasificar_documento o PALABRAS_RELEVANTES
+VERSION_REGLAS = 1
+
+
+def clasificar_documento(nombre_archivo: str, texto: str) -> str:
+    """Clasificar tipo de documento basado en nombre y contenido."""
+    nombre_lower = nombre_archivo.lower()
+    texto_lower = texto.lower()
+
+    if 'acuerdo' in nombre_lower or 'acuerdo' in texto_lower:
+        return 'Acuerdo del Concejo'
+    elif 'decreto' in nombre_lower or 'decreto' in texto_lower:
+        return 'Decreto Municipal'
+    elif 'solicitud' in nombre_lower:
+        return 'Solicitud Administrativa'
+    elif 'informe' in nombre_lower:
+        return 'Informe Técnico'
+    else:
+        return 'Documento de Soporte'
+
+
+def extraer_palabras_clave(texto: str) -> List[str]:
+    """Extraer las palabras relevantes presentes en el texto."""
+    texto_lower = texto.lower()
+    return [palabra for palabra in PALABRAS_RELEVANTES if palabra in texto_lower]
+
+
+def hash_archivo(ruta: Path, tamano_bloque: int = 1024 * 1024) -> str:
+    """SHA-256 del contenido de un archivo."""
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def contar_paginas(ruta: str) -> int:
+    """Número de páginas de un PDF."""
+    with fitz.open(ruta) as doc:
+        return len(doc)
+
+
+def extraer_paginas(ruta: str, inicio: int, fin: int) -> List[str]:
+    """
+    Extrae el texto de las páginas [inicio, fin) de un PDF.
+
+    Función de módulo para poder ejecutarse en el pool de procesos.
+    """
+    with fitz.open(ruta) as doc:
+        return [doc[numero].get_text() for numero in range(inicio, min(fin, len(doc)))]
+
+
+def extraer_texto_pdf(ruta: str) -> str:
+    """Extrae el texto completo de un PDF en el proceso actual."""
+    return "\n".join(extraer_paginas(ruta, 0, contar_paginas(ruta)))
+
+
+class ContextoPDFIndex:
+    """
+    Índice de PDFs de contexto con cache en disco por hash de archivo.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        paginas_por_bloque: int = PAGINAS_POR_BLOQUE
+    ):
+        """
+        Inicializa el índice.
+
+        Args:
+            cache_dir: Directorio del cache (por defecto app_outputs/cache/contexto_pdf)
+            max_workers: Procesos para la extracción (por defecto os.cpu_count())
+            paginas_por_bloque: Páginas extraídas por cada tarea del pool
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.paginas_por_bloque = max(1, paginas_por_bloque)
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def indexar_directorios(self, directorios: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Indexa todos los PDFs de uno o varios directorios.
+
+        Args:
+            directorios: Directorios con documentos de contexto (los
+                inexistentes se omiten)
+
+        Returns:
+            Diccionario {nombre_archivo: entrada} en orden de directorio y nombre
+        """
+        rutas = []
+        for directorio in directorios:
+            if not os.path.isdir(directorio):
+                print(f"  ⚠️ Directorio de contexto no encontrado: {directorio}")
+                continue
+            rutas.extend(
+                Path(directorio) / nombre
+                for nombre in sorted(os.listdir(directorio))
+                if nombre.lower().endswith('.pdf')
+            )
+        return self.indexar(rutas)
+
+    def indexar(self, rutas: Iterable[Path]) -> Dict[str, Dict[str, Any]]:
+        """
+        Indexa una lista de PDFs.
+
+        Cada entrada contiene: nombre, ruta, sha256, tamano_mb, paginas,
+        texto, tipo y palabras_clave. Los PDFs sin texto extraíble se omiten.
+
+        Returns:
+            Diccionario {nombre_archivo: entrada}
+        """
+        entradas: Dict[str, Dict[str, Any]] = {}
+        pendientes: Dict[str, Tuple[Path, str]] = {}
+
+        for ruta in map(Path, rutas):
+            sha256 = hash_archivo(ruta)
+            entrada = self._leer_cache(sha256)
+            if entrada is not None:
+                self.hits += 1
+                if not self._reglas_vigentes(entrada, ruta.name):
+                    entrada = self._aplicar_reglas(entrada, ruta.name)
+                    self._escribir_cache(entrada)
+                entradas[ruta.name] = self._con_ruta(entrada, ruta)
+            else:
+                self.misses += 1
+                entradas[ruta.name] = None
+                pendientes[ruta.name] = (ruta, sha256)
+
+        if pendientes:
+            if fitz is None:
+                print("  ⚠️ PyMuPDF no disponible: no se pueden extraer PDFs nuevos (pip install PyMuPDF)")
+                textos = {}
+            else:
+                textos = self._extraer_en_paralelo([ruta for ruta, _ in pendientes.values()])
+
+            for nombre, (ruta, sha256) in pendientes.items():
+                paginas = textos.get(str(ruta))
+                if paginas is None:
+                    continue
+                entrada = self._aplicar_reglas({
+                    'sha256': sha256,
+                    'paginas': len(paginas),
+                    'texto': "\n".join(paginas),
+                }, nombre)
+                if entrada['texto']:
+                    self._escribir_cache(entrada)
+                entradas[nombre] = self._con_ruta(entrada, ruta)
+
+        return {nombre: entrada for nombre, entrada in entradas.items() if entrada and entrada['texto']}
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna estadísticas del cache."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    # ------------------------------------------------------------------
+    # Extracción
+    # ------------------------------------------------------------------
+
+    def _extraer_en_paralelo(self, rutas: List[Path]) -> Dict[str, List[str]]:
+        """
+        Extrae el texto de varios PDFs repartiendo bloques de páginas en el
+        pool de procesos.
+
+        Returns:
+            Diccionario {ruta: [texto por página]}; los PDFs ilegibles se omiten
+        """
+        bloques = []
+        for ruta in rutas:
+            try:
+                total = contar_paginas(str(ruta))
+            except Exception as e:
+                print(f"  ✗ Error abriendo {ruta.name}: {e}")
+                continue
+            for inicio in range(0, total, self.paginas_por_bloque):
+                bloques.append((str(ruta), inicio, inicio + self.paginas_por_bloque))
+            if total == 0:
+                bloques.append((str(ruta), 0, 0))
+
+        if self.max_workers > 1 and len(bloques) > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(bloques))) as executor:
+                    futuros = [executor.submit(extraer_paginas, *bloque) for bloque in bloques]
+                    resultados = [self._resultado(futuro, bloque) for futuro, bloque in zip(futuros, bloques)]
+            except (OSError, NotImplementedError) as e:
+                print(f"  ⚠️ Pool de procesos no disponible ({e}), extrayendo en el proceso actual")
+                resultados = [self._extraer_bloque(bloque) for bloque in bloques]
+        else:
+            resultados = [self._extraer_bloque(bloque) for bloque in bloques]
+
+        textos: Dict[str, List[str]] = {}
+        fallidos = set()
+        for (ruta, _, _), paginas in zip(bloques, resultados):
+            if paginas is None:
+                fallidos.add(ruta)
+                continue
+            textos.setdefault(ruta, []).extend(paginas)
+        for ruta in fallidos:
+            textos.pop(ruta, None)
+        return textos
+
+    @staticmethod
+    def _resultado(futuro, bloque) -> Optional[List[str]]:
+        try:
+            return futuro.result()
+        except Exception as e:
+            print(f"  ✗ Error extrayendo {Path(bloque[0]).name} (páginas {bloque[1]}-{bloque[2]}): {e}")
+            return None
+
+    @staticmethod
+    def _extraer_bloque(bloque) -> Optional[List[str]]:
+        try:
+            return extraer_paginas(*bloque)
+        except Exception as e:
+            print(f"  ✗ Error extrayendo {Path(bloque[0]).name} (páginas {bloque[1]}-{bloque[2]}): {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Cache en disco
+    # ------------------------------------------------------------------
+
+    def _ruta_cache(self, sha256: str) -> Path:
+        return self.cache_dir / f"{sha256}.json"
+
+    def _leer_cache(self, sha256: str) -> Optional[Dict[str, Any]]:
+        ruta = self._ruta_cache(sha256)
+        if not ruta.exists():
+            return None
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _escribir_cache(self, entrada: Dict[str, Any]):
+        """Guarda la entrada (sin datos de ubicación) de forma atómica."""
+        datos = {clave: entrada[clave] for clave in
+                 ('sha256', 'paginas', 'texto', 'tipo', 'palabras_clave', 'version_reglas', 'nombre_clasificado')}
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            ruta = self._ruta_cache(entrada['sha256'])
+            temporal = ruta.with_suffix(f'.{os.getpid()}.tmp')
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False)
+            temporal.replace(ruta)
+        except OSError as e:
+            print(f"  ⚠️ No se pudo guardar el cache de {entrada['sha256'][:12]}: {e}")
+
+    @staticmethod
+    def _reglas_vigentes(entrada: Dict[str, Any], nombre: str) -> bool:
+        """Indica si tipo y palabras clave se calcularon con las reglas y el nombre actuales."""
+        return entrada.get('version_reglas') == VERSION_REGLAS and entrada.get('nombre_clasificado') == nombre
+
+    @staticmethod
+    def _aplicar_reglas(entrada: Dict[str, Any], nombre: str) -> Dict[str, Any]:
+        """Calcula tipo y palabras clave a partir del texto."""
+        entrada = dict(entrada)
+        entrada['tipo'] = clasificar_documento(nombre, entrada['texto'])
+        entrada['palabras_clave'] = extraer_palabras_clave(entrada['texto'])
+        entrada['version_reglas'] = VERSION_REGLAS
+        entrada['nombre_clasificado'] = nombre
+        return entrada
+
+    @staticmethod
+    def _con_ruta(entrada: Dict[str, Any], ruta: Path) -> Dict[str, Any]:
+        entrada = dict(entrada)
+        entrada['nombre'] = ruta.name
+        entrada['ruta'] = str(ruta)
+        entrada['tamano_mb'] = round(ruta.stat().st_size / (1024 * 1024), 2)
+        return entrada
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de Datos Sintéticos de Unidades de Proyecto (Cali)
+
+Produce tablas de intervenciones con la forma de la hoja de unidades de
+proyecto para medir la transformación sin depender de los datos reales:
+- Coordenadas dentro de los polígonos de barrios/veredas de basemaps
+  (utils.admin_resolver.load_layer), agrupadas por sitio con desplazamientos
+  de pocos metros, más una fracción sin coordenadas, con coma decimal o
+  con lat/lon invertidas
+- Nombres con ruido (mayúsculas, tildes, espacios, abreviaturas y errores
+  de digitación)
+- Fechas en formatos mezclados (dd/mm/aaaa, aaaa-mm-dd, serial de Excel, ISO)
+- Variantes en español de las categorías estándar
+  (unidades_proyecto_std_categories.json) y de los estados
+
+La misma semilla produce la misma tabla.
+
+Uso:
+    from utils.datos_sinteticos_cali import generar_intervenciones
+    df = generar_intervenciones(10_000, semilla=42)
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import json
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.admin_resolver import DEFAULT_BASEMAPS_DIR, METRIC_CRS, load_layer
+
+
+CATEGORIAS_PATH = (
+    Path(__file__).resolve().parent.parent
+    / 'app_inputs' / 'unidades_proyecto_input' / 'defaults' / 'unidades_proyecto_std_categories.json'
+)
+
+SEMILLA_DEFAULT = 42
+
+# Promedio de intervenciones por unidad de proyecto
+INTERVENCIONES_POR_SITIO = 2.5
+
+# Desplazamiento máximo de una intervención respecto a su sitio (metros)
+DISPERSION_SITIO_M = 8.0
+
+# Tipo de equipamiento -> (plantilla del nombre, clase_up, centro gestor)
+PLANTILLAS_EQUIPAMIENTO = {
+    'Instituciones Educativas': ('Institución Educativa {barrio}', 'Obras equipamientos', 'Secretaría de Educación'),
+    'Parques y zonas verdes': ('Parque {barrio}', 'Espacio Público', 'Departamento Administrativo de Gestión del Medio Ambiente'),
+    'Canchas': ('Cancha Múltiple {barrio}', 'Obras equipamientos', 'Secretaría del Deporte y la Recreación'),
+    'Bibliotecas': ('Biblioteca Pública {barrio}', 'Obras equipamientos', 'Secretaría de Cultura'),
+    'CALIS': ('CALI {comuna}', 'Obras equipamientos', 'Secretaría de Gobierno'),
+    'IPS': ('Puesto de Salud {barrio}', 'Dotaciones', 'Secretaría de Salud Pública'),
+    'Infraestructura vial': ('Vía Carrera {numero} {barrio}', 'Obra vial', 'Secretaría de Infraestructura'),
+    'Señalización vial': ('Señalización Calle {numero}', 'Demarcación vial', 'Secretaría de Movilidad'),
+    'Vivienda mejoramiento': ('Mejoramiento de Vivienda {barrio}', 'Subsidios', 'Secretaría de Vivienda Social y Hábitat'),
+    'Adquisición predios': ('Predio {barrio}', 'Adquisición predial', 'Secretaría de Infraestructura'),
+    'Estaciones MIO': ('Estación MIO {barrio}', 'Obra vial', 'Secretaría de Movilidad'),
+    'Jardines': ('Jardín Infantil {barrio}', 'Obras equipamientos', 'Secretaría de Bienestar Social'),
+}
+
+# Pesos aproximados de cada tipo de equipamiento en la hoja real
+PESOS_EQUIPAMIENTO = {
+    'Instituciones Educativas': 0.18, 'Parques y zonas verdes': 0.16, 'Canchas': 0.12,
+    'Bibliotecas': 0.04, 'CALIS': 0.03, 'IPS': 0.06, 'Infraestructura vial': 0.15,
+    'Señalización vial': 0.05, 'Vivienda mejoramiento': 0.10, 'Adquisición predios': 0.03,
+    'Estaciones MIO': 0.03, 'Jardines': 0.05,
+}
+
+ABREVIATURAS = {
+    'Institución Educativa': 'I.E.',
+    'Biblioteca Pública': 'Bib.',
+    'Puesto de Salud': 'P.S.',
+    'Carrera': 'Cra.',
+    'Calle': 'Cl.',
+    'Parque': 'Pq.',
+}
+
+VARIANTES_ESTADO = [
+    'En ejecución', 'en ejecucion', 'EN EJECUCIÓN', 'En proceso', 'En construcción',
+    'Terminado', 'terminado ', 'Finalizado', 'Entregado',
+    'En alistamiento', 'Por iniciar', 'En planeación',
+    'Suspendido', 'Inaugurado', '',
+]
+
+FORMATOS_FECHA = ['%d/%m/%Y', '%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%Y-%m-%dT%H:%M:%S', 'excel', 'vacia']
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+# Probabilidad de ruido en cada nombre de intervención
+PROBABILIDAD_RUIDO_NOMBRE = 0.3
+PROBABILIDAD_RUIDO_CATEGORIA = 0.35
+
+
+def _sin_tildes(texto: str) -> str:
+    """Elimina tildes y diéresis."""
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+def _error_digitacion(texto: str, rng: np.random.Generator) -> str:
+    """Intercambia dos caracteres vecinos u omite uno."""
+    if len(texto) < 4:
+        return texto
+    i = int(rng.integers(1, len(texto) - 2))
+    if rng.random() < 0.5:
+        return texto[:i] + texto[i + 1] + texto[i] + texto[i + 2:]
+    return texto[:i] + texto[i + 1:]
+
+
+def variante_texto(texto: str, rng: np.random.Generator) -> str:
+    """
+    Retorna una variante con ruido de `texto`, como las que aparecen en la
+    hoja diligenciada a mano.
+    """
+    opcion = int(rng.integers(0, 7))
+    if opcion == 0:
+        return texto.upper()
+    if opcion == 1:
+        return texto.lower()
+    if opcion == 2:
+        return _sin_tildes(texto)
+    if opcion == 3:
+        return f"  {texto.replace(' ', '  ', 1)} "
+    if opcion == 4:
+        for completo, abreviado in ABREVIATURAS.items():
+            if completo in texto:
+                return texto.replace(completo, abreviado)
+        return texto.upper()
+    if opcion == 5:
+        return _error_digitacion(texto, rng)
+    return _sin_tildes(texto).lower()
+
+
+def cargar_categorias(path: Optional[Path] = None) -> Dict[str, List[str]]:
+    """Carga las categorías estándar de unidades de proyecto."""
+    with open(path or CATEGORIAS_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=4)
+def _capas(basemaps_dir: str) -> Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """Capas de barrios/veredas y comunas/corregimientos en METRIC_CRS."""
+    directorio = Path(basemaps_dir)
+    return load_layer(directorio, 'barrio_vereda'), load_layer(directorio, 'comuna_corregimiento')
+
+
+def muestrear_puntos(
+    poligonos: gpd.GeoDataFrame,
+    n: int,
+    rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Muestrea `n` puntos uniformes dentro de polígonos elegidos al azar.
+
+    Los polígonos se eligen con igual probabilidad (los barrios urbanos,
+    más numerosos, concentran la mayoría de puntos) y cada punto se obtiene
+    por rechazo dentro del bounding box de su polígono.
+
+    Returns:
+        (x, y, índice del polígono) en el CRS de `poligonos`
+    """
+    geometrias = poligonos.geometry.values
+    limites = shapely.bounds(geometrias)
+    indice = rng.integers(0, len(geometrias), n)
+
+    x = np.empty(n)
+    y = np.empty(n)
+    pendientes = np.arange(n)
+    while len(pendientes):
+        minx, miny, maxx, maxy = limites[indice[pendientes]].T
+        cx = rng.uniform(minx, maxx)
+        cy = rng.uniform(miny, maxy)
+        dentro = shapely.contains_xy(geometrias[indice[pendientes]], cx, cy)
+        x[pendientes[dentro]] = cx[dentro]
+        y[pendientes[dentro]] = cy[dentro]
+        pendientes = pendientes[~dentro]
+    return x, y, indice
+
+
+def _comuna_de_puntos(puntos: gpd.GeoDataFrame, comunas: gpd.GeoDataFrame) -> np.ndarray:
+    """Comuna/corregimiento que contiene cada punto (o la más cercana)."""
+    unidos = gpd.sjoin(puntos, comunas, how='left', predicate='within')
+    nombres = unidos[~unidos.index.duplicated()]['name'].reindex(puntos.index)
+    faltantes = nombres.isna()
+    if faltantes.any():
+        cercanos = gpd.sjoin_nearest(puntos[faltantes], comunas, how='left')
+        nombres[faltantes] = cercanos[~cercanos.index.duplicated()]['name']
+    return nombres.to_numpy()
+
+
+def _formatear_fecha(fecha: datetime, formato: str) -> Optional[str]:
+    if formato == 'vacia':
+        return None
+    if formato == 'excel':
+        return str((fecha - EPOCA_EXCEL).days)
+    return fecha.strftime(formato)
+
+
+def _formatear_presupuesto(valor: int, rng: np.random.Generator):
+    opcion = rng.random()
+    if opcion < 0.5:
+        return int(valor)
+    if opcion < 0.8:
+        return f"$ {valor:,}".replace(',', '.')
+    if opcion < 0.95:
+        return f"{valor}.00"
+    return None
+
+
+def _formatear_avance(valor: float, rng: np.random.Generator):
+    opcion = rng.random()
+    if opcion < 0.6:
+        return valor
+    if opcion < 0.8:
+        return f"{valor:.1f}".replace('.', ',')
+    if opcion < 0.95:
+        return f"{valor:.0f}%"
+    return None
+
+
+def _formatear_coordenada(valor: float, rng: np.random.Generator):
+    if rng.random() < 0.05:
+        return f"{valor:.6f}".replace('.', ',')
+    return round(float(valor), 7)
+
+
+def _formatear_comuna(nombre: str, rng: np.random.Generator) -> str:
+    """'COMUNA 06' -> 'COMUNA 06' | 'Comuna 6' | '6'."""
+    partes = nombre.split()
+    if len(partes) == 2 and partes[0] == 'COMUNA' and partes[1].isdigit():
+        opcion = rng.random()
+        if opcion < 0.3:
+            return f"Comuna {int(partes[1])}"
+        if opcion < 0.4:
+            return str(int(partes[1]))
+    return nombre if rng.random() < 0.7 else nombre.title()
+
+
+def generar_intervenciones(
+    n: int,
+    semilla: int = SEMILLA_DEFAULT,
+    basemaps_dir: Optional[Path] = None,
+    proporcion_sin_coordenadas: float = 0.02,
+    proporcion_invertidas: float = 0.01,
+    con_upid: bool = False
+) -> pd.DataFrame:
+    """
+    Genera `n` intervenciones sintéticas agrupadas en unidades de proyecto.
+
+    Args:
+        n: Número de filas
+        semilla: Semilla del generador (misma semilla, misma tabla)
+        basemaps_dir: Directorio de basemaps (por defecto basemaps/)
+        proporcion_sin_coordenadas: Fracción de filas sin lat/lon
+        proporcion_invertidas: Fracción de filas con lat/lon intercambiadas
+        con_upid: Si True, incluye upid y n_intervenciones del sitio de
+            origen (datos ya agrupados, para medir las fases posteriores
+            al clustering)
+
+    Returns:
+        DataFrame con las columnas de la hoja de unidades de proyecto
+    """
+    rng = np.random.default_rng(semilla)
+    categorias = cargar_categorias()
+    barrios, comunas = _capas(str(basemaps_dir or DEFAULT_BASEMAPS_DIR))
+
+    # Sitios (unidades de proyecto)
+    n_sitios = max(1, int(round(n / INTERVENCIONES_POR_SITIO)))
+    x, y, indice_barrio = muestrear_puntos(barrios, n_sitios, rng)
+    puntos = gpd.GeoDataFrame(geometry=gpd.points_from_xy(x, y), crs=METRIC_CRS)
+    comuna_sitio = _comuna_de_puntos(puntos, comunas)
+    barrio_sitio = barrios['name'].to_numpy()[indice_barrio]
+
+    tipos = list(PESOS_EQUIPAMIENTO)
+    pesos = np.array([PESOS_EQUIPAMIENTO[t] for t in tipos])
+    tipo_sitio = rng.choice(len(tipos), n_sitios, p=pesos / pesos.sum())
+    numero_sitio = rng.integers(1, 130, n_sitios)
+    detalle_sitio = np.where(rng.random(n_sitios) < 0.15, rng.integers(1, 4, n_sitios), 0)
+    bpin_sitio = rng.integers(2020760010000, 2025760019999, n_sitios)
+
+    # Intervenciones
+    sitio = np.sort(rng.integers(0, n_sitios, n))
+    dx, dy = rng.uniform(-DISPERSION_SITIO_M, DISPERSION_SITIO_M, (2, n))
+    coordenadas = gpd.GeoSeries(gpd.points_from_xy(x[sitio] + dx, y[sitio] + dy), crs=METRIC_CRS).to_crs('EPSG:4326')
+    lat = coordenadas.y.to_numpy()
+    lon = coordenadas.x.to_numpy()
+
+    sin_coordenadas = rng.random(n) < proporcion_sin_coordenadas
+    invertidas = rng.random(n) < proporcion_invertidas
+
+    fecha_inicio = (pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 1000, n), unit='D')).to_pydatetime()
+    fecha_fin = fecha_inicio + pd.to_timedelta(rng.integers(30, 720, n), unit='D').to_pytimedelta()
+    avance = np.round(np.clip(rng.beta(0.8, 0.8, n) * 110, 0, 100), 1)
+    presupuesto = rng.lognormal(np.log(800_000_000), 1.0, n).astype(np.int64)
+
+    registros = []
+    for i in range(n):
+        s = sitio[i]
+        tipo = tipos[tipo_sitio[s]]
+        plantilla, clase_up, centro_gestor = PLANTILLAS_EQUIPAMIENTO[tipo]
+        nombre_up = plantilla.format(barrio=barrio_sitio[s], comuna=comuna_sitio[s], numero=numero_sitio[s])
+        if rng.random() < PROBABILIDAD_RUIDO_NOMBRE:
+            nombre_up = variante_texto(nombre_up, rng)
+
+        valores = {
+            'tipo_equipamiento': tipo,
+            'clase_up': clase_up,
+            'tipo_intervencion': categorias['tipo_intervencion'][int(rng.integers(0, len(categorias['tipo_intervencion'])))],
+            'fuente_financiacion': categorias['fuente_financiacion'][int(rng.integers(0, len(categorias['fuente_financiacion'])))],
+        }
+        for columna, valor in valores.items():
+            if rng.random() < PROBABILIDAD_RUIDO_CATEGORIA:
+                valores[columna] = variante_texto(valor, rng)
+
+        if sin_coordenadas[i]:
+            fila_lat, fila_lon = None, None
+        else:
+            fila_lat, fila_lon = _formatear_coordenada(lat[i], rng), _formatear_coordenada(lon[i], rng)
+            if invertidas[i]:
+                fila_lat, fila_lon = fila_lon, fila_lat
+
+        referencia = f"4151.010.32.1.{int(rng.integers(100, 9999))}-{fecha_inicio[i].year}"
+        registros.append({
+            'identificador': f"SIN-{i + 1:06d}",
+            'bpin': int(bpin_sitio[s]) if rng.random() < 0.9 else str(bpin_sitio[s]),
+            'nombre_up': nombre_up,
+            'nombre_up_detalle': f"Sede {detalle_sitio[s]}" if detalle_sitio[s] else None,
+            'direccion': f"Calle {numero_sitio[s]} # {int(rng.integers(1, 99))}-{int(rng.integers(1, 99))}",
+            'comuna_corregimiento': _formatear_comuna(comuna_sitio[s], rng),
+            'barrio_vereda': barrio_sitio[s] if rng.random() < 0.8 else variante_texto(barrio_sitio[s], rng),
+            'nombre_centro_gestor': centro_gestor,
+            **valores,
+            'estado': VARIANTES_ESTADO[int(rng.integers(0, len(VARIANTES_ESTADO)))],
+            'avance_obra': _formatear_avance(avance[i], rng),
+            'presupuesto_base': _formatear_presupuesto(int(presupuesto[i]), rng),
+            'ano': int(fecha_inicio[i].year) if rng.random() < 0.9 else f"{fecha_inicio[i].year}.0",
+            'fecha_inicio': _formatear_fecha(fecha_inicio[i], FORMATOS_FECHA[int(rng.integers(0, len(FORMATOS_FECHA)))]),
+            'fecha_fin': _formatear_fecha(fecha_fin[i], FORMATOS_FECHA[int(rng.integers(0, len(FORMATOS_FECHA)))]),
+            'referencia_proceso': referencia if rng.random() < 0.85 else f"{referencia}, {referencia}A",
+            'referencia_contrato': f"4151.010.26.1.{int(rng.integers(100, 9999))}-{fecha_inicio[i].year}",
+            'url_proceso': f"https://community.secop.gov.co/Public/Tendering/OpportunityDetail/Index?noticeUID=CO1.NTC.{int(rng.integers(1_000_000, 9_999_999))}",
+            'plataforma': 'SECOP II' if rng.random() < 0.9 else 'secop ii',
+            'unidad': 'UND',
+            'cantidad': int(rng.integers(1, 20)),
+            'lat': fila_lat,
+            'lon': fila_lon,
+        })
+
+    df = pd.DataFrame(registros)
+    if con_upid:
+        conteo = np.bincount(sitio, minlength=n_sitios)
+        df['upid'] = [f"UNP-{s + 1}" for s in sitio]
+        df['n_intervenciones'] = conteo[sitio]
+    return df
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Acceso a Datos de Empréstito para Informes
+==========================================
+
+Módulo compartido por los generadores de informes de empréstito
+(generar_informe_emprestito_*.py):
+1. Descarga las colecciones de Firestore de forma concurrente, de modo que
+   el tiempo total queda acotado por la colección más grande.
+2. Solicita solo los campos que usan las secciones de los informes
+   (`select()` con CAMPOS_POR_COLECCION).
+3. Guarda o carga un snapshot local en Parquet (un archivo por colección
+   más `manifest.json`) para generar informes repetibles sin conexión.
+
+Variables de entorno:
+- EMPRESTITO_SNAPSHOT_DIR: si apunta a un snapshot existente, los datos se
+  cargan desde él en lugar de Firestore.
+- EMPRESTITO_SNAPSHOT_SAVE_DIR: si está definida, los datos descargados se
+  guardan como snapshot en ese directorio.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - requerido por DataFrame.to_parquet
+except ImportError:  # pragma: no cover - dependencia opcional
+    pyarrow = None
+
+
+COLECCIONES_EMPRESTITO = {
+    'procesos_emprestito': 'Procesos Contractuales Publicados',
+    'contratos_emprestito': 'Contratos Adjudicados',
+    'ordenes_compra_emprestito': 'Órdenes de Compra',
+    'convenios_transferencias_emprestito': 'Convenios y Transferencias',
+    'montos_emprestito_asignados_centro_gestor': 'Distribución por Centro Gestor',
+    'pagos_emprestito': 'Desembolsos y Pagos',
+    'reportes_contratos': 'Reportes de Avance',
+    'reservas_presupuestales': 'Reservas Presupuestales',
+    'vigencias_futuras': 'Vigencias Futuras'
+}
+
+# Columnas candidatas que los generadores buscan en cualquier colección
+# (obtener_columna_valor / obtener_columna_organismo y equivalentes)
+CAMPOS_VALOR = (
+    'valor', 'valor_total', 'valor_contrato', 'valor_pago', 'valor_asignado',
+    'monto', 'monto_total', 'monto_asignado', 'presupuesto', 'precio_total'
+)
+CAMPOS_ORGANISMO = (
+    'nombre_centro_gestor', 'centro_gestor', 'organismo', 'entidad',
+    'dependencia', 'secretaria'
+)
+CAMPOS_FECHA = ('fecha', 'fecha_publicacion', 'fecha_pago', 'fecha_desembolso', 'fecha_transaccion')
+CAMPOS_BANCO = ('banco', 'banco_desembolso', 'entidad_financiera', 'fuente')
+
+_CAMPOS_CONTRATOS = (
+    CAMPOS_VALOR + CAMPOS_ORGANISMO + CAMPOS_FECHA + CAMPOS_BANCO + (
+        'numero_contrato', 'objeto', 'contratista', 'tipo_contrato',
+        'modalidad', 'tipo_proceso', 'estado', 'estado_contrato'
+    )
+)
+
+# Campos solicitados por colección (None = documento completo)
+CAMPOS_POR_COLECCION: Dict[str, Optional[Tuple[str, ...]]] = {
+    'procesos_emprestito': CAMPOS_VALOR + CAMPOS_ORGANISMO + CAMPOS_FECHA + (
+        'numero_proceso', 'modalidad', 'tipo_proceso', 'estado', 'estado_proceso'
+    ),
+    'contratos_emprestito': _CAMPOS_CONTRATOS,
+    'ordenes_compra_emprestito': _CAMPOS_CONTRATOS,
+    'convenios_transferencias_emprestito': _CAMPOS_CONTRATOS,
+    'montos_emprestito_asignados_centro_gestor': CAMPOS_VALOR + CAMPOS_ORGANISMO + CAMPOS_BANCO,
+    'pagos_emprestito': CAMPOS_VALOR + CAMPOS_ORGANISMO + CAMPOS_FECHA + CAMPOS_BANCO + (
+        'numero_contrato', 'referencia_contrato'
+    ),
+    'reportes_contratos': CAMPOS_ORGANISMO + (
+        'referencia_contrato', 'fecha_reporte', 'avance_fisico', 'avance_financiero',
+        'porcentaje_avance', 'avance'
+    ),
+    'reservas_presupuestales': CAMPOS_VALOR + CAMPOS_ORGANISMO + CAMPOS_FECHA,
+    'vigencias_futuras': CAMPOS_VALOR + CAMPOS_ORGANISMO + CAMPOS_FECHA,
+}
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def descargar_coleccion(db, coleccion: str, campos: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Descarga una colección como DataFrame (con columna `doc_id`).
+
+    Args:
+        db: Cliente de Firestore
+        coleccion: Nombre de la colección
+        campos: Campos a solicitar con select(); None para documentos completos
+    """
+    query = db.collection(coleccion)
+    if campos is not None:
+        query = query.select(list(campos))
+
+    registros = []
+    for doc in query.stream():
+        data = doc.to_dict() or {}
+        data['doc_id'] = doc.id
+        registros.append(data)
+    return pd.DataFrame(registros)
+
+
+def descargar_colecciones(
+    db,
+    colecciones: Iterable[str] = COLECCIONES_EMPRESTITO,
+    proyecciones: bool = True,
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Descarga varias colecciones en paralelo.
+
+    Args:
+        db: Cliente de Firestore
+        colecciones: Nombres de las colecciones
+        proyecciones: Si True, solicita solo CAMPOS_POR_COLECCION
+        max_workers: Hilos de descarga (por defecto, uno por colección)
+
+    Returns:
+        Diccionario {colección: DataFrame o Exception}, en el orden recibido;
+        una colección que falla se reporta con su excepción
+    """
+    colecciones = list(colecciones)
+    if not colecciones:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(colecciones)) as executor:
+        futuros = {
+            coleccion: executor.submit(
+                descargar_coleccion, db, coleccion,
+                CAMPOS_POR_COLECCION.get(coleccion) if proyecciones else None
+            )
+            for coleccion in colecciones
+        }
+        resultados: Dict[str, Any] = {}
+        for coleccion, futuro in futuros.items():
+            try:
+                resultados[coleccion] = futuro.result()
+            except Exception as e:
+                resultados[coleccion] = e
+    return resultados
+
+
+def _columna_parquet(serie: pd.Series) -> pd.Series:
+    """Convierte valores anidados o de tipos mezclados a texto para Parquet."""
+    if serie.dtype != object:
+        return serie
+    no_nulos = serie.dropna()
+    tipos = {type(v) for v in no_nulos}
+    if len(tipos) <= 1 and not any(issubclass(t, (dict, list, tuple, set)) for t in tipos):
+        return serie
+    return serie.map(
+        lambda v: v if v is None or (isinstance(v, float) and pd.isna(v))
+        else json.dumps(v, ensure_ascii=False, default=str) if isinstance(v, (dict, list, tuple, set))
+        else str(v)
+    )
+
+
+def guardar_snapshot(datos: Dict[str, pd.DataFrame], directorio: str) -> Path:
+    """
+    Guarda las colecciones como snapshot Parquet.
+
+    Args:
+        datos: Diccionario {colección: DataFrame}
+        directorio: Directorio del snapshot (se crea si no existe)
+
+    Returns:
+        Ruta del manifest del snapshot
+    """
+    if pyarrow is None:
+        raise ImportError("pyarrow es requerido para guardar snapshots (pip install pyarrow)")
+
+    destino = Path(directorio)
+    destino.mkdir(parents=True, exist_ok=True)
+    manifest = {'creado': datetime.now().isoformat(), 'colecciones': {}}
+
+    for coleccion, df in datos.items():
+        archivo = f"{coleccion}.parquet"
+        df.apply(_columna_parquet).to_parquet(destino / archivo, index=False)
+        manifest['colecciones'][coleccion] = {'archivo': archivo, 'registros': len(df)}
+
+    ruta_manifest = destino / MANIFEST_FILE
+    with open(ruta_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return ruta_manifest
+
+
+def cargar_snapshot(directorio: str, colecciones: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Carga un snapshot Parquet guardado con `guardar_snapshot`.
+
+    Args:
+        directorio: Directorio del snapshot
+        colecciones: Colecciones a cargar (por defecto, todas las del manifest);
+            las ausentes en el snapshot se retornan vacías
+    """
+    origen = Path(directorio)
+    with open(origen / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    disponibles = manifest['colecciones']
+    datos = {}
+    for coleccion in (colecciones if colecciones is not None else disponibles):
+        info = disponibles.get(coleccion)
+        datos[coleccion] = pd.read_parquet(origen / info['archivo']) if info else pd.DataFrame()
+    return datos
+
+
+def snapshot_configurado() -> Optional[Path]:
+    """Retorna EMPRESTITO_SNAPSHOT_DIR si apunta a un snapshot existente."""
+    directorio = os.getenv('EMPRESTITO_SNAPSHOT_DIR')
+    if directorio and (Path(directorio) / MANIFEST_FILE).exists():
+        return Path(directorio)
+    return None
+
+
+def cargar_datos_emprestito(
+    db,
+    colecciones: Iterable[str] = COLECCIONES_EMPRESTITO,
+    proyecciones: bool = True
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Carga las colecciones para un informe desde el snapshot configurado o
+    desde Firestore, y guarda un snapshot si EMPRESTITO_SNAPSHOT_SAVE_DIR
+    está definida.
+
+    Args:
+        db: Cliente de Firestore (puede ser None si hay snapshot configurado)
+        colecciones: Nombres de las colecciones
+        proyecciones: Si True, solicita solo CAMPOS_POR_COLECCION
+
+    Returns:
+        Tupla (resultados, origen): resultados es {colección: DataFrame o
+        Exception} y origen es 'snapshot' o 'firestore'
+    """
+    colecciones = list(colecciones)
+    snapshot = snapshot_configurado()
+    if snapshot is not None:
+        return cargar_snapshot(str(snapshot), colecciones), 'snapshot'
+
+    if db is None:
+        raise RuntimeError("Firestore no está configurado y no hay snapshot (EMPRESTITO_SNAPSHOT_DIR)")
+
+    resultados = descargar_colecciones(db, colecciones, proyecciones=proyecciones)
+
+    destino = os.getenv('EMPRESTITO_SNAPSHOT_SAVE_DIR')
+    if destino:
+        try:
+            descargados = {c: df for c, df in resultados.items() if isinstance(df, pd.DataFrame)}
+            ruta = guardar_snapshot(descargados, destino)
+            print(f"Snapshot guardado: {ruta.parent}")
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el snapshot en {destino}: {e}")
+
+    return resultados, 'firestore'
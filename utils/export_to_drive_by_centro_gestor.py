@@ -7,15 +7,23 @@ This module reads data from the Firebase "unidades_proyecto" collection,
 groups records by "nombre_centro_gestor", creates individual Excel files,
 and uploads them to a specified Google Drive folder.
 
+Workbooks are built in a process pool and uploaded by a bounded thread pool
+(resumable uploads). Each uploaded file records a hash of its content in the
+Drive `appProperties`; centros whose content did not change since the last
+export are not uploaded again.
+
 Author: AI Assistant
 Version: 1.0
 """
 
 import os
 import sys
+import hashlib
+import threading
 import pandas as pd
 import io
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
 # Add project root to path
@@ -24,6 +32,19 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.config import get_firestore_client, get_drive_service
 
 
+EXCEL_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Drive appProperties key holding the content hash of the exported data.
+# Bump EXPORT_FORMAT_VERSION when the workbook layout changes so every
+# centro is re-uploaded once.
+CONTENT_HASH_PROPERTY = 'content_hash'
+EXPORT_FORMAT_VERSION = '1'
+
+RESUMABLE_CHUNK_SIZE = 5 * 1024 * 1024
+
+_thread_local = threading.local()
+
+
 def fetch_unidades_proyecto_from_firebase(collection_name: str = "unidades_proyecto") -> Optional[pd.DataFrame]:
     """
     Fetch all documents from the unidades_proyecto collection in Firebase.
@@ -149,13 +170,59 @@ def group_by_centro_gestor(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
     return grouped
 
 
-def dataframe_to_excel_buffer(df: pd.DataFrame, sheet_name: str = "Datos") -> Optional[io.BytesIO]:
+def prepare_export_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepare a DataFrame for Excel export (drops geometry, stringifies datetimes).
+    
+    Args:
+        df: DataFrame to export
+        
+    Returns:
+        Copy of the DataFrame ready to be written
+    """
+    # Remove geometry column if present (can't be serialized to Excel)
+    df_export = df.copy()
+    if 'geometry' in df_export.columns:
+        df_export = df_export.drop(columns=['geometry'])
+    
+    # Convert datetime columns to strings for Excel compatibility
+    for col in df_export.columns:
+        if df_export[col].dtype == 'datetime64[ns]':
+            df_export[col] = df_export[col].astype(str)
+    
+    return df_export
+
+
+def compute_content_hash(df_export: pd.DataFrame, sheet_name: str) -> str:
+    """
+    Hash the exported data (not the workbook bytes, which embed timestamps).
+    
+    Args:
+        df_export: DataFrame as returned by prepare_export_frame
+        sheet_name: Sheet name used in the workbook
+        
+    Returns:
+        SHA-256 hex digest
+    """
+    payload = df_export.to_json(orient='split', date_format='iso', default_handler=str, force_ascii=False)
+    digest = hashlib.sha256()
+    digest.update(f"v{EXPORT_FORMAT_VERSION}|{sheet_name}|".encode('utf-8'))
+    digest.update(payload.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def dataframe_to_excel_buffer(
+    df: pd.DataFrame,
+    sheet_name: str = "Datos",
+    prepared: bool = False
+) -> Optional[io.BytesIO]:
     """
     Convert a DataFrame to an Excel file in memory (BytesIO buffer).
     
     Args:
         df: DataFrame to convert
         sheet_name: Name for the Excel sheet
+        prepared: True if df already went through prepare_export_frame
         
     Returns:
         BytesIO buffer with Excel file or None if failed
@@ -164,15 +231,7 @@ def dataframe_to_excel_buffer(df: pd.DataFrame, sheet_name: str = "Datos") -> Op
         # Create a BytesIO buffer
         buffer = io.BytesIO()
         
-        # Remove geometry column if present (can't be serialized to Excel)
-        df_export = df.copy()
-        if 'geometry' in df_export.columns:
-            df_export = df_export.drop(columns=['geometry'])
-        
-        # Convert datetime columns to strings for Excel compatibility
-        for col in df_export.columns:
-            if df_export[col].dtype == 'datetime64[ns]':
-                df_export[col] = df_export[col].astype(str)
+        df_export = df if prepared else prepare_export_frame(df)
         
         # Write to Excel using openpyxl engine
         with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
@@ -188,12 +247,68 @@ def dataframe_to_excel_buffer(df: pd.DataFrame, sheet_name: str = "Datos") -> Op
         return None
 
 
+def _thread_http(service):
+    """
+    Per-thread authorized HTTP object for Drive requests.
+    
+    httplib2 connections are not thread-safe, so each upload thread executes
+    its requests with its own connection (same credentials as `service`).
+    Returns None (use the service's own connection) if it cannot be built.
+    """
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        credentials = getattr(getattr(service, '_http', None), 'credentials', None)
+        if credentials is None:
+            return None
+        try:
+            import google_auth_httplib2
+            import httplib2
+            http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        except ImportError:
+            return None
+        _thread_local.http = http
+    return http
+
+
+def list_drive_folder_files(service, folder_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    List the files in a Drive folder with their appProperties.
+    
+    Args:
+        service: Drive service
+        folder_id: Google Drive folder ID
+        
+    Returns:
+        Dictionary {file name: {'id': ..., 'appProperties': {...}}}
+    """
+    files = {}
+    page_token = None
+    while True:
+        response = service.files().list(
+            q=f"'{folder_id}' in parents and trashed=false",
+            fields='nextPageToken, files(id, name, appProperties)',
+            pageSize=1000,
+            pageToken=page_token,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True
+        ).execute()
+        for item in response.get('files', []):
+            # Keep the first match per name (same as the single-file lookup)
+            files.setdefault(item['name'], {'id': item['id'], 'appProperties': item.get('appProperties', {})})
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return files
+
+
 def upload_excel_to_drive(
     excel_buffer: io.BytesIO,
     filename: str,
     folder_id: str,
-    mime_type: str = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    user_email: Optional[str] = None
+    mime_type: str = EXCEL_MIME_TYPE,
+    user_email: Optional[str] = None,
+    existing_file_id: Optional[str] = None,
+    lookup_existing: bool = True,
+    app_properties: Optional[Dict[str, str]] = None
 ) -> Optional[str]:
     """
     Upload an Excel file (from BytesIO buffer) to Google Drive.
@@ -205,6 +320,9 @@ def upload_excel_to_drive(
         folder_id: Google Drive folder ID where to upload
         mime_type: MIME type for Excel files
         user_email: Email del usuario de Google Workspace para Domain-Wide Delegation (opcional)
+        existing_file_id: ID of the file to update, if already known
+        lookup_existing: If True and existing_file_id is None, search the folder for the file
+        app_properties: Drive appProperties to set on the file
         
     Returns:
         File ID of uploaded file or None if failed
@@ -217,41 +335,48 @@ def upload_excel_to_drive(
             print("❌ Failed to get Drive service")
             return None
         
+        http = _thread_http(service)
+        
         # Check if file already exists in the folder
-        existing_file_id = None
-        try:
-            query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-            results = service.files().list(
-                q=query,
-                fields='files(id, name)',
-                pageSize=1,
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True
-            ).execute()
-            
-            files = results.get('files', [])
-            if files:
-                existing_file_id = files[0]['id']
-                print(f"   📝 File exists, will update: {filename}")
-        except Exception as e:
-            print(f"   ⚠️  Could not check for existing file: {e}")
+        if existing_file_id is None and lookup_existing:
+            try:
+                query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
+                results = service.files().list(
+                    q=query,
+                    fields='files(id, name)',
+                    pageSize=1,
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True
+                ).execute(http=http)
+                
+                files = results.get('files', [])
+                if files:
+                    existing_file_id = files[0]['id']
+            except Exception as e:
+                print(f"   ⚠️  Could not check for existing file: {e}")
         
-        # Create MediaIoBaseUpload from buffer
+        if existing_file_id:
+            print(f"   📝 File exists, will update: {filename}")
+        
+        # Create resumable MediaIoBaseUpload from buffer
         excel_buffer.seek(0)  # Reset buffer position
         media = MediaIoBaseUpload(
             excel_buffer,
             mimetype=mime_type,
+            chunksize=RESUMABLE_CHUNK_SIZE,
             resumable=True
         )
         
         if existing_file_id:
             # Update existing file
+            body = {'appProperties': app_properties} if app_properties else None
             file = service.files().update(
                 fileId=existing_file_id,
+                body=body,
                 media_body=media,
                 fields='id, name, webViewLink',
                 supportsAllDrives=True
-            ).execute()
+            ).execute(http=http)
             print(f"   ✅ Updated: {filename}")
         else:
             # Create new file
@@ -259,12 +384,14 @@ def upload_excel_to_drive(
                 'name': filename,
                 'parents': [folder_id]
             }
+            if app_properties:
+                file_metadata['appProperties'] = app_properties
             file = service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id, name, webViewLink',
                 supportsAllDrives=True
-            ).execute()
+            ).execute(http=http)
             print(f"   ✅ Uploaded: {filename}")
         
         file_id = file.get('id')
@@ -282,21 +409,94 @@ def upload_excel_to_drive(
         return None
 
 
+def build_centro_workbook(centro_gestor: str, df_export: pd.DataFrame, content_hash: str) -> Dict[str, Any]:
+    """
+    Build the Excel workbook for one centro gestor (runs in a worker process).
+    
+    Args:
+        centro_gestor: Centro gestor name
+        df_export: Records of the centro gestor, as returned by prepare_export_frame
+        content_hash: Hash of df_export (compute_content_hash)
+        
+    Returns:
+        Dictionary with centro_gestor, filename, records, content_hash and
+        content (workbook bytes, None if it could not be created)
+    """
+    excel_buffer = dataframe_to_excel_buffer(df_export, sheet_name=centro_gestor[:31], prepared=True)
+    return {
+        'centro_gestor': centro_gestor,
+        'filename': f"{clean_filename(centro_gestor)}.xlsx",
+        'records': len(df_export),
+        'content_hash': content_hash,
+        'content': excel_buffer.getvalue() if excel_buffer else None
+    }
+
+
+def iter_centro_workbooks(prepared: Dict[str, Tuple[pd.DataFrame, str]], build_workers: int = 4):
+    """
+    Build the workbooks of the given centros, yielding each one as soon as it is ready.
+    
+    Uses a process pool; if the pool cannot be used (restricted runtime,
+    unpicklable values) the remaining workbooks are built in-process.
+    
+    Args:
+        prepared: Dictionary {centro_gestor: (export DataFrame, content hash)}
+        build_workers: Worker processes (1 builds in-process)
+        
+    Yields:
+        Dictionaries as returned by build_centro_workbook (with 'error' on failure)
+    """
+    pending = dict(prepared)
+    
+    if build_workers > 1 and len(pending) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(build_workers, len(pending))) as executor:
+                futures = {
+                    executor.submit(build_centro_workbook, centro_gestor, df_export, content_hash): centro_gestor
+                    for centro_gestor, (df_export, content_hash) in pending.items()
+                }
+                for future in as_completed(futures):
+                    centro_gestor = futures[future]
+                    built = future.result()
+                    del pending[centro_gestor]
+                    yield built
+        except Exception as e:
+            if pending:
+                print(f"⚠️  Process pool unavailable ({e}), building {len(pending)} files in-process")
+    
+    for centro_gestor, (df_export, content_hash) in pending.items():
+        try:
+            yield build_centro_workbook(centro_gestor, df_export, content_hash)
+        except Exception as e:
+            yield {'centro_gestor': centro_gestor, 'error': str(e)}
+
+
 def export_and_upload_by_centro_gestor(
     collection_name: str = "unidades_proyecto",
     drive_folder_id: str = "1YCSnfvt2vbaDFj8kwooGgVwS9fhOJAU-",
     temp_dir: Optional[str] = None,
-    user_email: Optional[str] = None
+    user_email: Optional[str] = None,
+    build_workers: int = 4,
+    upload_workers: int = 4,
+    force_upload: bool = False
 ) -> Dict[str, any]:
     """
     Main function to export unidades_proyecto data grouped by centro_gestor
     and upload Excel files to Google Drive.
     
+    Workbooks are built in a process pool and uploaded concurrently as they
+    become ready. Centros whose content hash matches the appProperties of
+    the file already in Drive are skipped before their workbook is built
+    (the local backup in temp_dir only receives the rebuilt files).
+    
     Args:
         collection_name: Firebase collection name
         drive_folder_id: Google Drive folder ID for uploads
         temp_dir: Optional local directory to save files (for backup)
         user_email: Email del usuario de Google Workspace para Domain-Wide Delegation (opcional)
+        build_workers: Processes used to build workbooks
+        upload_workers: Concurrent Drive uploads
+        force_upload: If True, upload every file even if unchanged
         
     Returns:
         Dictionary with execution results
@@ -313,6 +513,7 @@ def export_and_upload_by_centro_gestor(
         'total_grupos': 0,
         'files_created': 0,
         'files_uploaded': 0,
+        'files_unchanged': 0,
         'errors': []
     }
     
@@ -344,47 +545,87 @@ def export_and_upload_by_centro_gestor(
             temp_path.mkdir(parents=True, exist_ok=True)
             print(f"📁 Backup directory: {temp_path}")
         
+        # Files already in the Drive folder (id + appProperties with content hash)
+        remote_files = None
+        try:
+            service = get_drive_service(user_email=user_email)
+            if service:
+                remote_files = list_drive_folder_files(service, drive_folder_id)
+                print(f"☁️  Files already in Drive folder: {len(remote_files)}")
+        except Exception as e:
+            print(f"⚠️  Could not list Drive folder, files will be looked up one by one: {e}")
+        
+        # Hash each centro's data first; only changed centros get a workbook built
+        to_build = {}
         for centro_gestor, df_centro in grouped.items():
-            try:
-                # Clean centro_gestor name for filename
-                safe_filename = clean_filename(centro_gestor)
-                excel_filename = f"{safe_filename}.xlsx"
-                
-                print(f"\n📊 Processing: {centro_gestor}")
-                print(f"   Records: {len(df_centro)}")
-                print(f"   Filename: {excel_filename}")
+            df_export = prepare_export_frame(df_centro)
+            content_hash = compute_content_hash(df_export, centro_gestor[:31])
+            remote = remote_files.get(f"{clean_filename(centro_gestor)}.xlsx") if remote_files is not None else None
+            remote_hash = (remote or {}).get('appProperties', {}).get(CONTENT_HASH_PROPERTY)
+            if not force_upload and remote_hash == content_hash:
+                print(f"   ⏭️  {centro_gestor}: unchanged since last export, skipped")
+                results['files_unchanged'] += 1
+                continue
+            to_build[centro_gestor] = (df_export, content_hash)
+        
+        print(f"🔨 Workbooks to build: {len(to_build)}/{len(grouped)}")
+        
+        with ThreadPoolExecutor(max_workers=max(1, upload_workers)) as uploader:
+            upload_futures = {}
+            
+            for built in iter_centro_workbooks(to_build, build_workers=build_workers):
+                centro_gestor = built['centro_gestor']
                 
-                # Create Excel buffer
-                excel_buffer = dataframe_to_excel_buffer(df_centro, sheet_name=centro_gestor[:31])
-                if not excel_buffer:
+                if built.get('error') or not built.get('content'):
+                    detail = f": {built['error']}" if built.get('error') else ''
+                    print(f"   ❌ Failed to create Excel for '{centro_gestor}'{detail}")
                     results['errors'].append(f"Failed to create Excel for '{centro_gestor}'")
                     continue
                 
+                excel_filename = built['filename']
+                
+                print(f"\n📊 Processing: {centro_gestor}")
+                print(f"   Records: {built['records']}")
+                print(f"   Filename: {excel_filename}")
+                
                 results['files_created'] += 1
                 
                 # Save to local temp directory if specified
                 if temp_dir:
                     local_file = temp_path / excel_filename
                     with open(local_file, 'wb') as f:
-                        excel_buffer.seek(0)
-                        f.write(excel_buffer.read())
+                        f.write(built['content'])
                     print(f"   💾 Saved locally: {local_file}")
-                    excel_buffer.seek(0)  # Reset for upload
                 
-                # Upload to Google Drive
-                file_id = upload_excel_to_drive(excel_buffer, excel_filename, drive_folder_id, user_email=user_email)
+                remote = remote_files.get(excel_filename) if remote_files is not None else None
+                
+                # Upload to Google Drive (in background)
+                future = uploader.submit(
+                    upload_excel_to_drive,
+                    io.BytesIO(built['content']),
+                    excel_filename,
+                    drive_folder_id,
+                    user_email=user_email,
+                    existing_file_id=remote['id'] if remote else None,
+                    lookup_existing=remote_files is None,
+                    app_properties={CONTENT_HASH_PROPERTY: built['content_hash']}
+                )
+                upload_futures[future] = (centro_gestor, excel_filename)
+            
+            for future in as_completed(upload_futures):
+                centro_gestor, excel_filename = upload_futures[future]
+                try:
+                    file_id = future.result()
+                except Exception as e:
+                    file_id = None
+                    print(f"   ❌ Error processing '{centro_gestor}': {e}")
                 if file_id:
                     results['files_uploaded'] += 1
                 else:
                     results['errors'].append(f"Failed to upload '{excel_filename}'")
-                
-            except Exception as e:
-                error_msg = f"Error processing '{centro_gestor}': {e}"
-                print(f"   ❌ {error_msg}")
-                results['errors'].append(error_msg)
         
-        # Mark as successful if at least one file was uploaded
-        results['success'] = results['files_uploaded'] > 0
+        # Mark as successful if at least one file was uploaded or already up to date
+        results['success'] = results['files_uploaded'] + results['files_unchanged'] > 0
         
         return results
         
@@ -414,6 +655,7 @@ def print_results_summary(results: Dict[str, any]):
     print(f"\n📁 File Operations:")
     print(f"   Files created: {results['files_created']}")
     print(f"   Files uploaded: {results['files_uploaded']}")
+    print(f"   Files unchanged (skipped): {results.get('files_unchanged', 0)}")
     
     if results['errors']:
         print(f"\n⚠️  Errors ({len(results['errors'])}):")
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Geocoding Cache and Request Throttling
+
+Support module for GoogleMapsGeocoder:
+- GeocodeCache: SQLite-backed cache of Google Maps responses keyed by
+  rounded coordinates (reverse) or normalized address (forward), shared
+  across runs. Entries expire after `max_age_seconds` ("no results"
+  entries after the shorter `empty_max_age_seconds`).
+- TokenBucket: thread-safe rate limiter used by the concurrent dispatcher.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'app_outputs', 'cache', 'geocode_cache.sqlite'
+)
+
+# 6 decimals ~ 0.1 m: only identical locations share a cache entry
+COORDINATE_PRECISION = 6
+
+# Responses are reused for 30 days; "no results" for 7 (addresses get indexed later)
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+DEFAULT_EMPTY_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+MISSING = object()
+
+
+def coordinate_key(latitude: float, longitude: float, precision: int = COORDINATE_PRECISION) -> str:
+    """Cache key for a coordinate pair (rounded to `precision` decimals)."""
+    return f"{round(float(latitude), precision):.{precision}f},{round(float(longitude), precision):.{precision}f}"
+
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address: case-folded with collapsed whitespace."""
+    return re.sub(r'\s+', ' ', str(address)).strip().casefold()
+
+
+class GeocodeCache:
+    """
+    Persistent cache of geocoding responses.
+
+    Empty responses (no results) are cached as well; API errors are not.
+    Expired entries are treated as misses and overwritten by the next `set`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_age_seconds: Optional[float] = DEFAULT_MAX_AGE_SECONDS,
+        empty_max_age_seconds: Optional[float] = DEFAULT_EMPTY_MAX_AGE_SECONDS
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite file path (defaults to app_outputs/cache/geocode_cache.sqlite)
+            max_age_seconds: Lifetime of cached responses (None: never expire)
+            empty_max_age_seconds: Lifetime of "no results" entries (None: same as max_age_seconds)
+        """
+        self.path = os.path.abspath(path or DEFAULT_CACHE_PATH)
+        self.max_age_seconds = max_age_seconds
+        self.empty_max_age_seconds = empty_max_age_seconds if empty_max_age_seconds is not None else max_age_seconds
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode_cache ("
+            " kind TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " language TEXT NOT NULL,"
+            " response TEXT,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, key, language))"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, response: Optional[str], created_at: float, now: float) -> bool:
+        """True if a row is younger than the max age for its kind of response."""
+        max_age = self.max_age_seconds if response is not None else self.empty_max_age_seconds
+        return max_age is None or now - created_at <= max_age
+
+    def get(self, kind: str, key: str, language: str) -> Any:
+        """
+        Look up a cached response.
+
+        Returns:
+            The cached response (possibly None for "no results") or the
+            module sentinel `MISSING` when the key is not cached or expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM geocode_cache WHERE kind = ? AND key = ? AND language = ?",
+                (kind, key, language)
+            ).fetchone()
+        if row is None or not self._is_fresh(row[0], row[1], time.time()):
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(row[0]) if row[0] is not None else None
+
+    def get_many(self, kind: str, keys: Iterable[str], language: str) -> Dict[str, Any]:
+        """Look up several keys at once; only cached, unexpired keys are returned."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, response, created_at FROM geocode_cache "
+                    f"WHERE kind = ? AND language = ? AND key IN ({placeholders})",
+                    (kind, language, *chunk)
+                ).fetchall()
+                for key, response, created_at in rows:
+                    if self._is_fresh(response, created_at, now):
+                        found[key] = json.loads(response) if response is not None else None
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, kind: str, key: str, language: str, response: Any):
+        """Store a response (None means the API returned no results)."""
+        payload = json.dumps(response, ensure_ascii=False) if response is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (kind, key, language, response, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, key, language, payload, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second with bursts of
+    up to `capacity` requests.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
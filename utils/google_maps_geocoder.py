@@ -10,6 +10,8 @@ Features:
 - Extraction of neighborhood (barrio/vereda) and district (comuna/corregimiento)
 - Rate limiting and error handling
 - Authentication with ADC/WIF
+- Persistent SQLite cache of responses and concurrent, rate-limited
+  dispatch of uncached requests (see geocode_cache.py)
 
 Author: AI Assistant
 Version: 1.0
@@ -18,16 +20,25 @@ Version: 1.0
 import os
 import sys
 import json
-import time
+import threading
 import pandas as pd
 import googlemaps
-from typing import Optional, Dict, Tuple, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Tuple, List, Iterable
 from google.auth import default
 from google.auth.transport.requests import Request
 
 # Add database to path for config
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.geocode_cache import (
+    GeocodeCache,
+    MISSING,
+    TokenBucket,
+    coordinate_key,
+    normalize_address
+)
+
 
 class GoogleMapsGeocoder:
     """
@@ -37,20 +48,39 @@ class GoogleMapsGeocoder:
     Application Default Credentials for secure authentication.
     """
     
-    def __init__(self, api_key: Optional[str] = None, use_adc: bool = True):
+    backend_name = 'GOOGLE MAPS'
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        use_adc: bool = True,
+        use_cache: bool = True,
+        cache_path: Optional[str] = None,
+        max_workers: int = 8,
+        requests_per_second: Optional[float] = None
+    ):
         """
         Initialize Google Maps client with ADC or API key.
         
         Args:
             api_key: Google Maps API key (optional if using ADC)
             use_adc: If True, use Application Default Credentials (recommended for WIF)
+            use_cache: If True, reuse responses stored in the SQLite geocode cache
+            cache_path: Path of the SQLite cache (default: app_outputs/cache/geocode_cache.sqlite)
+            max_workers: Concurrent API requests when processing DataFrames
+            requests_per_second: API rate limit (default: 1 / rate_limit_delay)
         """
         self.api_key = api_key
         self.use_adc = use_adc
         self.client = None
         self.credentials = None
         self.request_count = 0
-        self.rate_limit_delay = 0.1  # 100ms delay between requests
+        self.rate_limit_delay = 0.1  # 100ms between requests (default rate limit)
+        self.max_workers = max(1, max_workers)
+        self.requests_per_second = requests_per_second or 1.0 / self.rate_limit_delay
+        self.cache = GeocodeCache(cache_path) if use_cache else None
+        self._rate_limiter = TokenBucket(self.requests_per_second)
+        self._count_lock = threading.Lock()
         
         self._initialize_client()
     
@@ -124,20 +154,36 @@ class GoogleMapsGeocoder:
             print("❌ Google Maps client not initialized")
             return None
         
+        if self.cache is not None:
+            cached = self.cache.get('reverse', coordinate_key(latitude, longitude), language)
+            if cached is not MISSING:
+                return cached
+        
+        return self._fetch_reverse(latitude, longitude, language)
+    
+    def _call_api(self, func, *args, **kwargs):
+        """Call a Google Maps client method behind the rate limiter."""
+        self._rate_limiter.acquire()
+        results = func(*args, **kwargs)
+        with self._count_lock:
+            self.request_count += 1
+        return results
+    
+    def _fetch_reverse(self, latitude: float, longitude: float, language: str) -> Optional[List[Dict]]:
+        """Reverse geocode through the API and store the response in the cache."""
         try:
-            # Rate limiting
-            if self.request_count > 0:
-                time.sleep(self.rate_limit_delay)
-            
             # Perform reverse geocoding
-            results = self.client.reverse_geocode(
+            results = self._call_api(
+                self.client.reverse_geocode,
                 (latitude, longitude),
                 language=language
             )
+            results = results if results else None
             
-            self.request_count += 1
+            if self.cache is not None:
+                self.cache.set('reverse', coordinate_key(latitude, longitude), language, results)
             
-            return results if results else None
+            return results
             
         except googlemaps.exceptions.ApiError as e:
             print(f"❌ Google Maps API Error: {e}")
@@ -146,6 +192,62 @@ class GoogleMapsGeocoder:
             print(f"❌ Error in reverse geocoding: {e}")
             return None
     
+    def reverse_geocode_many(
+        self,
+        coordinates: Iterable[Tuple[float, float]],
+        language: str = 'es'
+    ) -> Dict[str, Optional[List[Dict]]]:
+        """
+        Reverse geocode many coordinates.
+        
+        Duplicate coordinates are resolved once, cached responses are reused
+        and the remaining requests are sent concurrently (max_workers) behind
+        the rate limiter.
+        
+        Args:
+            coordinates: Iterable of (latitude, longitude)
+            language: Language for results
+            
+        Returns:
+            Dict {coordinate_key(lat, lon): results or None}
+        """
+        unique = {}
+        for latitude, longitude in coordinates:
+            unique.setdefault(coordinate_key(latitude, longitude), (latitude, longitude))
+        
+        if not self.client:
+            print("❌ Google Maps client not initialized")
+            return {key: None for key in unique}
+        
+        results = self.cache.get_many('reverse', unique, language) if self.cache is not None else {}
+        pending = {key: coords for key, coords in unique.items() if key not in results}
+        
+        print(f"   Unique locations: {len(unique)} (cached: {len(unique) - len(pending)}, to request: {len(pending)})")
+        
+        results.update(self._dispatch(
+            pending,
+            lambda coords: self._fetch_reverse(coords[0], coords[1], language)
+        ))
+        return results
+    
+    def _dispatch_description(self) -> str:
+        """Describe how requests are dispatched (for progress output)."""
+        return f"Rate limit: {self.requests_per_second:g} requests/s, {self.max_workers} concurrent workers"
+    
+    def _dispatch(self, pending: Dict[str, object], fetch) -> Dict[str, object]:
+        """Run `fetch` for each pending item concurrently and report progress."""
+        results = {}
+        if not pending:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fetch, item): key for key, item in pending.items()}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if done % 10 == 0:
+                    print(f"   Requested: {done}/{len(pending)} locations...")
+        return results
+    
     def extract_barrio_vereda(self, geocode_results: List[Dict]) -> Optional[str]:
         """
         Extract neighborhood (barrio/vereda) from geocoding results.
@@ -288,24 +390,35 @@ class GoogleMapsGeocoder:
             print("❌ Google Maps client not initialized")
             return None
         
+        if self.cache is not None:
+            cached = self.cache.get('forward', self._address_key(address, region), language)
+            if cached is not MISSING:
+                return cached
+        
+        return self._fetch_forward(address, language, region)
+    
+    @staticmethod
+    def _address_key(address: str, region: str) -> str:
+        """Cache key for forward geocoding (region + normalized address)."""
+        return f"{region}|{normalize_address(address)}"
+    
+    def _fetch_forward(self, address: str, language: str, region: str) -> Optional[Dict]:
+        """Forward geocode through the API and store the response in the cache."""
         try:
-            # Rate limiting
-            if self.request_count > 0:
-                time.sleep(self.rate_limit_delay)
-            
             # Perform forward geocoding
-            results = self.client.geocode(
+            results = self._call_api(
+                self.client.geocode,
                 address,
                 language=language,
                 region=region
             )
             
-            self.request_count += 1
+            result = results[0] if results and len(results) > 0 else None
             
-            if results and len(results) > 0:
-                return results[0]
+            if self.cache is not None:
+                self.cache.set('forward', self._address_key(address, region), language, result)
             
-            return None
+            return result
             
         except googlemaps.exceptions.ApiError as e:
             print(f"❌ Google Maps API Error: {e}")
@@ -314,34 +427,76 @@ class GoogleMapsGeocoder:
             print(f"❌ Error in forward geocoding: {e}")
             return None
     
-    def get_coordinates_from_address(
+    def forward_geocode_many(
         self,
-        address: str
-    ) -> Optional[Tuple[float, float]]:
+        addresses: Iterable[str],
+        language: str = 'es',
+        region: str = 'co'
+    ) -> Dict[str, Optional[Dict]]:
         """
-        Get coordinates (lat, lon) from address string.
-
+        Forward geocode many addresses.
+        
+        Addresses that normalize to the same key are requested once, cached
+        responses are reused and the remaining requests run concurrently.
+        
         Args:
-            address: Full address string
-
+            addresses: Iterable of address strings
+            language: Language for results
+            region: Region bias
+            
         Returns:
-            Tuple of (latitude, longitude) or None if not found
+            Dict {_address_key(address, region): first result or None}
         """
-        result = self.forward_geocode(address)
-
+        unique = {}
+        for address in addresses:
+            unique.setdefault(self._address_key(address, region), address)
+        
+        if not self.client:
+            print("❌ Google Maps client not initialized")
+            return {key: None for key in unique}
+        
+        results = self.cache.get_many('forward', unique, language) if self.cache is not None else {}
+        pending = {key: address for key, address in unique.items() if key not in results}
+        
+        print(f"   Unique addresses: {len(unique)} (cached: {len(unique) - len(pending)}, to request: {len(pending)})")
+        
+        results.update(self._dispatch(
+            pending,
+            lambda address: self._fetch_forward(address, language, region)
+        ))
+        return results
+    
+    @staticmethod
+    def _coordinates_from_result(result: Optional[Dict]) -> Optional[Tuple[float, float]]:
+        """Extract (lat, lon) from a forward geocoding result."""
         if not result:
             return None
-
+        
         geometry = result.get('geometry', {})
         location = geometry.get('location', {})
-
+        
         lat = location.get('lat')
         lon = location.get('lng')
-
+        
         if lat is not None and lon is not None:
             return lat, lon
-
+        
         return None
+    
+    def get_coordinates_from_address(
+        self,
+        address: str
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Get coordinates (lat, lon) from address string.
+
+        Args:
+            address: Full address string
+
+        Returns:
+            Tuple of (latitude, longitude) or None if not found
+        """
+        return self._coordinates_from_result(self.forward_geocode(address))
 
     def geocode_address(self, address: str) -> Optional[Dict]:
         """
@@ -389,7 +544,7 @@ class GoogleMapsGeocoder:
         result_df[output_comuna_column] = "ERROR"
         
         print(f"\n{'='*60}")
-        print("GOOGLE MAPS REVERSE GEOCODING")
+        print(f"{self.backend_name} REVERSE GEOCODING")
         print(f"{'='*60}")
         
         # Filter records to process
@@ -431,14 +586,12 @@ class GoogleMapsGeocoder:
         both_found = 0
         
         print(f"\n🔄 Starting reverse geocoding...")
-        print(f"   Rate limit delay: {self.rate_limit_delay}s between requests")
+        print(f"   {self._dispatch_description()}")
         
-        # Process each record (all should have valid geometry at this point)
-        for idx, row in records_to_process.iterrows():
+        # Extract coordinates from each record (all should have valid geometry at this point)
+        coordinates_by_idx = {}
+        for idx, geometry in records_to_process[geometry_column].items():
             try:
-                # Extract coordinates from geometry
-                geometry = row.get(geometry_column)
-                
                 lat = None
                 lon = None
                 
@@ -468,31 +621,39 @@ class GoogleMapsGeocoder:
                     if isinstance(coords, list) and len(coords) >= 2:
                         lat, lon = coords[0], coords[1]  # Custom format: [latitude, longitude]
                 
-                # If we successfully extracted coordinates, perform reverse geocoding
                 if lat is not None and lon is not None:
-                    # Perform reverse geocoding (API expects lat, lon)
-                    barrio, comuna = self.get_address_info(lat, lon)
-                    
-                    # Update results
-                    if barrio:
-                        result_df.at[idx, output_barrio_column] = barrio
-                        barrio_found += 1
-                    
-                    if comuna:
-                        result_df.at[idx, output_comuna_column] = comuna
-                        comuna_found += 1
-                    
-                    if barrio and comuna:
-                        both_found += 1
-                        success_count += 1
-                    elif barrio or comuna:
-                        success_count += 1
-                    else:
-                        error_count += 1
+                    coordinates_by_idx[idx] = (lat, lon)
+                else:
+                    error_count += 1
                     
-                    # Progress indicator
-                    if (success_count + error_count) % 10 == 0:
-                        print(f"   Processed: {success_count + error_count}/{len(records_to_process)} records...")
+            except Exception as e:
+                print(f"   ⚠️  Error processing record {idx}: {e}")
+                error_count += 1
+                continue
+        
+        # Reverse geocode each distinct location once (cache + concurrent requests)
+        results_by_key = self.reverse_geocode_many(coordinates_by_idx.values())
+        
+        # Update results
+        for idx, (lat, lon) in coordinates_by_idx.items():
+            try:
+                results = results_by_key.get(coordinate_key(lat, lon))
+                barrio = self.extract_barrio_vereda(results) if results else None
+                comuna = self.extract_comuna_corregimiento(results) if results else None
+                
+                if barrio:
+                    result_df.at[idx, output_barrio_column] = barrio
+                    barrio_found += 1
+                
+                if comuna:
+                    result_df.at[idx, output_comuna_column] = comuna
+                    comuna_found += 1
+                
+                if barrio and comuna:
+                    both_found += 1
+                    success_count += 1
+                elif barrio or comuna:
+                    success_count += 1
                 else:
                     error_count += 1
                     
@@ -512,6 +673,8 @@ class GoogleMapsGeocoder:
         print(f"   Comuna/Corregimiento found: {comuna_found}")
         print(f"   Both found: {both_found}")
         print(f"   API requests made: {self.request_count}")
+        if self.cache is not None:
+            print(f"   Cache hits: {self.cache.hits}")
         
         return result_df
     
@@ -569,15 +732,19 @@ class GoogleMapsGeocoder:
         error_count = 0
         
         print(f"\n🔄 Starting forward geocoding...")
-        print(f"   Rate limit delay: {self.rate_limit_delay}s between requests")
+        print(f"   {self._dispatch_description()}")
+        
+        # Geocode each distinct address once (cache + concurrent requests)
+        addresses = valid_addresses[address_column]
+        results_by_key = self.forward_geocode_many(addresses.tolist())
         
         # Process each record
-        for idx, row in valid_addresses.iterrows():
+        for idx, address in addresses.items():
             try:
-                address = row.get(address_column)
-                
                 # Get coordinates
-                coords = self.get_coordinates_from_address(address)
+                coords = self._coordinates_from_result(
+                    results_by_key.get(self._address_key(address, 'co'))
+                )
                 
                 if coords:
                     lat, lon = coords
@@ -594,10 +761,6 @@ class GoogleMapsGeocoder:
                     success_count += 1
                 else:
                     error_count += 1
-                
-                # Progress indicator
-                if (success_count + error_count) % 10 == 0:
-                    print(f"   Processed: {success_count + error_count}/{len(valid_addresses)} records...")
                     
             except Exception as e:
                 print(f"   ⚠️  Error processing record {idx}: {e}")
@@ -612,6 +775,8 @@ class GoogleMapsGeocoder:
         print(f"   Successful: {success_count} ({success_count/total_processed*100:.1f}%)")
         print(f"   Errors: {error_count} ({error_count/total_processed*100:.1f}%)")
         print(f"   API requests made: {self.request_count}")
+        if self.cache is not None:
+            print(f"   Cache hits: {self.cache.hits}")
         
         return result_df
 
@@ -619,7 +784,8 @@ class GoogleMapsGeocoder:
 def reverse_geocode_gdf_geolocalizar(
     input_file: str,
     output_file: Optional[str] = None,
-    max_requests: Optional[int] = None
+    max_requests: Optional[int] = None,
+    backend: str = 'google'
 ) -> pd.DataFrame:
     """
     Main function to perform reverse geocoding on gdf_geolocalizar file.
@@ -628,6 +794,7 @@ def reverse_geocode_gdf_geolocalizar(
         input_file: Path to input Excel/CSV file
         output_file: Path to output file (optional, will overwrite input if not specified)
         max_requests: Maximum number of requests for testing (optional)
+        backend: 'google' (Maps API) or 'local' (offline lookup over basemaps/)
         
     Returns:
         Processed DataFrame
@@ -650,7 +817,13 @@ def reverse_geocode_gdf_geolocalizar(
     print(f"   Columns: {list(df.columns)}")
     
     # Initialize geocoder
-    geocoder = GoogleMapsGeocoder(use_adc=True)
+    if backend == 'local':
+        from utils.admin_resolver import LocalAdminResolver
+        geocoder = LocalAdminResolver()
+    elif backend == 'google':
+        geocoder = GoogleMapsGeocoder(use_adc=True)
+    else:
+        raise ValueError(f"Unknown geocoding backend: {backend}")
     
     # Process data
     result_df = geocoder.process_dataframe(
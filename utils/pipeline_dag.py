@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Planificador DAG de Etapas de Pipeline
+======================================
+
+Ejecuta las etapas de un pipeline ETL dentro del proceso actual:
+1. Cada etapa es una función Python (se importa al ejecutarse, de modo que
+   una etapa omitida no carga su módulo) con sus archivos de entrada,
+   archivos de salida y dependencias declarados.
+2. Las etapas cuyas dependencias ya terminaron se ejecutan en paralelo
+   (ThreadPoolExecutor).
+3. En modo inteligente se omite una etapa cuando el contenido (SHA-256) de
+   sus entradas no cambió desde su última ejecución exitosa y sus salidas
+   siguen intactas; `max_age_seconds` fuerza la ejecución de etapas que
+   consultan fuentes externas (p. ej. SECOP) después de cierto tiempo.
+
+El estado (huellas por etapa y cache de hashes por tamaño/mtime) se guarda
+en app_outputs/cache/pipeline_state/<pipeline>.json.
+
+Uso:
+    dag = StageDAG(etapas, state_file=state_file_for('contratos_emprestito'))
+    resultados = dag.run()                       # todas las etapas
+    resultados = dag.run(only=['transformation_contratos'], force=True)
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+DEFAULT_STATE_DIR = Path(__file__).resolve().parent.parent / 'app_outputs' / 'cache' / 'pipeline_state'
+
+# Incrementar si cambia el formato del estado (invalida las huellas guardadas)
+VERSION_ESTADO = 1
+
+
+def state_file_for(pipeline: str) -> Path:
+    """Ruta del archivo de estado de un pipeline."""
+    return DEFAULT_STATE_DIR / f"{pipeline}.json"
+
+
+@dataclass
+class Stage:
+    """
+    Etapa de un pipeline.
+
+    Attributes:
+        name: Identificador de la etapa (clave en los resultados)
+        func: Función sin argumentos que ejecuta la etapa; debe lanzar una
+            excepción si falla
+        description: Nombre descriptivo para logs y reportes
+        inputs: Archivos o directorios que lee la etapa
+        outputs: Archivos que debe existir al terminar la etapa
+        depends_on: Etapas que deben terminar antes (las que no forman parte
+            del DAG o de la ejecución se consideran satisfechas)
+        max_age_seconds: Antigüedad máxima de la última ejecución para poder
+            omitir la etapa (None = sin límite)
+    """
+    name: str
+    func: Callable[[], Any]
+    description: str = ''
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    depends_on: Tuple[str, ...] = ()
+    max_age_seconds: Optional[float] = None
+
+
+class StageDAG:
+    """
+    Ejecuta un conjunto de etapas respetando sus dependencias.
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[Stage],
+        state_file: Optional[Union[str, Path]] = None,
+        smart_mode: bool = True,
+        max_workers: int = 4,
+        continue_on_failure: bool = True,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        Args:
+            stages: Etapas del pipeline, en orden de declaración
+            state_file: Archivo de estado (None = sin estado, nunca se omite)
+            smart_mode: Omitir etapas cuyas entradas no cambiaron
+            max_workers: Etapas ejecutadas en paralelo como máximo
+            continue_on_failure: Si False, las etapas que dependen de una
+                etapa fallida no se ejecutan
+            logger: Logger del pipeline
+        """
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Etapa duplicada: {stage.name}")
+            self.stages[stage.name] = stage
+
+        self.state_file = Path(state_file) if state_file else None
+        self.smart_mode = smart_mode
+        self.max_workers = max(1, max_workers)
+        self.continue_on_failure = continue_on_failure
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._validar()
+        self._estado = self._cargar_estado()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def run(
+        self,
+        only: Optional[Iterable[str]] = None,
+        force: Union[bool, Iterable[str]] = ()
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Ejecuta las etapas (o el subconjunto `only`) en orden de dependencias.
+
+        Args:
+            only: Nombres de las etapas a ejecutar (por defecto, todas)
+            force: True o nombres de etapas que se ejecutan aunque estén al día
+
+        Returns:
+            Diccionario {etapa: resultado} en orden de declaración; cada
+            resultado tiene success, script, execution_time, skipped, reason,
+            error y timeout_occurred
+        """
+        only = None if only is None else set(only)
+        seleccion = list(self.stages) if only is None else [n for n in self.stages if n in only]
+        desconocidas = (only or set()) - set(self.stages)
+        if desconocidas:
+            raise KeyError(f"Etapas desconocidas: {', '.join(sorted(desconocidas))}")
+        forzadas = set(seleccion) if force is True else set(force or ())
+
+        dependencias = {
+            nombre: [d for d in self.stages[nombre].depends_on if d in seleccion]
+            for nombre in seleccion
+        }
+        pendientes = list(seleccion)
+        resultados: Dict[str, Dict[str, Any]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            en_curso = {}
+            while pendientes or en_curso:
+                listas = [n for n in pendientes if all(d in resultados for d in dependencias[n])]
+                for nombre in listas:
+                    pendientes.remove(nombre)
+                    fallidas = [d for d in dependencias[nombre] if not resultados[d]['success']]
+                    if fallidas and not self.continue_on_failure:
+                        resultados[nombre] = self._resultado(
+                            self.stages[nombre], False, 0.0, skipped=True,
+                            reason='Dependencia fallida',
+                            error=f"No se ejecutó porque falló: {', '.join(fallidas)}"
+                        )
+                        self.logger.warning(f"⏭️ {nombre}: omitida (falló {', '.join(fallidas)})")
+                        continue
+                    futuro = executor.submit(self._ejecutar, self.stages[nombre], nombre in forzadas)
+                    en_curso[futuro] = nombre
+
+                if not en_curso:
+                    continue
+                terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    resultados[en_curso.pop(futuro)] = futuro.result()
+
+        return {nombre: resultados[nombre] for nombre in seleccion}
+
+    def describe(self, only: Optional[Iterable[str]] = None) -> List[str]:
+        """Líneas legibles con las etapas y sus dependencias (para logs)."""
+        only = None if only is None else set(only)
+        lineas = []
+        for nombre, stage in self.stages.items():
+            if only is not None and nombre not in only:
+                continue
+            deps = f" ← {', '.join(stage.depends_on)}" if stage.depends_on else ''
+            lineas.append(f"{nombre}{deps}")
+        return lineas
+
+    # ------------------------------------------------------------------
+    # Ejecución de una etapa
+    # ------------------------------------------------------------------
+
+    def _ejecutar(self, stage: Stage, forzada: bool) -> Dict[str, Any]:
+        """Ejecuta una etapa (u omite si está al día) y actualiza el estado."""
+        inicio = time.time()
+        entradas = self._huellas(stage.inputs)
+
+        motivo = None if forzada else self._motivo_omision(stage, entradas)
+        if motivo:
+            self.logger.info(f"⏭️ {stage.name}: omitida - {motivo}")
+            return self._resultado(stage, True, time.time() - inicio, skipped=True, reason=motivo)
+
+        self.logger.info(f"🚀 {stage.name}: ejecutando {stage.description or stage.func.__name__}")
+        error = None
+        try:
+            stage.func()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            self.logger.debug(traceback.format_exc())
+
+        if error is None:
+            faltantes = [ruta for ruta in stage.outputs if not os.path.exists(ruta)]
+            if faltantes:
+                error = f"Salidas no generadas: {', '.join(faltantes)}"
+
+        duracion = time.time() - inicio
+        if error is not None:
+            self.logger.error(f"❌ {stage.name}: {error}")
+            return self._resultado(stage, False, duracion, error=error)
+
+        self._registrar(stage.name, {
+            'inputs': entradas,
+            'outputs': self._huellas(stage.outputs),
+            'finished_at': time.time(),
+            'duration': round(duracion, 3)
+        })
+        self.logger.info(f"✅ {stage.name}: completada en {duracion:.1f}s")
+        return self._resultado(stage, True, duracion)
+
+    def _motivo_omision(self, stage: Stage, entradas: Dict[str, Optional[str]]) -> Optional[str]:
+        """Retorna el motivo para omitir la etapa, o None si debe ejecutarse."""
+        if not self.smart_mode or self.state_file is None or not stage.inputs:
+            return None
+
+        with self._lock:
+            registro = self._estado['stages'].get(stage.name)
+        if not registro or registro.get('inputs') != entradas:
+            return None
+        if any(h is None for h in entradas.values()):
+            return None
+        if stage.max_age_seconds is not None and time.time() - registro.get('finished_at', 0) > stage.max_age_seconds:
+            return None
+        if self._huellas(stage.outputs) != registro.get('outputs'):
+            return None
+        return 'Entradas sin cambios'
+
+    @staticmethod
+    def _resultado(
+        stage: Stage,
+        success: bool,
+        execution_time: float,
+        skipped: bool = False,
+        reason: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        resultado = {
+            'success': success,
+            'script': stage.description or stage.name,
+            'execution_time': execution_time,
+            'skipped': skipped,
+            'timeout_occurred': False
+        }
+        if reason:
+            resultado['reason'] = reason
+        if error:
+            resultado['error'] = error
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Huellas de contenido
+    # ------------------------------------------------------------------
+
+    def _huellas(self, rutas: Iterable[str]) -> Dict[str, Optional[str]]:
+        return {ruta: self._huella(ruta) for ruta in rutas}
+
+    def _huella(self, ruta: str) -> Optional[str]:
+        """SHA-256 de un archivo o de los archivos de un directorio (None si no existe)."""
+        path = Path(ruta)
+        if path.is_file():
+            return self._hash_archivo(path)
+        if path.is_dir():
+            digest = hashlib.sha256()
+            for archivo in sorted(p for p in path.rglob('*') if p.is_file()):
+                digest.update(f"{archivo.relative_to(path).as_posix()}\0{self._hash_archivo(archivo)}\n".encode())
+            return digest.hexdigest()
+        return None
+
+    def _hash_archivo(self, path: Path) -> str:
+        """SHA-256 de un archivo, reutilizado mientras no cambien tamaño y mtime."""
+        info = path.stat()
+        clave = str(path.resolve())
+        with self._lock:
+            previo = self._estado['files'].get(clave)
+        if previo and previo[0] == info.st_size and previo[1] == info.st_mtime_ns:
+            return previo[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(bloque)
+        sha = digest.hexdigest()
+        with self._lock:
+            self._estado['files'][clave] = [info.st_size, info.st_mtime_ns, sha]
+        return sha
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    def _validar(self):
+        """Verifica que no haya ciclos (las dependencias externas se ignoran)."""
+        visitando, visitadas = set(), set()
+
+        def visitar(nombre: str, camino: List[str]):
+            if nombre in visitadas:
+                return
+            if nombre in visitando:
+                raise ValueError(f"Ciclo de dependencias: {' → '.join(camino + [nombre])}")
+            visitando.add(nombre)
+            for dep in self.stages[nombre].depends_on:
+                if dep in self.stages:
+                    visitar(dep, camino + [nombre])
+            visitando.discard(nombre)
+            visitadas.add(nombre)
+
+        for nombre in self.stages:
+            visitar(nombre, [])
+
+    def _cargar_estado(self) -> Dict[str, Any]:
+        vacio = {'version': VERSION_ESTADO, 'stages': {}, 'files': {}}
+        if self.state_file is None or not self.state_file.exists():
+            return vacio
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Estado del pipeline ilegible ({e}), se ejecutarán todas las etapas")
+            return vacio
+        if estado.get('version') != VERSION_ESTADO:
+            return vacio
+        estado.setdefault('stages', {})
+        estado.setdefault('files', {})
+        return estado
+
+    def _registrar(self, nombre: str, registro: Dict[str, Any]):
+        """Guarda el registro de una etapa exitosa (escritura atómica)."""
+        if self.state_file is None:
+            return
+        with self._lock:
+            self._estado['stages'][nombre] = registro
+            try:
+                self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                temporal = self.state_file.with_suffix(f'.{os.getpid()}.tmp')
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(self._estado, f, ensure_ascii=False, indent=2)
+                temporal.replace(self.state_file)
+            except OSError as e:
+                self.logger.warning(f"⚠️ No se pudo guardar el estado del pipeline: {e}")
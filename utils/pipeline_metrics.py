@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas por Fase de Pipelines ETL
+==================================
+
+Instrumentación para identificar qué fase domina una ejecución lenta:
+1. `ejecucion_medida(pipeline)` abre una ejecución; cada `span(nombre)` (o
+   función decorada con `medir`) registra tiempo de pared, tiempo de CPU,
+   pico de memoria (RSS), filas de entrada/salida y llamadas a Firestore.
+2. Cada span se escribe como una línea JSON en
+   app_outputs/logs/metrics/<pipeline>_<fecha>_<run_id>.jsonl.
+3. Si `opentelemetry` está instalado y PIPELINE_METRICS_OTEL=1, cada span se
+   replica como span de OpenTelemetry (con el proveedor que configure el
+   entorno).
+
+Fuera de una ejecución medida, `span` y `medir` no registran nada, de modo
+que los módulos de transformación pueden instrumentarse sin condicionales.
+
+Notas sobre las medidas:
+- El tiempo de CPU y las llamadas a Firestore son del proceso completo
+  durante el span (incluyen otros hilos activos).
+- El pico de RSS es el máximo del proceso; `rss_pico_delta_mb` indica
+  cuánto lo elevó el span.
+
+Variables de entorno:
+- PIPELINE_METRICS_DIR: directorio de los archivos JSONL
+- PIPELINE_METRICS_OTEL: '1' para exportar spans de OpenTelemetry
+
+Uso:
+    with ejecucion_medida('unidades_proyecto'):
+        with span('transformacion', filas_entrada=len(df)) as s:
+            gdf = transformar(df)
+            s.filas(salida=len(gdf))
+
+    python utils/pipeline_metrics.py base.jsonl actual.jsonl   # comparar
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - dependencia opcional
+    psutil = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - dependencia opcional
+    otel_trace = None
+
+
+DEFAULT_METRICS_DIR = Path(__file__).resolve().parent.parent / 'app_outputs' / 'logs' / 'metrics'
+
+_ejecucion_activa: Optional['EjecucionMedida'] = None
+_span_actual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('pipeline_metrics_span', default=None)
+
+
+# ----------------------------------------------------------------------
+# Medidas del proceso
+# ----------------------------------------------------------------------
+
+def rss_pico_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)."""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB, macOS bytes
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    if psutil is not None:
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, 'peak_wset', memoria.rss) / (1024 * 1024)
+    return None
+
+
+def contar_filas(valor: Any) -> Optional[int]:
+    """Número de filas de un DataFrame, GeoJSON (features) o lista; None para otros valores."""
+    if valor is None or isinstance(valor, (bool, str, bytes)):
+        return None
+    if hasattr(valor, 'shape') and hasattr(valor, 'columns'):
+        return int(valor.shape[0])
+    if isinstance(valor, dict):
+        features = valor.get('features')
+        return len(features) if isinstance(features, list) else None
+    if isinstance(valor, (list, tuple)):
+        return len(valor)
+    return None
+
+
+# ----------------------------------------------------------------------
+# Contadores de Firestore
+# ----------------------------------------------------------------------
+
+_firestore_lock = threading.Lock()
+_firestore_contadores: Dict[str, int] = defaultdict(int)
+_firestore_instrumentado = False
+
+
+def _contar_firestore(**incrementos: int):
+    with _firestore_lock:
+        for clave, valor in incrementos.items():
+            _firestore_contadores[clave] += valor
+
+
+def contadores_firestore() -> Dict[str, int]:
+    """Copia de los contadores acumulados (rpcs, lecturas, escrituras) del proceso."""
+    with _firestore_lock:
+        return dict(_firestore_contadores)
+
+
+class _IteradorContado:
+    """Itera un stream de Firestore contando documentos leídos."""
+
+    def __init__(self, iterador):
+        self._iterador = iterador
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        documento = next(self._iterador)
+        _contar_firestore(lecturas=1)
+        return documento
+
+    def __getattr__(self, nombre):
+        return getattr(self._iterador, nombre)
+
+
+def instrumentar_firestore() -> bool:
+    """
+    Cuenta las RPC de google-cloud-firestore del proceso (idempotente).
+
+    Se envuelven solo los métodos que emiten la RPC (Query.stream, que usan
+    también CollectionReference.get/stream; DocumentReference.get/delete;
+    Client.get_all; WriteBatch.commit, que usan DocumentReference.set/update),
+    de modo que cada llamada se cuenta una vez.
+
+    Returns:
+        True si Firestore está instrumentado
+    """
+    global _firestore_instrumentado
+    if _firestore_instrumentado:
+        return True
+    try:
+        from google.cloud.firestore_v1 import Client, CollectionReference, DocumentReference, Query, WriteBatch
+    except ImportError:
+        return False
+
+    def envolver(clase, metodo, antes=None, contar_resultado=False):
+        original = getattr(clase, metodo)
+
+        @functools.wraps(original)
+        def envoltura(self, *args, **kwargs):
+            _contar_firestore(rpcs=1, **({} if antes is None else antes(self)))
+            resultado = original(self, *args, **kwargs)
+            return _IteradorContado(iter(resultado)) if contar_resultado else resultado
+
+        setattr(clase, metodo, envoltura)
+
+    envolver(Query, 'stream', contar_resultado=True)
+    envolver(Client, 'get_all', contar_resultado=True)
+    envolver(CollectionReference, 'list_documents')
+    envolver(DocumentReference, 'get', antes=lambda ref: {'lecturas': 1})
+    envolver(DocumentReference, 'delete', antes=lambda ref: {'escrituras': 1})
+    envolver(WriteBatch, 'commit', antes=lambda batch: {'escrituras': len(getattr(batch, '_write_pbs', []))})
+
+    _firestore_instrumentado = True
+    return True
+
+
+def _delta_firestore(inicio: Dict[str, int], fin: Dict[str, int]) -> Dict[str, int]:
+    return {clave: fin.get(clave, 0) - inicio.get(clave, 0) for clave in ('rpcs', 'lecturas', 'escrituras')}
+
+
+# ----------------------------------------------------------------------
+# Ejecuciones y spans
+# ----------------------------------------------------------------------
+
+class EjecucionMedida:
+    """
+    Ejecución de un pipeline cuyos spans se escriben en un archivo JSONL.
+    """
+
+    def __init__(self, pipeline: str, directorio: Optional[str] = None, otel: Optional[bool] = None):
+        """
+        Args:
+            pipeline: Nombre del pipeline (prefijo del archivo)
+            directorio: Directorio de métricas (por defecto PIPELINE_METRICS_DIR
+                o app_outputs/logs/metrics)
+            otel: Exportar spans de OpenTelemetry (por defecto PIPELINE_METRICS_OTEL)
+        """
+        self.pipeline = pipeline
+        self.run_id = uuid.uuid4().hex[:12]
+        directorio = directorio or os.getenv('PIPELINE_METRICS_DIR') or DEFAULT_METRICS_DIR
+        marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.ruta = Path(directorio) / f"{pipeline}_{marca}_{self.run_id}.jsonl"
+
+        if otel is None:
+            otel = os.getenv('PIPELINE_METRICS_OTEL', '').strip().lower() in ('1', 'true', 'yes')
+        self.tracer = otel_trace.get_tracer('etl.pipeline_metrics') if otel and otel_trace is not None else None
+
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+
+    def escribir(self, registro: Dict[str, Any]):
+        """Agrega un span al archivo JSONL (y a `spans`)."""
+        with self._lock:
+            self.spans.append(registro)
+            try:
+                self.ruta.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.ruta, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+            except OSError as e:
+                print(f"[WARNING] No se pudo escribir métricas en {self.ruta}: {e}")
+
+
+class Span:
+    """Medición en curso; permite registrar filas y atributos."""
+
+    def __init__(self, nombre: str, filas_entrada: Optional[int] = None, atributos: Optional[Dict[str, Any]] = None):
+        self.nombre = nombre
+        self.span_id = uuid.uuid4().hex[:16]
+        self.filas_entrada = filas_entrada
+        self.filas_salida: Optional[int] = None
+        self.atributos: Dict[str, Any] = dict(atributos or {})
+
+    def filas(self, entrada: Optional[int] = None, salida: Optional[int] = None) -> 'Span':
+        """Registra filas de entrada y/o salida."""
+        if entrada is not None:
+            self.filas_entrada = entrada
+        if salida is not None:
+            self.filas_salida = salida
+        return self
+
+    def atributo(self, clave: str, valor: Any) -> 'Span':
+        """Registra un atributo adicional del span."""
+        self.atributos[clave] = valor
+        return self
+
+
+@contextmanager
+def ejecucion_medida(pipeline: str, directorio: Optional[str] = None, otel: Optional[bool] = None, **atributos) -> Iterator[EjecucionMedida]:
+    """
+    Activa la medición de spans para una ejecución del pipeline.
+
+    La ejecución completa se registra como un span raíz con el nombre del
+    pipeline. Las ejecuciones no se anidan: dentro de una ejecución activa
+    se reutiliza la existente.
+    """
+    global _ejecucion_activa
+    if _ejecucion_activa is not None:
+        with span(pipeline, **atributos):
+            yield _ejecucion_activa
+        return
+
+    instrumentar_firestore()
+    ejecucion = EjecucionMedida(pipeline, directorio, otel)
+    _ejecucion_activa = ejecucion
+    try:
+        with span(pipeline, **atributos):
+            yield ejecucion
+    finally:
+        _ejecucion_activa = None
+        print(f"[DATA] Métricas por fase: {ejecucion.ruta}")
+
+
+@contextmanager
+def span(nombre: str, filas_entrada: Optional[int] = None, **atributos) -> Iterator[Span]:
+    """
+    Mide un bloque dentro de la ejecución activa (no registra nada si no hay).
+
+    Args:
+        nombre: Nombre de la fase
+        filas_entrada: Filas que recibe la fase
+        **atributos: Atributos adicionales (deben ser serializables a JSON)
+    """
+    actual = Span(nombre, filas_entrada, atributos)
+    ejecucion = _ejecucion_activa
+    if ejecucion is None:
+        yield actual
+        return
+
+    padre = _span_actual.get()
+    token = _span_actual.set(actual.span_id)
+    otel_cm = ejecucion.tracer.start_as_current_span(nombre) if ejecucion.tracer is not None else None
+    otel_span = otel_cm.__enter__() if otel_cm is not None else None
+
+    inicio = datetime.now()
+    pared, cpu = time.perf_counter(), time.process_time()
+    rss_inicio = rss_pico_mb()
+    firestore_inicio = contadores_firestore()
+    error = None
+    try:
+        yield actual
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        rss_fin = rss_pico_mb()
+        registro = {
+            'run_id': ejecucion.run_id,
+            'pipeline': ejecucion.pipeline,
+            'span_id': actual.span_id,
+            'parent_id': padre,
+            'nombre': nombre,
+            'inicio': inicio.isoformat(),
+            'pared_s': round(time.perf_counter() - pared, 4),
+            'cpu_s': round(time.process_time() - cpu, 4),
+            'rss_pico_mb': round(rss_fin, 1) if rss_fin is not None else None,
+            'rss_pico_delta_mb': round(rss_fin - rss_inicio, 1) if rss_fin is not None and rss_inicio is not None else None,
+            'filas_entrada': actual.filas_entrada,
+            'filas_salida': actual.filas_salida,
+            'firestore': _delta_firestore(firestore_inicio, contadores_firestore()),
+            'atributos': actual.atributos,
+            'estado': 'error' if error is not None else 'ok'
+        }
+        if error is not None:
+            registro['error'] = f"{type(error).__name__}: {error}"
+        ejecucion.escribir(registro)
+        _span_actual.reset(token)
+
+        if otel_span is not None:
+            _exportar_otel(otel_span, registro, error)
+            otel_cm.__exit__(*((type(error), error, error.__traceback__) if error is not None else (None, None, None)))
+
+
+def _exportar_otel(otel_span, registro: Dict[str, Any], error: Optional[BaseException]):
+    """Copia las medidas de un span como atributos de OpenTelemetry."""
+    atributos = {
+        'etl.pipeline': registro['pipeline'],
+        'etl.run_id': registro['run_id'],
+        'etl.cpu_s': registro['cpu_s'],
+        'etl.firestore.rpcs': registro['firestore']['rpcs'],
+        'etl.firestore.lecturas': registro['firestore']['lecturas'],
+        'etl.firestore.escrituras': registro['firestore']['escrituras'],
+    }
+    for clave in ('rss_pico_mb', 'rss_pico_delta_mb', 'filas_entrada', 'filas_salida'):
+        if registro[clave] is not None:
+            atributos[f'etl.{clave}'] = registro[clave]
+    for clave, valor in registro['atributos'].items():
+        atributos[f'etl.attr.{clave}'] = valor if isinstance(valor, (str, bool, int, float)) else str(valor)
+    otel_span.set_attributes(atributos)
+    if error is not None:
+        otel_span.record_exception(error)
+
+
+def medir(nombre: Optional[str] = None, filas: bool = True) -> Callable:
+    """
+    Decorador que mide cada llamada de la función como un span.
+
+    Args:
+        nombre: Nombre del span (por defecto, el nombre de la función)
+        filas: Registrar filas del primer argumento y del resultado
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            entrada = contar_filas(args[0]) if filas and args else None
+            with span(nombre or func.__name__, filas_entrada=entrada) as s:
+                resultado = func(*args, **kwargs)
+                if filas:
+                    s.filas(salida=contar_filas(resultado))
+                return resultado
+        return wrapper
+    return decorator
+
+
+# ----------------------------------------------------------------------
+# Comparación de ejecuciones
+# ----------------------------------------------------------------------
+
+def leer_spans(ruta: str) -> List[Dict[str, Any]]:
+    """Lee los spans de un archivo JSONL de métricas."""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def resumir_spans(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Agrega los spans por nombre (suma de tiempos y RPC, máximo de RSS)."""
+    resumen: Dict[str, Dict[str, Any]] = {}
+    for registro in spans:
+        fila = resumen.setdefault(registro['nombre'], {
+            'llamadas': 0, 'pared_s': 0.0, 'cpu_s': 0.0, 'rss_pico_mb': None, 'rpcs': 0
+        })
+        fila['llamadas'] += 1
+        fila['pared_s'] += registro.get('pared_s') or 0.0
+        fila['cpu_s'] += registro.get('cpu_s') or 0.0
+        fila['rpcs'] += (registro.get('firestore') or {}).get('rpcs', 0)
+        if registro.get('rss_pico_mb') is not None:
+            fila['rss_pico_mb'] = max(fila['rss_pico_mb'] or 0.0, registro['rss_pico_mb'])
+    return resumen
+
+
+def comparar_ejecuciones(ruta_base: str, ruta_actual: str) -> List[Dict[str, Any]]:
+    """
+    Compara dos ejecuciones fase por fase.
+
+    Returns:
+        Filas {nombre, base_s, actual_s, delta_s, ratio, rpcs_base, rpcs_actual}
+        ordenadas por el aumento de tiempo de pared
+    """
+    base = resumir_spans(leer_spans(ruta_base))
+    actual = resumir_spans(leer_spans(ruta_actual))
+    filas = []
+    for nombre in list(base) + [n for n in actual if n not in base]:
+        b, a = base.get(nombre, {}), actual.get(nombre, {})
+        base_s, actual_s = b.get('pared_s', 0.0), a.get('pared_s', 0.0)
+        filas.append({
+            'nombre': nombre,
+            'base_s': round(base_s, 3),
+            'actual_s': round(actual_s, 3),
+            'delta_s': round(actual_s - base_s, 3),
+            'ratio': round(actual_s / base_s, 2) if base_s else None,
+            'rpcs_base': b.get('rpcs', 0),
+            'rpcs_actual': a.get('rpcs', 0)
+        })
+    return sorted(filas, key=lambda fila: fila['delta_s'], reverse=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Muestra el resumen de una ejecución o la comparación de dos."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (1, 2):
+        print("Uso: python utils/pipeline_metrics.py <metricas.jsonl> [<metricas_actual.jsonl>]")
+        return 1
+
+    if len(argv) == 1:
+        resumen = resumir_spans(leer_spans(argv[0]))
+        print(f"{'FASE':<45} {'LLAMADAS':>8} {'PARED s':>10} {'CPU s':>10} {'RSS MB':>9} {'RPCS':>7}")
+        for nombre, fila in sorted(resumen.items(), key=lambda item: item[1]['pared_s'], reverse=True):
+            rss = f"{fila['rss_pico_mb']:.1f}" if fila['rss_pico_mb'] is not None else '-'
+            print(f"{nombre[:45]:<45} {fila['llamadas']:>8} {fila['pared_s']:>10.2f} {fila['cpu_s']:>10.2f} {rss:>9} {fila['rpcs']:>7}")
+        return 0
+
+    print(f"{'FASE':<45} {'BASE s':>10} {'ACTUAL s':>10} {'DELTA s':>10} {'RATIO':>7} {'RPCS':>13}")
+    for fila in comparar_ejecuciones(argv[0], argv[1]):
+        ratio = f"{fila['ratio']:.2f}" if fila['ratio'] is not None else '-'
+        rpcs = f"{fila['rpcs_base']}→{fila['rpcs_actual']}"
+        print(f"{fila['nombre'][:45]:<45} {fila['base_s']:>10.2f} {fila['actual_s']:>10.2f} {fila['delta_s']:>+10.2f} {ratio:>7} {rpcs:>13}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Agregación de Problemas de Calidad
+==================================
+
+Agrupa la lista de problemas detectados por severidad, dimensión ISO 19157,
+regla, campo y registro (upid) en una sola pasada, de modo que el costo de
+generar estadísticas crece linealmente con el número de problemas.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+from collections import Counter
+from typing import Any, Dict, List
+
+
+SEVERITY_ORDER = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'INFO']
+_SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITY_ORDER)}
+
+
+def aggregate_issues(issues: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Agrupa los problemas en una sola pasada.
+
+    Args:
+        issues: Lista de problemas detectados
+
+    Returns:
+        Diccionario con:
+        - by_severity: conteo por severidad
+        - by_dimension: conteo por dimensión ISO 19157
+        - by_rule: conteo, nombre, severidad y dimensión por regla
+        - by_field: conteo y reglas (en orden de aparición) por campo
+        - max_severity_by_record: severidad máxima por upid afectado
+    """
+    by_severity = Counter()
+    by_dimension = Counter()
+    by_rule = {}
+    by_field = {}
+    max_severity_by_record = {}
+
+    for issue in issues:
+        severity = issue['severity']
+        by_severity[severity] += 1
+        by_dimension[issue['dimension']] += 1
+
+        rule_id = issue['rule_id']
+        rule = by_rule.get(rule_id)
+        if rule is None:
+            rule = by_rule[rule_id] = {
+                'count': 0,
+                'name': issue.get('rule_name', rule_id),
+                'severity': severity,
+                'dimension': issue['dimension']
+            }
+        rule['count'] += 1
+
+        field = issue['field_name']
+        if field:
+            field_stats = by_field.get(field)
+            if field_stats is None:
+                field_stats = by_field[field] = {'count': 0, 'issues': {}}
+            field_stats['count'] += 1
+            field_stats['issues'][rule_id] = None
+
+        # Severidad máxima por registro afectado
+        upid = issue.get('upid')
+        if upid:
+            record_severity = issue.get('severity', 'INFO')
+            current = max_severity_by_record.get(upid, 'INFO')
+            if _SEVERITY_RANK.get(record_severity, len(SEVERITY_ORDER)) < _SEVERITY_RANK[current]:
+                current = record_severity
+            max_severity_by_record[upid] = current
+
+    for field_stats in by_field.values():
+        field_stats['issues'] = list(field_stats['issues'])
+
+    return {
+        'by_severity': dict(by_severity),
+        'by_dimension': dict(by_dimension),
+        'by_rule': by_rule,
+        'by_field': by_field,
+        'max_severity_by_record': max_severity_by_record
+    }
+
+
+def count_records_by_max_severity(max_severity_by_record: Dict[Any, str]) -> Dict[str, int]:
+    """Cuenta registros según la severidad de su peor problema."""
+    return dict(Counter(max_severity_by_record.values()))
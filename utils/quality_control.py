@@ -29,6 +29,8 @@ from shapely.geometry import Point, Polygon, LineString, MultiPoint, MultiPolygo
 from shapely.validation import explain_validity
 import numpy as np
 
+from utils.quality_aggregation import aggregate_issues, count_records_by_max_severity
+
 
 class SeverityLevel(Enum):
     """Niveles de severidad para problemas de calidad."""
@@ -1186,358 +1188,67 @@ def validate_geojson(geojson_path: str, verbose: bool = True) -> Dict[str, Any]:
     
     features = geojson_data.get('features', [])
     
-    # Contar total de intervenciones
-    total_intervenciones = sum(len(f.get('properties', {}).get('intervenciones', [])) for f in features)
+    # Aplanar unidades e intervenciones y evaluar reglas por columnas
+    from utils.quality_control_columnar import validate_features_columnar
     
     if verbose:
         print(f"Total unidades de proyecto: {len(features)}")
-        print(f"Total intervenciones: {total_intervenciones}")
         print(f"\n🔄 Validando unidades e intervenciones...")
     
-    # Crear validador
     validator = DataQualityValidator()
+    result = validate_features_columnar(features, validator, verbose=verbose)
     
-    # Validar cada unidad y sus intervenciones
-    all_issues = []
-    unidades_with_issues = 0
-    intervenciones_with_issues = 0
+    all_issues = result['issues']
+    total_intervenciones = result['total_intervenciones']
+    unidades_with_issues = result['unidades_with_issues']
+    intervenciones_with_issues = result['intervenciones_with_issues']
     
-    # Detectar duplicados completos
-    record_hashes = {}
-    duplicate_groups = []
+    if verbose:
+        print(f"Total intervenciones: {total_intervenciones}")
     
-    for idx, feature in enumerate(features):
-        if verbose and (idx + 1) % 100 == 0:
-            print(f"  Validadas: {idx + 1}/{len(features)} unidades, {sum(len(features[i].get('properties', {}).get('intervenciones', [])) for i in range(idx+1))} intervenciones")
-        
-        properties = feature.get('properties', {})
-        geometry = feature.get('geometry')
-        upid = properties.get('upid')
-        nombre_up = properties.get('nombre_up')
-        
-        unidad_has_issues = False
-        
-        # ================================================================
-        # VALIDAR UNIDAD DE PROYECTO
-        # ================================================================
-        
-        # Campos obligatorios a nivel de unidad
-        unit_required_fields = ['upid', 'nombre_up', 'direccion', 'tipo_equipamiento', 'clase_up']
-        
-        for field in unit_required_fields:
-            value = properties.get(field)
-            if value is None or (isinstance(value, str) and value.strip() == ''):
-                all_issues.append({
-                    'rule_id': 'CO001',
-                    'rule_name': 'Campo obligatorio vacío (unidad)',
-                    'dimension': QualityDimension.COMPLETENESS.value,
-                    'severity': SeverityLevel.CRITICAL.value,
-                    'field_name': f'unidad.{field}',
-                    'current_value': None,
-                    'expected_value': 'Valor requerido',
-                    'details': f'Campo obligatorio vacío en unidad: {field}',
-                    'suggestion': f'Completar el campo {field}',
-                    'detected_at': datetime.now().isoformat(),
-                    'upid': upid,
-                    'nombre_up': nombre_up,
-                    'record_index': idx,
-                    'level': 'unidad'
-                })
-                unidad_has_issues = True
-        
-        # Validar geometría
-        if properties.get('direccion'):
-            shapely_geom = None
-            if geometry:
-                from shapely.geometry import shape
-                try:
-                    shapely_geom = shape(geometry)
-                    if not shapely_geom.is_empty:
-                        # Validar que esté en Cali
-                        coords = list(shapely_geom.coords)[0] if hasattr(shapely_geom, 'coords') else None
-                        if coords:
-                            lon, lat = coords
-                            # Bounding box extendido de Cali (incluyendo área metropolitana)
-                            # Lon: -76.7 a -76.4, Lat: 3.3 a 3.6
-                            
-                            # Detectar coordenadas invertidas (lat, lon en lugar de lon, lat)
-                            if 3.3 <= lon <= 3.6 and -76.7 <= lat <= -76.4:
-                                all_issues.append({
-                                    'rule_id': 'PA002',
-                                    'rule_name': 'Coordenadas invertidas',
-                                    'dimension': QualityDimension.POSITIONAL_ACCURACY.value,
-                                    'severity': SeverityLevel.CRITICAL.value,
-                                    'field_name': 'geometry',
-                                    'current_value': f'[{lon}, {lat}]',
-                                    'expected_value': '[lon, lat] no [lat, lon]',
-                                    'details': f'Las coordenadas parecen estar invertidas (lat, lon)',
-                                    'suggestion': 'Invertir coordenadas: [{lat}, {lon}]',
-                                    'detected_at': datetime.now().isoformat(),
-                                    'upid': upid,
-                                    'nombre_up': nombre_up,
-                                    'record_index': idx,
-                                    'level': 'unidad'
-                                })
-                                unidad_has_issues = True
-                            elif not (-76.7 <= lon <= -76.4 and 3.3 <= lat <= 3.6):
-                                # Coordenadas claramente fuera de Cali
-                                all_issues.append({
-                                    'rule_id': 'PA001',
-                                    'rule_name': 'Coordenadas fuera de Cali',
-                                    'dimension': QualityDimension.POSITIONAL_ACCURACY.value,
-                                    'severity': SeverityLevel.HIGH.value,
-                                    'field_name': 'geometry',
-                                    'current_value': f'[{lon}, {lat}]',
-                                    'expected_value': 'Lon: -76.7 a -76.4, Lat: 3.3 a 3.6',
-                                    'details': f'Coordenadas fuera del área de Cali y región',
-                                    'suggestion': 'Verificar y corregir coordenadas',
-                                    'detected_at': datetime.now().isoformat(),
-                                    'upid': upid,
-                                    'nombre_up': nombre_up,
-                                    'record_index': idx,
-                                    'level': 'unidad'
-                                })
-                                unidad_has_issues = True
-                except:
-                    pass
-            
-            if geometry is None or (shapely_geom and shapely_geom.is_empty):
-                all_issues.append({
-                    'rule_id': 'CO002',
-                    'rule_name': 'Geometría faltante',
-                    'dimension': QualityDimension.COMPLETENESS.value,
-                    'severity': SeverityLevel.MEDIUM.value,
-                    'field_name': 'geometry',
-                    'current_value': 'NULL',
-                    'expected_value': 'Point',
-                    'details': f'Unidad con dirección pero sin geometría',
-                    'suggestion': 'Geolocalizar la dirección',
-                    'detected_at': datetime.now().isoformat(),
-                    'upid': upid,
-                    'nombre_up': nombre_up,
-                    'record_index': idx,
-                    'level': 'unidad'
-                })
-                unidad_has_issues = True
-        
-        # Validar tipo_equipamiento y clase_up
-        tipo_equipamiento = properties.get('tipo_equipamiento')
-        if tipo_equipamiento and tipo_equipamiento not in validator.VALID_TIPO_EQUIPAMIENTO:
-            all_issues.append({
-                'rule_id': 'TA008',
-                'rule_name': 'Tipo de equipamiento inválido',
-                'dimension': QualityDimension.THEMATIC_ACCURACY.value,
-                'severity': SeverityLevel.LOW.value,
-                'field_name': 'tipo_equipamiento',
-                'current_value': tipo_equipamiento,
-                'expected_value': 'Valor del catálogo',
-                'details': f'Tipo de equipamiento no reconocido',
-                'suggestion': 'Usar valor del catálogo estándar',
-                'detected_at': datetime.now().isoformat(),
-                'upid': upid,
-                'nombre_up': nombre_up,
-                'record_index': idx,
-                'level': 'unidad'
-            })
-            unidad_has_issues = True
-        
-        # ================================================================
-        # VALIDAR INTERVENCIONES
-        # ================================================================
-        
-        intervenciones = properties.get('intervenciones', [])
-        
-        if not intervenciones:
-            all_issues.append({
-                'rule_id': 'LC009',
-                'rule_name': 'Unidad sin intervenciones',
-                'dimension': QualityDimension.LOGICAL_CONSISTENCY.value,
-                'severity': SeverityLevel.HIGH.value,
-                'field_name': 'intervenciones',
-                'current_value': '[]',
-                'expected_value': 'Al menos 1 intervención',
-                'details': f'Unidad de proyecto sin intervenciones asociadas',
-                'suggestion': 'Asociar al menos una intervención',
-                'detected_at': datetime.now().isoformat(),
-                'upid': upid,
-                'nombre_up': nombre_up,
-                'record_index': idx,
-                'level': 'unidad'
-            })
-            unidad_has_issues = True
-        
-        for interv_idx, intervencion in enumerate(intervenciones):
-            intervencion_has_issues = False
-            
-            # Validar que intervencion sea un diccionario
-            if not isinstance(intervencion, dict):
-                all_issues.append({
-                    'rule_id': 'LC010',
-                    'rule_name': 'Formato de intervención inválido',
-                    'dimension': QualityDimension.LOGICAL_CONSISTENCY.value,
-                    'severity': SeverityLevel.CRITICAL.value,
-                    'field_name': 'intervenciones',
-                    'current_value': str(type(intervencion).__name__),
-                    'expected_value': 'dict',
-                    'details': f'Intervención en posición {interv_idx} no es un diccionario (es {type(intervencion).__name__})',
-                    'suggestion': 'Verificar estructura de datos en Firebase - intervenciones debe ser array de objetos',
-                    'detected_at': datetime.now().isoformat(),
-                    'upid': upid,
-                    'nombre_up': nombre_up,
-                    'record_index': idx,
-                    'intervencion_index': interv_idx,
-                    'level': 'intervencion'
-                })
-                unidad_has_issues = True
-                continue  # Saltar esta intervención
-            
-            intervencion_id = intervencion.get('intervencion_id', f'{upid}-INT{interv_idx}')
-            
-            # Campos obligatorios de intervención
-            interv_required_fields = ['estado', 'tipo_intervencion', 'presupuesto_base', 'ano']
-            
-            for field in interv_required_fields:
-                value = intervencion.get(field)
-                if value is None or (isinstance(value, str) and value.strip() == ''):
-                    all_issues.append({
-                        'rule_id': 'CO001',
-                        'rule_name': 'Campo obligatorio vacío (intervención)',
-                        'dimension': QualityDimension.COMPLETENESS.value,
-                        'severity': SeverityLevel.HIGH.value,
-                        'field_name': f'intervencion.{field}',
-                        'current_value': None,
-                        'expected_value': 'Valor requerido',
-                        'details': f'Campo obligatorio vacío en intervención: {field}',
-                        'suggestion': f'Completar el campo {field}',
-                        'detected_at': datetime.now().isoformat(),
-                        'upid': upid,
-                        'nombre_up': nombre_up,
-                        'intervencion_id': intervencion_id,
-                        'record_index': idx,
-                        'intervencion_index': interv_idx,
-                        'level': 'intervencion'
-                    })
-                    intervencion_has_issues = True
-            
-            # Validar estado
-            estado = intervencion.get('estado')
-            if estado and estado not in validator.VALID_ESTADOS:
-                all_issues.append({
-                    'rule_id': 'TA001',
-                    'rule_name': 'Estado inválido',
-                    'dimension': QualityDimension.THEMATIC_ACCURACY.value,
-                    'severity': SeverityLevel.MEDIUM.value,
-                    'field_name': 'estado',
-                    'current_value': estado,
-                    'expected_value': ', '.join(validator.VALID_ESTADOS),
-                    'details': f'Estado no reconocido: {estado}',
-                    'suggestion': 'Normalizar estado',
-                    'detected_at': datetime.now().isoformat(),
-                    'upid': upid,
-                    'nombre_up': nombre_up,
-                    'intervencion_id': intervencion_id,
-                    'record_index': idx,
-                    'intervencion_index': interv_idx,
-                    'level': 'intervencion'
-                })
-                intervencion_has_issues = True
-            
-            # Validar presupuesto
-            presupuesto = intervencion.get('presupuesto_base')
-            if presupuesto is not None:
-                try:
-                    pres_float = float(presupuesto)
-                    if pres_float <= 0:
-                        all_issues.append({
-                            'rule_id': 'LC001',
-                            'rule_name': 'Presupuesto inválido',
-                            'dimension': QualityDimension.LOGICAL_CONSISTENCY.value,
-                            'severity': SeverityLevel.HIGH.value,
-                            'field_name': 'presupuesto_base',
-                            'current_value': pres_float,
-                            'expected_value': '> 0',
-                            'details': f'Presupuesto cero o negativo',
-                            'suggestion': 'Verificar presupuesto',
-                            'detected_at': datetime.now().isoformat(),
-                            'upid': upid,
-                            'nombre_up': nombre_up,
-                            'intervencion_id': intervencion_id,
-                            'record_index': idx,
-                            'intervencion_index': interv_idx,
-                            'level': 'intervencion'
-                        })
-                        intervencion_has_issues = True
-                except:
-                    pass
-            
-            # Validar avance_obra
-            avance = intervencion.get('avance_obra')
-            if avance is not None:
-                try:
-                    avance_float = float(avance)
-                    if not (0 <= avance_float <= 100):
-                        all_issues.append({
-                            'rule_id': 'LC002',
-                            'rule_name': 'Avance fuera de rango',
-                            'dimension': QualityDimension.LOGICAL_CONSISTENCY.value,
-                            'severity': SeverityLevel.MEDIUM.value,
-                            'field_name': 'avance_obra',
-                            'current_value': avance_float,
-                            'expected_value': '0-100',
-                            'details': f'Avance fuera del rango 0-100',
-                            'suggestion': 'Corregir avance',
-                            'detected_at': datetime.now().isoformat(),
-                            'upid': upid,
-                            'nombre_up': nombre_up,
-                            'intervencion_id': intervencion_id,
-                            'record_index': idx,
-                            'intervencion_index': interv_idx,
-                            'level': 'intervencion'
-                        })
-                        intervencion_has_issues = True
-                except:
-                    pass
-            
-            # Validar consistencia estado-avance
-            if estado == 'Terminado' and avance and float(avance) < 100:
-                all_issues.append({
-                    'rule_id': 'LC003',
-                    'rule_name': 'Inconsistencia estado-avance',
-                    'dimension': QualityDimension.LOGICAL_CONSISTENCY.value,
-                    'severity': SeverityLevel.MEDIUM.value,
-                    'field_name': 'estado/avance_obra',
-                    'current_value': f'{estado} / {avance}%',
-                    'expected_value': 'Terminado / 100%',
-                    'details': f'Estado "Terminado" pero avance {avance}%',
-                    'suggestion': 'Ajustar estado o avance',
-                    'detected_at': datetime.now().isoformat(),
-                    'upid': upid,
-                    'nombre_up': nombre_up,
-                    'intervencion_id': intervencion_id,
-                    'record_index': idx,
-                    'intervencion_index': interv_idx,
-                    'level': 'intervencion'
-                })
-                intervencion_has_issues = True
-            
-            if intervencion_has_issues:
-                intervenciones_with_issues += 1
-                unidad_has_issues = True
-        
-        if unidad_has_issues:
-            unidades_with_issues += 1
+    return build_validation_result(
+        all_issues,
+        total_records=len(features),
+        total_intervenciones=total_intervenciones,
+        unidades_with_issues=unidades_with_issues,
+        intervenciones_with_issues=intervenciones_with_issues,
+        verbose=verbose
+    )
+
+
+def build_validation_result(
+    all_issues: List[Dict[str, Any]],
+    total_records: int,
+    total_intervenciones: int,
+    unidades_with_issues: int,
+    intervenciones_with_issues: int,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """
+    Construye el reporte de calidad de `validate_geojson` a partir de los problemas.
     
+    Args:
+        all_issues: Problemas detectados (unidades e intervenciones)
+        total_records: Total de unidades de proyecto validadas
+        total_intervenciones: Total de intervenciones
+        unidades_with_issues: Unidades con al menos un problema
+        intervenciones_with_issues: Intervenciones con al menos un problema
+        verbose: Si True, imprime resumen
+        
+    Returns:
+        Diccionario con reporte de calidad completo
+    """
     # No validar duplicados en estructura jerárquica (UPIDs son únicos por diseño)
     
     # Generar estadísticas mejoradas
-    stats = _generate_quality_statistics(all_issues, len(features), 0)
+    stats = _generate_quality_statistics(all_issues, total_records, 0)
     
     if verbose:
         print(f"\n✅ Validación completada")
         print(f"\n📊 RESUMEN:")
-        print(f"  Total unidades de proyecto: {len(features)}")
+        print(f"  Total unidades de proyecto: {total_records}")
         print(f"  Total intervenciones: {total_intervenciones}")
-        print(f"  Unidades con problemas: {unidades_with_issues} ({unidades_with_issues/len(features)*100:.1f}%)")
+        print(f"  Unidades con problemas: {unidades_with_issues} ({unidades_with_issues/total_records*100:.1f}%)")
         print(f"  Intervenciones con problemas: {intervenciones_with_issues} ({intervenciones_with_issues/total_intervenciones*100:.1f}% del total)")
         print(f"  Total de problemas detectados: {len(all_issues)}")
         print(f"\n  Por severidad:")
@@ -1552,16 +1263,16 @@ def validate_geojson(geojson_path: str, verbose: bool = True) -> Dict[str, Any]:
             print(f"    {rule_id}: {rule_info['count']} ocurrencias - {rule_info['name']}")
     
     return {
-        'total_records': len(features),
-        'total_unidades': len(features),
+        'total_records': total_records,
+        'total_unidades': total_records,
         'total_intervenciones': total_intervenciones,
-        'unique_records': len(features),
+        'unique_records': total_records,
         'duplicate_groups': 0,
         'duplicate_records': 0,
         'unidades_with_issues': unidades_with_issues,
         'intervenciones_with_issues': intervenciones_with_issues,
         'records_with_issues': unidades_with_issues,
-        'records_without_issues': len(features) - unidades_with_issues,
+        'records_without_issues': total_records - unidades_with_issues,
         'total_issues': len(all_issues),
         'issues': all_issues,
         'duplicate_details': [],
@@ -1585,44 +1296,13 @@ def _generate_quality_statistics(issues: List[Dict], total_records: int, duplica
         'duplicate_groups': duplicate_groups
     }
     
-    # Contador de registros únicos afectados
-    affected_records = set()
-    
-    for issue in issues:
-        # Rastrear registros afectados
-        if 'upid' in issue and issue['upid']:
-            affected_records.add(issue['upid'])
-        
-        # Por severidad
-        severity = issue['severity']
-        stats['by_severity'][severity] = stats['by_severity'].get(severity, 0) + 1
-        
-        # Por dimensión
-        dimension = issue['dimension']
-        stats['by_dimension'][dimension] = stats['by_dimension'].get(dimension, 0) + 1
-        
-        # Por regla (con información adicional)
-        rule_id = issue['rule_id']
-        if rule_id not in stats['by_rule']:
-            stats['by_rule'][rule_id] = {
-                'count': 0,
-                'name': issue.get('rule_name', rule_id),
-                'severity': issue['severity'],
-                'dimension': issue['dimension']
-            }
-        stats['by_rule'][rule_id]['count'] += 1
-        
-        # Por campo
-        field = issue['field_name']
-        if field:
-            if field not in stats['by_field']:
-                stats['by_field'][field] = {
-                    'count': 0,
-                    'issues': []
-                }
-            stats['by_field'][field]['count'] += 1
-            if issue['rule_id'] not in stats['by_field'][field]['issues']:
-                stats['by_field'][field]['issues'].append(issue['rule_id'])
+    # Agrupar problemas por severidad, dimensión, regla, campo y registro en una pasada
+    aggregates = aggregate_issues(issues)
+    stats['by_severity'] = aggregates['by_severity']
+    stats['by_dimension'] = aggregates['by_dimension']
+    stats['by_rule'] = aggregates['by_rule']
+    stats['by_field'] = aggregates['by_field']
+    affected_records = aggregates['max_severity_by_record']
     
     # Calcular top issues (más frecuentes)
     sorted_rules = sorted(stats['by_rule'].items(), key=lambda x: x[1]['count'], reverse=True)
@@ -1637,18 +1317,7 @@ def _generate_quality_statistics(issues: List[Dict], total_records: int, duplica
     # Más enfocada en la proporción de registros "limpios" vs "problemáticos"
     
     # Contar registros únicos por nivel de severidad máxima
-    records_by_max_severity = {}
-    for upid in affected_records:
-        record_issues = [i for i in issues if i.get('upid') == upid]
-        if record_issues:
-            # Encontrar la severidad máxima de ese registro
-            severities_order = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'INFO']
-            max_sev = 'INFO'
-            for issue in record_issues:
-                sev = issue.get('severity', 'INFO')
-                if severities_order.index(sev) < severities_order.index(max_sev):
-                    max_sev = sev
-            records_by_max_severity[max_sev] = records_by_max_severity.get(max_sev, 0) + 1
+    records_by_max_severity = count_records_by_max_severity(affected_records)
     
     # Penalizaciones por registro según su peor problema
     severity_weights = {
@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+Motor Columnar de Reglas de Calidad - ISO 19157
+===============================================
+
+Evalúa las reglas de calidad de `validate_geojson` sobre columnas en lugar de
+recorrer registro por registro. Las unidades de proyecto y sus intervenciones
+se aplanan una sola vez en dos DataFrames y cada regla se calcula como una
+máscara booleana; solo las filas que fallan se materializan como problemas.
+
+Las reglas, mensajes y campos de cada problema son los mismos que producía la
+validación fila a fila, incluyendo el orden de los problemas en la lista.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+from datetime import datetime
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.quality_control import DataQualityValidator, QualityDimension, SeverityLevel
+
+
+UNIT_REQUIRED_FIELDS = ['upid', 'nombre_up', 'direccion', 'tipo_equipamiento', 'clase_up']
+INTERVENCION_REQUIRED_FIELDS = ['estado', 'tipo_intervencion', 'presupuesto_base', 'ano']
+
+# Bounding box extendido de Cali (incluyendo área metropolitana)
+CALI_LON_RANGE = (-76.7, -76.4)
+CALI_LAT_RANGE = (3.3, 3.6)
+
+UNIT_COLUMNS = [
+    'record_index', 'upid', 'nombre_up', 'direccion', 'tipo_equipamiento',
+    'clase_up', 'has_geometry', 'lon', 'lat', 'total_intervenciones'
+]
+INTERVENCION_COLUMNS = [
+    'record_index', 'intervencion_index', 'upid', 'nombre_up', 'is_dict',
+    'value_type', 'intervencion_id', 'estado', 'tipo_intervencion',
+    'presupuesto_base', 'ano', 'avance_obra'
+]
+
+# Valor constante o función que recibe las filas que fallan y retorna una lista
+IssueValue = Union[Any, Callable[[pd.DataFrame], List[Any]]]
+
+_UNIT_KEYS = ['upid', 'nombre_up', 'record_index']
+_INTERVENCION_KEYS = ['upid', 'nombre_up', 'intervencion_id', 'record_index', 'intervencion_index']
+_INVALID_INTERVENCION_KEYS = ['upid', 'nombre_up', 'record_index', 'intervencion_index']
+
+
+def _first_coordinate(geometry: Optional[Dict[str, Any]]) -> Tuple[float, float]:
+    """
+    Retorna la primera coordenada (lon, lat) de una geometría GeoJSON.
+
+    Solo aplica a geometrías con secuencia de coordenadas (Point, LineString)
+    en 2D, igual que `shape(geometry).coords[0]`; en cualquier otro caso
+    (geometría vacía, inválida, multiparte, polígono o 3D) retorna (nan, nan).
+    Se lee directamente del diccionario para no construir objetos shapely.
+    """
+    if not geometry:
+        return np.nan, np.nan
+    try:
+        geom_type = geometry.get('type', '').lower()
+        coordinates = geometry.get('coordinates')
+        if geom_type == 'point':
+            first = coordinates
+        elif geom_type == 'linestring' and len(coordinates) >= 2:
+            first = coordinates[0]
+        else:
+            return np.nan, np.nan
+        if not first or len(first) != 2:
+            return np.nan, np.nan
+        lon, lat = first
+        return float(lon), float(lat)
+    except Exception:
+        return np.nan, np.nan
+
+
+def flatten_features(
+    features: List[Dict[str, Any]],
+    verbose: bool = False
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Aplana las features del GeoJSON en un DataFrame de unidades y otro de intervenciones.
+
+    Los valores de atributos se conservan como `object` para que la validación
+    distinga entre None, cadenas vacías y valores numéricos igual que el
+    recorrido fila a fila.
+
+    Args:
+        features: Lista de features GeoJSON (unidades de proyecto)
+        verbose: Si True, imprime progreso cada 100 unidades
+
+    Returns:
+        Tupla (unidades_df, intervenciones_df)
+    """
+    units = []
+    intervenciones = []
+    total_features = len(features)
+    intervenciones_seen = 0
+
+    for idx, feature in enumerate(features):
+        properties = feature.get('properties', {})
+        geometry = feature.get('geometry')
+        upid = properties.get('upid')
+        nombre_up = properties.get('nombre_up')
+        direccion = properties.get('direccion')
+
+        # La posición solo se valida para unidades con dirección
+        lon, lat = _first_coordinate(geometry) if direccion else (np.nan, np.nan)
+
+        unit_intervenciones = properties.get('intervenciones', [])
+        if not unit_intervenciones:
+            unit_intervenciones = []
+
+        units.append((
+            idx, upid, nombre_up, direccion, properties.get('tipo_equipamiento'),
+            properties.get('clase_up'), geometry is not None, lon, lat,
+            len(unit_intervenciones)
+        ))
+
+        for interv_idx, intervencion in enumerate(unit_intervenciones):
+            if isinstance(intervencion, dict):
+                intervenciones.append((
+                    idx, interv_idx, upid, nombre_up, True, 'dict',
+                    intervencion.get('intervencion_id', f'{upid}-INT{interv_idx}'),
+                    intervencion.get('estado'),
+                    intervencion.get('tipo_intervencion'),
+                    intervencion.get('presupuesto_base'),
+                    intervencion.get('ano'),
+                    intervencion.get('avance_obra'),
+                ))
+            else:
+                intervenciones.append((
+                    idx, interv_idx, upid, nombre_up, False, type(intervencion).__name__,
+                    None, None, None, None, None, None,
+                ))
+
+        intervenciones_seen += len(unit_intervenciones)
+        if verbose and (idx + 1) % 100 == 0:
+            print(f"  Validadas: {idx + 1}/{total_features} unidades, {intervenciones_seen} intervenciones")
+
+    units_df = _build_frame(units, UNIT_COLUMNS)
+    units_df['has_geometry'] = units_df['has_geometry'].astype(bool)
+    units_df['total_intervenciones'] = units_df['total_intervenciones'].astype(np.int64)
+    units_df['lon'] = units_df['lon'].astype(float)
+    units_df['lat'] = units_df['lat'].astype(float)
+
+    intervenciones_df = _build_frame(intervenciones, INTERVENCION_COLUMNS)
+    intervenciones_df['intervencion_index'] = intervenciones_df['intervencion_index'].astype(np.int64)
+    intervenciones_df['is_dict'] = intervenciones_df['is_dict'].astype(bool)
+
+    return units_df, intervenciones_df
+
+
+def _build_frame(rows: List[tuple], columns: List[str]) -> pd.DataFrame:
+    """Construye un DataFrame con `record_index` entero y atributos como `object`."""
+    frame = pd.DataFrame(rows, columns=columns, dtype=object)
+    frame['record_index'] = frame['record_index'].astype(np.int64)
+    return frame
+
+
+def _is_blank(series: pd.Series) -> pd.Series:
+    """Máscara de valores None o cadenas vacías/solo espacios."""
+    is_str = series.map(type).eq(str)
+    blank_str = pd.Series(False, index=series.index)
+    if is_str.any():
+        blank_str[is_str] = series[is_str].str.strip().eq('')
+    return series.isna() | blank_str
+
+
+def _is_truthy(series: pd.Series) -> pd.Series:
+    """Máscara de valores que Python evalúa como verdaderos (None/NaN son falsos)."""
+    return series.notna() & series.astype(bool)
+
+
+def _to_float(series: pd.Series) -> pd.Series:
+    """Convierte a float; los valores no numéricos quedan como NaN."""
+    return pd.to_numeric(series, errors='coerce').astype(float)
+
+
+def _materialize(
+    frame: pd.DataFrame,
+    mask: pd.Series,
+    rule_order: int,
+    keys: List[str],
+    level: str,
+    detected_at: str,
+    **fields: IssueValue
+) -> List[Tuple[tuple, Dict[str, Any]]]:
+    """
+    Convierte las filas que fallan una regla en diccionarios de problema.
+
+    Los campos pueden ser constantes o funciones sobre las filas que fallan,
+    de modo que los textos dinámicos solo se construyen para los fallos.
+
+    Returns:
+        Lista de tuplas (clave de orden, problema)
+    """
+    failing = frame.loc[mask.to_numpy()]
+    if failing.empty:
+        return []
+
+    size = len(failing)
+    columns = {}
+    for name, value in fields.items():
+        columns[name] = value(failing) if callable(value) else [value] * size
+    columns['detected_at'] = [detected_at] * size
+    for key in keys:
+        columns[key] = failing[key].tolist()
+    columns['level'] = [level] * size
+
+    names = list(columns)
+    records = [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    record_index = failing['record_index'].tolist()
+    if level == 'intervencion':
+        order = zip(record_index, repeat(1), failing['intervencion_index'].tolist(), repeat(rule_order))
+    else:
+        order = zip(record_index, repeat(0), repeat(0), repeat(rule_order))
+    return list(zip(order, records))
+
+
+def _unit_issues(
+    units: pd.DataFrame,
+    validator: DataQualityValidator,
+    detected_at: str
+) -> List[Tuple[tuple, Dict[str, Any]]]:
+    """Evalúa las reglas a nivel de unidad de proyecto."""
+    issues = []
+    order = 0
+
+    def add(mask, **fields):
+        nonlocal order
+        issues.extend(_materialize(units, mask, order, _UNIT_KEYS, 'unidad', detected_at, **fields))
+        order += 1
+
+    # CO001 - Campos obligatorios a nivel de unidad
+    for field in UNIT_REQUIRED_FIELDS:
+        add(
+            _is_blank(units[field]),
+            rule_id='CO001',
+            rule_name='Campo obligatorio vacío (unidad)',
+            dimension=QualityDimension.COMPLETENESS.value,
+            severity=SeverityLevel.CRITICAL.value,
+            field_name=f'unidad.{field}',
+            current_value=None,
+            expected_value='Valor requerido',
+            details=f'Campo obligatorio vacío en unidad: {field}',
+            suggestion=f'Completar el campo {field}',
+        )
+
+    # Exactitud posicional (solo unidades con dirección)
+    has_direccion = _is_truthy(units['direccion'])
+    lon, lat = units['lon'], units['lat']
+    lon_min, lon_max = CALI_LON_RANGE
+    lat_min, lat_max = CALI_LAT_RANGE
+    has_coords = has_direccion & lon.notna() & lat.notna()
+    inverted = has_coords & lon.between(lat_min, lat_max) & lat.between(lon_min, lon_max)
+    outside = has_coords & ~inverted & ~(lon.between(lon_min, lon_max) & lat.between(lat_min, lat_max))
+
+    def coordinates_text(rows):
+        return [f'[{x}, {y}]' for x, y in zip(rows['lon'], rows['lat'])]
+
+    add(
+        inverted,
+        rule_id='PA002',
+        rule_name='Coordenadas invertidas',
+        dimension=QualityDimension.POSITIONAL_ACCURACY.value,
+        severity=SeverityLevel.CRITICAL.value,
+        field_name='geometry',
+        current_value=coordinates_text,
+        expected_value='[lon, lat] no [lat, lon]',
+        details='Las coordenadas parecen estar invertidas (lat, lon)',
+        suggestion='Invertir coordenadas: [{lat}, {lon}]',
+    )
+    add(
+        outside,
+        rule_id='PA001',
+        rule_name='Coordenadas fuera de Cali',
+        dimension=QualityDimension.POSITIONAL_ACCURACY.value,
+        severity=SeverityLevel.HIGH.value,
+        field_name='geometry',
+        current_value=coordinates_text,
+        expected_value='Lon: -76.7 a -76.4, Lat: 3.3 a 3.6',
+        details='Coordenadas fuera del área de Cali y región',
+        suggestion='Verificar y corregir coordenadas',
+    )
+
+    # CO002 - Unidad con dirección pero sin geometría
+    add(
+        has_direccion & ~units['has_geometry'],
+        rule_id='CO002',
+        rule_name='Geometría faltante',
+        dimension=QualityDimension.COMPLETENESS.value,
+        severity=SeverityLevel.MEDIUM.value,
+        field_name='geometry',
+        current_value='NULL',
+        expected_value='Point',
+        details='Unidad con dirección pero sin geometría',
+        suggestion='Geolocalizar la dirección',
+    )
+
+    # TA008 - Dominio de tipo_equipamiento
+    tipo_equipamiento = units['tipo_equipamiento']
+    add(
+        _is_truthy(tipo_equipamiento) & ~tipo_equipamiento.isin(validator.VALID_TIPO_EQUIPAMIENTO),
+        rule_id='TA008',
+        rule_name='Tipo de equipamiento inválido',
+        dimension=QualityDimension.THEMATIC_ACCURACY.value,
+        severity=SeverityLevel.LOW.value,
+        field_name='tipo_equipamiento',
+        current_value=lambda rows: rows['tipo_equipamiento'].tolist(),
+        expected_value='Valor del catálogo',
+        details='Tipo de equipamiento no reconocido',
+        suggestion='Usar valor del catálogo estándar',
+    )
+
+    # LC009 - Unidad sin intervenciones
+    add(
+        units['total_intervenciones'].eq(0),
+        rule_id='LC009',
+        rule_name='Unidad sin intervenciones',
+        dimension=QualityDimension.LOGICAL_CONSISTENCY.value,
+        severity=SeverityLevel.HIGH.value,
+        field_name='intervenciones',
+        current_value='[]',
+        expected_value='Al menos 1 intervención',
+        details='Unidad de proyecto sin intervenciones asociadas',
+        suggestion='Asociar al menos una intervención',
+    )
+
+    return issues
+
+
+def _intervencion_issues(
+    intervenciones: pd.DataFrame,
+    validator: DataQualityValidator,
+    detected_at: str
+) -> Tuple[List[Tuple[tuple, Dict[str, Any]]], pd.Series]:
+    """
+    Evalúa las reglas a nivel de intervención.
+
+    Returns:
+        Tupla (problemas con clave de orden, máscara de intervenciones válidas
+        con al menos un problema)
+    """
+    issues = []
+    order = 0
+    failed = pd.Series(False, index=intervenciones.index)
+
+    def add(mask, keys=_INTERVENCION_KEYS, track=True, **fields):
+        nonlocal order, failed
+        issues.extend(_materialize(intervenciones, mask, order, keys, 'intervencion', detected_at, **fields))
+        if track:
+            failed = failed | mask
+        order += 1
+
+    is_dict = intervenciones['is_dict']
+
+    # LC010 - Intervención que no es un diccionario
+    add(
+        ~is_dict,
+        keys=_INVALID_INTERVENCION_KEYS,
+        track=False,
+        rule_id='LC010',
+        rule_name='Formato de intervención inválido',
+        dimension=QualityDimension.LOGICAL_CONSISTENCY.value,
+        severity=SeverityLevel.CRITICAL.value,
+        field_name='intervenciones',
+        current_value=lambda rows: rows['value_type'].tolist(),
+        expected_value='dict',
+        details=lambda rows: [
+            f'Intervención en posición {i} no es un diccionario (es {t})'
+            for i, t in zip(rows['intervencion_index'], rows['value_type'])
+        ],
+        suggestion='Verificar estructura de datos en Firebase - intervenciones debe ser array de objetos',
+    )
+
+    # CO001 - Campos obligatorios de intervención
+    for field in INTERVENCION_REQUIRED_FIELDS:
+        add(
+            is_dict & _is_blank(intervenciones[field]),
+            rule_id='CO001',
+            rule_name='Campo obligatorio vacío (intervención)',
+            dimension=QualityDimension.COMPLETENESS.value,
+            severity=SeverityLevel.HIGH.value,
+            field_name=f'intervencion.{field}',
+            current_value=None,
+            expected_value='Valor requerido',
+            details=f'Campo obligatorio vacío en intervención: {field}',
+            suggestion=f'Completar el campo {field}',
+        )
+
+    # TA001 - Dominio de estado
+    estado = intervenciones['estado']
+    add(
+        is_dict & _is_truthy(estado) & ~estado.isin(validator.VALID_ESTADOS),
+        rule_id='TA001',
+        rule_name='Estado inválido',
+        dimension=QualityDimension.THEMATIC_ACCURACY.value,
+        severity=SeverityLevel.MEDIUM.value,
+        field_name='estado',
+        current_value=lambda rows: rows['estado'].tolist(),
+        expected_value=', '.join(validator.VALID_ESTADOS),
+        details=lambda rows: [f'Estado no reconocido: {e}' for e in rows['estado']],
+        suggestion='Normalizar estado',
+    )
+
+    # LC001 - Presupuesto cero o negativo
+    presupuesto = _to_float(intervenciones['presupuesto_base'])
+    add(
+        is_dict & presupuesto.le(0),
+        rule_id='LC001',
+        rule_name='Presupuesto inválido',
+        dimension=QualityDimension.LOGICAL_CONSISTENCY.value,
+        severity=SeverityLevel.HIGH.value,
+        field_name='presupuesto_base',
+        current_value=lambda rows: presupuesto[rows.index].tolist(),
+        expected_value='> 0',
+        details='Presupuesto cero o negativo',
+        suggestion='Verificar presupuesto',
+    )
+
+    # LC002 - Avance fuera del rango 0-100
+    avance = _to_float(intervenciones['avance_obra'])
+    add(
+        is_dict & avance.notna() & ~avance.between(0, 100),
+        rule_id='LC002',
+        rule_name='Avance fuera de rango',
+        dimension=QualityDimension.LOGICAL_CONSISTENCY.value,
+        severity=SeverityLevel.MEDIUM.value,
+        field_name='avance_obra',
+        current_value=lambda rows: avance[rows.index].tolist(),
+        expected_value='0-100',
+        details='Avance fuera del rango 0-100',
+        suggestion='Corregir avance',
+    )
+
+    # LC003 - Consistencia temporal estado-avance
+    add(
+        is_dict & estado.eq('Terminado') & _is_truthy(intervenciones['avance_obra']) & avance.lt(100),
+        rule_id='LC003',
+        rule_name='Inconsistencia estado-avance',
+        dimension=QualityDimension.LOGICAL_CONSISTENCY.value,
+        severity=SeverityLevel.MEDIUM.value,
+        field_name='estado/avance_obra',
+        current_value=lambda rows: [f'{e} / {a}%' for e, a in zip(rows['estado'], rows['avance_obra'])],
+        expected_value='Terminado / 100%',
+        details=lambda rows: [f'Estado "Terminado" pero avance {a}%' for a in rows['avance_obra']],
+        suggestion='Ajustar estado o avance',
+    )
+
+    return issues, failed
+
+
+def validate_features_columnar(
+    features: List[Dict[str, Any]],
+    validator: Optional[DataQualityValidator] = None,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Valida unidades de proyecto e intervenciones con el motor columnar.
+
+    Args:
+        features: Lista de features GeoJSON (unidades de proyecto)
+        validator: Validador con los catálogos de dominio (se crea si es None)
+        verbose: Si True, imprime progreso del aplanado
+
+    Returns:
+        Diccionario con 'issues', 'unidades_with_issues',
+        'intervenciones_with_issues', 'total_intervenciones' y los conteos de
+        intervenciones por registro ('intervenciones_by_record',
+        'intervenciones_with_issues_by_record')
+    """
+    validator = validator or DataQualityValidator()
+    detected_at = datetime.now().isoformat()
+
+    units, intervenciones = flatten_features(features, verbose=verbose)
+
+    issues = _unit_issues(units, validator, detected_at)
+    intervencion_issues, intervencion_failed = _intervencion_issues(intervenciones, validator, detected_at)
+    issues.extend(intervencion_issues)
+
+    # Mantener el orden del recorrido por registro: unidad, luego sus intervenciones
+    issues.sort(key=lambda item: item[0])
+    issues = [issue for _, issue in issues]
+
+    units_with_issues = {issue['record_index'] for issue in issues}
+    failed_by_record = intervenciones.loc[intervencion_failed.to_numpy(), 'record_index'].value_counts()
+
+    return {
+        'issues': issues,
+        'unidades_with_issues': len(units_with_issues),
+        'intervenciones_with_issues': int(intervencion_failed.sum()),
+        'total_intervenciones': int(units['total_intervenciones'].sum()),
+        'intervenciones_by_record': units['total_intervenciones'].tolist(),
+        'intervenciones_with_issues_by_record': {
+            int(record_index): int(count) for record_index, count in failed_by_record.items()
+        },
+    }
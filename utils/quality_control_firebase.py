@@ -13,15 +13,16 @@ Version: 2.0
 
 import json
 import tempfile
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterable, Optional
 from datetime import datetime
 from pathlib import Path
 
 from database.config import get_firestore_client
 from utils.quality_control import validate_geojson
+from utils.quality_issue_store import QualityIssueStore, validate_features_incremental
 from utils.quality_reporter import QualityReporter
 from utils.quality_s3_exporter import export_quality_reports_to_s3
-from load_app.data_loading_quality_control import load_quality_reports_to_firebase
+from load_app.data_loading_quality_control import load_quality_reports_to_firebase, quality_upload_succeeded
 
 
 def fetch_all_data_from_firebase(collection_name: str = "unidades_proyecto") -> Optional[Dict[str, Any]]:
@@ -201,7 +202,10 @@ def run_quality_control_on_firebase_data(
     collection_name: str = "unidades_proyecto",
     enable_firebase_upload: bool = True,
     enable_s3_upload: bool = True,
-    verbose: bool = True
+    verbose: bool = True,
+    incremental: bool = False,
+    changed_upids: Optional[Iterable[str]] = None,
+    store_path: Optional[str] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Ejecuta control de calidad sobre TODOS los datos en Firebase.
@@ -212,11 +216,20 @@ def run_quality_control_on_firebase_data(
     3. Genera reportes optimizados para Next.js
     4. Carga reportes a Firebase y S3
     
+    En modo incremental solo se validan los registros nuevos o modificados
+    (por hash, o los indicados en `changed_upids`), sus problemas se fusionan
+    en el almacén persistente por registro y los reportes por centro gestor y
+    resumen se recalculan desde ese almacén. A Firebase solo se cargan los
+    reportes por registro revalidados.
+    
     Args:
         collection_name: Colección de Firebase a validar
         enable_firebase_upload: Si True, carga reportes a Firebase
         enable_s3_upload: Si True, exporta reportes a S3
         verbose: Si True, muestra output detallado
+        incremental: Si True, valida solo registros nuevos o modificados
+        changed_upids: UPIDs que se sabe que cambiaron (modo incremental)
+        store_path: Ruta del almacén de problemas (modo incremental)
         
     Returns:
         Diccionario con estadísticas completas de calidad
@@ -234,23 +247,42 @@ def run_quality_control_on_firebase_data(
             print("❌ No se pudieron obtener datos de Firebase")
             return None
         
-        # 2. Guardar temporalmente para validación
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.geojson', delete=False, encoding='utf-8') as tmp:
-            json.dump(geojson_data, tmp, ensure_ascii=False)
-            tmp_path = tmp.name
-        
-        if verbose:
-            print(f"\n📋 Ejecutando validaciones ISO 19157...")
-            print(f"   Total de registros: {len(geojson_data['features'])}")
+        issue_store = None
+        revalidated_keys = None
         
-        # 3. Validar datos
-        validation_result = validate_geojson(tmp_path, verbose=False)
-        
-        # Limpiar archivo temporal
-        try:
-            Path(tmp_path).unlink()
-        except:
-            pass
+        if incremental:
+            # 2-3. Validar solo registros nuevos o modificados
+            issue_store = QualityIssueStore(store_path)
+            
+            if verbose:
+                print(f"\n📋 Ejecutando validaciones ISO 19157 (incremental)...")
+                print(f"   Total de registros: {len(geojson_data['features'])}")
+                print(f"   Registros en almacén: {len(issue_store)}")
+            
+            validation_result, revalidated_keys = validate_features_incremental(
+                geojson_data['features'],
+                store=issue_store,
+                changed_keys=changed_upids,
+                verbose=verbose
+            )
+        else:
+            # 2. Guardar temporalmente para validación
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.geojson', delete=False, encoding='utf-8') as tmp:
+                json.dump(geojson_data, tmp, ensure_ascii=False)
+                tmp_path = tmp.name
+            
+            if verbose:
+                print(f"\n📋 Ejecutando validaciones ISO 19157...")
+                print(f"   Total de registros: {len(geojson_data['features'])}")
+            
+            # 3. Validar datos
+            validation_result = validate_geojson(tmp_path, verbose=False)
+            
+            # Limpiar archivo temporal
+            try:
+                Path(tmp_path).unlink()
+            except:
+                pass
         
         if not validation_result or 'issues' not in validation_result:
             print("⚠️ No se pudieron generar reportes de calidad")
@@ -326,6 +358,7 @@ def run_quality_control_on_firebase_data(
             print(f"   ✓ Report ID: {reporter.report_id}")
         
         # 5. Cargar a Firebase (colecciones para Next.js)
+        reports_uploaded = False
         if enable_firebase_upload:
             if verbose:
                 print(f"\n🔥 Cargando reportes a Firebase...")
@@ -334,13 +367,22 @@ def run_quality_control_on_firebase_data(
                 print(f"   - quality_control_summary (métricas globales)")
                 print(f"   - quality_control_metadata (metadata categórica)")
             
+            # En modo incremental solo se cargan los registros revalidados
+            records_to_upload = record_reports
+            if revalidated_keys is not None:
+                revalidated = set(revalidated_keys)
+                records_to_upload = [r for r in record_reports if r['document_id'] in revalidated]
+                if verbose:
+                    print(f"   - Registros revalidados a cargar: {len(records_to_upload)}/{len(record_reports)}")
+            
             firebase_stats = load_quality_reports_to_firebase(
-                record_reports=record_reports,
+                record_reports=records_to_upload,
                 centro_reports=centro_reports,
                 summary_report=summary_report,
                 batch_size=100,
                 verbose=False
             )
+            reports_uploaded = quality_upload_succeeded(firebase_stats, len(records_to_upload))
             
             # Cargar metadata categórica
             try:
@@ -381,6 +423,18 @@ def run_quality_control_on_firebase_data(
                 if verbose:
                     print(f"   ⚠️ Error en S3: {e}")
         
+        # Persistir almacén solo si los reportes revalidados quedaron en Firebase;
+        # si no, la siguiente ejecución los detecta de nuevo como modificados
+        if issue_store is not None:
+            if reports_uploaded:
+                try:
+                    issue_store.save()
+                except Exception as e:
+                    if verbose:
+                        print(f"   ⚠️ No se pudo guardar almacén de calidad: {e}")
+            elif verbose:
+                print(f"   ⚠️ Carga a Firebase incompleta u omitida, no se actualiza el almacén de calidad")
+        
         # 7. Preparar resultado final
         result = {
             'report_id': reporter.report_id,
@@ -389,6 +443,8 @@ def run_quality_control_on_firebase_data(
             'records_with_issues': validation_result['records_with_issues'],
             'records_without_issues': validation_result['total_records'] - validation_result['records_with_issues'],
             'total_issues': validation_result['total_issues'],
+            'incremental': incremental,
+            'revalidated_records': validation_result.get('revalidated_records', validation_result['total_records']),
             'quality_score': stats.get('quality_score', 0),
             'severity_distribution': stats.get('by_severity', {}),
             'dimension_distribution': stats.get('by_dimension', {}),
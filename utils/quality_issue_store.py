@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén Persistente de Problemas de Calidad por Registro
+========================================================
+
+Permite ejecutar el control de calidad de forma incremental: solo se validan
+las unidades de proyecto nuevas o modificadas, sus problemas se fusionan en un
+almacén persistido por registro y el reporte completo (estadísticas, reportes
+por centro gestor y resumen) se recalcula desde ese almacén.
+
+El almacén se guarda como JSON con, para cada registro (upid):
+- hash: huella del feature validado
+- issues: problemas detectados en ese registro
+- total_intervenciones / intervenciones_with_issues: conteos del registro
+
+El almacén es un archivo local, así que el modo incremental solo ahorra
+validaciones si el archivo se conserva entre ejecuciones. En GitHub Actions
+(unidades-proyecto-etl.yml) se restaura con actions/cache por colección y
+ambiente. Sin almacén previo, la ejecución revalida toda la colección y lo
+crea.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.quality_control import DataQualityValidator, build_validation_result
+from utils.quality_control_columnar import validate_features_columnar
+from utils.quality_reporter import record_document_id
+
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent.parent / "app_outputs" / "quality_reports" / "quality_issue_store.json"
+
+STORE_VERSION = 1
+
+
+def compute_feature_hash(feature: Dict[str, Any]) -> str:
+    """Calcula la huella de un feature (propiedades y geometría)."""
+    payload = json.dumps(feature, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def feature_record_keys(features: List[Dict[str, Any]]) -> List[str]:
+    """
+    Calcula la clave de cada registro en el almacén: el upid o `IDX_<posición>`
+    si no tiene upid (o si el upid está repetido, para que cada registro tenga
+    su propia entrada). No es la clave del reporte, ver `record_document_id`.
+    """
+    keys = []
+    seen = set()
+    for idx, feature in enumerate(features):
+        upid = feature.get('properties', {}).get('upid')
+        key = str(upid) if upid else f"IDX_{idx}"
+        if key in seen:
+            key = f"IDX_{idx}"
+        seen.add(key)
+        keys.append(key)
+    return keys
+
+
+class QualityIssueStore:
+    """
+    Problemas de calidad por registro, persistidos entre ejecuciones.
+    """
+
+    def __init__(self, store_path: Optional[str] = None):
+        """
+        Inicializa el almacén y carga su contenido si existe.
+
+        Args:
+            store_path: Ruta del archivo JSON (por defecto en app_outputs/quality_reports)
+        """
+        self.store_path = Path(store_path) if store_path else DEFAULT_STORE_PATH
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.updated_at: Optional[str] = None
+        self._load()
+
+    def _load(self):
+        """Carga el almacén desde disco; un archivo inválido se ignora."""
+        if not self.store_path.exists():
+            return
+        try:
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != STORE_VERSION:
+                print(f"⚠️ Versión de almacén de calidad distinta, se reconstruirá: {self.store_path.name}")
+                return
+            self.records = data.get('records', {})
+            self.updated_at = data.get('updated_at')
+        except Exception as e:
+            print(f"⚠️ No se pudo leer almacén de calidad {self.store_path}: {e}")
+            self.records = {}
+
+    def save(self):
+        """Guarda el almacén en disco de forma atómica."""
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.updated_at = datetime.now().isoformat()
+        tmp_path = self.store_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'version': STORE_VERSION, 'updated_at': self.updated_at, 'records': self.records},
+                f, ensure_ascii=False, default=str
+            )
+        os.replace(tmp_path, self.store_path)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def update(
+        self,
+        features: List[Dict[str, Any]],
+        changed_keys: Optional[Iterable[str]] = None,
+        validator: Optional[DataQualityValidator] = None,
+        verbose: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Valida los registros nuevos o modificados y los fusiona en el almacén.
+
+        Un registro se revalida si no está en el almacén, si su hash cambió o,
+        cuando se entrega `changed_keys`, si su clave está en ese conjunto (en
+        ese caso no se calcula el hash del resto de registros). Los registros
+        que ya no están en la colección se eliminan del almacén.
+
+        Args:
+            features: Colección completa actual
+            changed_keys: Claves (upid) que se sabe que cambiaron
+            validator: Validador con los catálogos de dominio
+            verbose: Si True, imprime progreso
+
+        Returns:
+            Diccionario con claves actuales, claves revalidadas (y sus
+            posiciones en `features`) y claves eliminadas
+        """
+        keys = feature_record_keys(features)
+        forced: Optional[Set[str]] = set(str(k) for k in changed_keys) if changed_keys is not None else None
+
+        dirty_positions = []
+        dirty_hashes = []
+        for idx, key in enumerate(keys):
+            stored = self.records.get(key)
+            if forced is not None and stored is not None and key not in forced:
+                continue
+            feature_hash = compute_feature_hash(features[idx])
+            if stored is None or stored.get('hash') != feature_hash:
+                dirty_positions.append(idx)
+                dirty_hashes.append(feature_hash)
+
+        current = set(keys)
+        removed = [key for key in self.records if key not in current]
+        for key in removed:
+            del self.records[key]
+
+        if verbose:
+            print(f"   Registros a revalidar: {len(dirty_positions)}/{len(features)}")
+            print(f"   Registros eliminados del almacén: {len(removed)}")
+
+        revalidated = []
+        if dirty_positions:
+            subset = [features[idx] for idx in dirty_positions]
+            result = validate_features_columnar(subset, validator, verbose=False)
+
+            issues_by_position: Dict[int, List[Dict[str, Any]]] = {}
+            for issue in result['issues']:
+                issues_by_position.setdefault(issue['record_index'], []).append(issue)
+
+            for position, (idx, feature_hash) in enumerate(zip(dirty_positions, dirty_hashes)):
+                key = keys[idx]
+                self.records[key] = {
+                    'hash': feature_hash,
+                    'issues': issues_by_position.get(position, []),
+                    'total_intervenciones': result['intervenciones_by_record'][position],
+                    'intervenciones_with_issues': result['intervenciones_with_issues_by_record'].get(position, 0)
+                }
+                revalidated.append(key)
+
+        return {
+            'keys': keys,
+            'revalidated': revalidated,
+            'revalidated_positions': dirty_positions,
+            'removed': removed
+        }
+
+    def build_validation_result(self, keys: List[str], verbose: bool = False) -> Dict[str, Any]:
+        """
+        Construye el reporte de calidad completo desde el almacén.
+
+        Los problemas se retornan en el orden de `keys` con `record_index`
+        igual a la posición actual del registro en la colección.
+
+        Args:
+            keys: Claves de la colección actual en orden (ver `update`)
+            verbose: Si True, imprime resumen
+
+        Returns:
+            Diccionario con el mismo formato que `validate_geojson`
+        """
+        all_issues = []
+        total_intervenciones = 0
+        intervenciones_with_issues = 0
+        unidades_with_issues = 0
+
+        for idx, key in enumerate(keys):
+            stored = self.records[key]
+            total_intervenciones += stored['total_intervenciones']
+            intervenciones_with_issues += stored['intervenciones_with_issues']
+            if stored['issues']:
+                unidades_with_issues += 1
+            for issue in stored['issues']:
+                issue = dict(issue)
+                issue['record_index'] = idx
+                all_issues.append(issue)
+
+        return build_validation_result(
+            all_issues,
+            total_records=len(keys),
+            total_intervenciones=total_intervenciones,
+            unidades_with_issues=unidades_with_issues,
+            intervenciones_with_issues=intervenciones_with_issues,
+            verbose=verbose
+        )
+
+
+def validate_features_incremental(
+    features: List[Dict[str, Any]],
+    store: Optional[QualityIssueStore] = None,
+    changed_keys: Optional[Iterable[str]] = None,
+    verbose: bool = False
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Valida solo los registros nuevos o modificados y retorna el reporte completo.
+
+    Los registros revalidados se identifican con la clave de documento de
+    `QualityReporter` (`record_document_id`), de modo que sirven para filtrar
+    directamente los reportes generados por `generate_record_level_report`.
+
+    Args:
+        features: Colección completa actual
+        store: Almacén de problemas (se carga el de la ruta por defecto si es None)
+        changed_keys: Claves (upid) que se sabe que cambiaron
+        verbose: Si True, imprime progreso y resumen
+
+    Returns:
+        Tupla (reporte con el formato de `validate_geojson`, document_id de los
+        reportes revalidados)
+    """
+    store = store if store is not None else QualityIssueStore()
+    update = store.update(features, changed_keys=changed_keys, verbose=verbose)
+    validation_result = store.build_validation_result(update['keys'], verbose=verbose)
+    validation_result['revalidated_records'] = len(update['revalidated'])
+    validation_result['removed_records'] = len(update['removed'])
+    revalidated_document_ids = list(dict.fromkeys(
+        record_document_id(features[idx].get('properties', {}).get('upid'), idx)
+        for idx in update['revalidated_positions']
+    ))
+    return validation_result, revalidated_document_ids
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación de Reportes de Calidad a Excel
+==========================================
+
+Motor de exportación usado por `QualityReporter.export_to_excel`:
+1. Construye las hojas (resumen, centro gestor, registros) como DataFrames
+   en paralelo.
+2. Escribe el libro con xlsxwriter en modo `constant_memory`, fila por fila,
+   de modo que la memoria no crece con el número de registros.
+3. Opcionalmente escribe un archivo Parquet o CSV por hoja para herramientas
+   posteriores.
+
+Si xlsxwriter no está instalado se usa openpyxl a través de pandas.
+
+Author: ETL QA Team
+Date: November 2025
+Version: 1.0
+"""
+
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import xlsxwriter
+except ImportError:  # pragma: no cover - dependencia opcional
+    xlsxwriter = None
+
+try:
+    import pyarrow  # noqa: F401 - requerido por DataFrame.to_parquet
+except ImportError:  # pragma: no cover - dependencia opcional
+    pyarrow = None
+
+
+SHEET_SUMMARY = 'Resumen'
+SHEET_CENTROS = 'Por Centro Gestor'
+SHEET_RECORDS = 'Registros con Problemas'
+
+COMPANION_FORMATS = ('parquet', 'csv')
+
+
+def build_summary_sheet(summary_report: Dict[str, Any]) -> pd.DataFrame:
+    """Hoja 1: Resumen (una fila con el documento resumen)."""
+    return pd.DataFrame([summary_report])
+
+
+def build_centro_sheet(centro_reports: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Hoja 2: Por Centro Gestor, con columnas complejas simplificadas."""
+    centro_df = pd.DataFrame(centro_reports)
+    if 'top_problematic_fields' in centro_df.columns:
+        centro_df['top_problematic_fields'] = centro_df['top_problematic_fields'].apply(
+            lambda x: ', '.join([f"{f['field']} ({f['count']})" for f in x[:3]]) if x else ''
+        )
+    if 'affected_records' in centro_df.columns:
+        centro_df = centro_df.drop(columns=['affected_records'])
+    return centro_df
+
+
+def build_records_sheet(record_reports: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Hoja 3: Registros con Problemas (simplificado)."""
+    return pd.DataFrame({
+        'UPID': [rec['upid'] for rec in record_reports],
+        'Nombre UP': [rec['nombre_up'] for rec in record_reports],
+        'Centro Gestor': [rec['nombre_centro_gestor'] for rec in record_reports],
+        'Total Problemas': [rec['total_issues'] for rec in record_reports],
+        'Severidad Máxima': [rec['max_severity'] for rec in record_reports],
+        'Prioridad': [rec['priority'] for rec in record_reports],
+        'Acción Inmediata': ['SÍ' if rec['requires_immediate_action'] else 'NO' for rec in record_reports],
+        'Campos Afectados': [', '.join(rec['affected_fields'][:5]) for rec in record_reports],
+    })
+
+
+def build_report_sheets(
+    record_reports: List[Dict[str, Any]],
+    centro_reports: List[Dict[str, Any]],
+    summary_report: Dict[str, Any],
+    max_workers: int = 3
+) -> Dict[str, pd.DataFrame]:
+    """
+    Construye las hojas del reporte en paralelo.
+
+    Returns:
+        Diccionario ordenado {nombre_hoja: DataFrame}
+    """
+    builders = {
+        SHEET_SUMMARY: (build_summary_sheet, summary_report),
+        SHEET_CENTROS: (build_centro_sheet, centro_reports),
+        SHEET_RECORDS: (build_records_sheet, record_reports),
+    }
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(func, arg) for name, (func, arg) in builders.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def _excel_value(value: Any) -> Any:
+    """Convierte un valor a un tipo que xlsxwriter escribe igual que pandas."""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if hasattr(value, 'item') and not isinstance(value, (list, dict)):
+        # Escalares numpy
+        return _excel_value(value.item())
+    return str(value)
+
+
+def write_excel_constant_memory(sheets: Dict[str, pd.DataFrame], output_file: Path):
+    """
+    Escribe las hojas con xlsxwriter en modo constant_memory.
+
+    En este modo cada fila se escribe una sola vez y en orden, por lo que se
+    escribe fila a fila en lugar de usar `DataFrame.to_excel` (que escribe
+    por columnas).
+    """
+    workbook = xlsxwriter.Workbook(str(output_file), {'constant_memory': True})
+    try:
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        for sheet_name, frame in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, [str(column) for column in frame.columns], header_format)
+            for row_idx, row in enumerate(frame.itertuples(index=False, name=None), start=1):
+                for col_idx, value in enumerate(row):
+                    value = _excel_value(value)
+                    if value is None:
+                        continue
+                    if isinstance(value, str):
+                        worksheet.write_string(row_idx, col_idx, value)
+                    elif isinstance(value, bool):
+                        worksheet.write_boolean(row_idx, col_idx, value)
+                    elif math.isfinite(value):
+                        worksheet.write_number(row_idx, col_idx, value)
+                    else:
+                        worksheet.write_string(row_idx, col_idx, str(value))
+    finally:
+        workbook.close()
+
+
+def write_excel_openpyxl(sheets: Dict[str, pd.DataFrame], output_file: Path):
+    """Escribe las hojas con pandas/openpyxl (respaldo sin xlsxwriter)."""
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        for sheet_name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def _companion_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Serializa columnas anidadas (dict/list) para Parquet/CSV."""
+    frame = frame.copy()
+    for column in frame.columns:
+        if frame[column].dtype == object:
+            frame[column] = frame[column].map(
+                lambda v: str(v) if isinstance(v, (dict, list, tuple, set)) else v
+            )
+    return frame
+
+
+def write_companion(frame: pd.DataFrame, path: Path, companion_format: str) -> Path:
+    """Escribe una hoja como archivo Parquet o CSV."""
+    frame = _companion_frame(frame)
+    if companion_format == 'parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False, encoding='utf-8-sig')
+    return path
+
+
+def export_report_sheets(
+    record_reports: List[Dict[str, Any]],
+    centro_reports: List[Dict[str, Any]],
+    summary_report: Dict[str, Any],
+    output_path: str,
+    companion_format: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Exporta los reportes de calidad a Excel y, opcionalmente, a Parquet/CSV.
+
+    Args:
+        record_reports: Reportes por registro
+        centro_reports: Reportes por centro gestor
+        summary_report: Reporte resumen
+        output_path: Ruta del archivo Excel
+        companion_format: 'parquet', 'csv' o None para no generar archivos adicionales
+
+    Returns:
+        Diccionario con la ruta del Excel, motor usado y archivos adicionales
+    """
+    if companion_format is not None and companion_format not in COMPANION_FORMATS:
+        raise ValueError(f"Formato adicional no soportado: {companion_format}")
+    if companion_format == 'parquet' and pyarrow is None:
+        print("  ⚠️ pyarrow no disponible, se exportará CSV en lugar de Parquet")
+        companion_format = 'csv'
+
+    output_file = Path(output_path)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    sheets = build_report_sheets(record_reports, centro_reports, summary_report)
+
+    companions = []
+    with ThreadPoolExecutor(max_workers=len(sheets)) as executor:
+        companion_futures = []
+        if companion_format:
+            for sheet_name, frame in sheets.items():
+                slug = re.sub(r'[^a-z0-9]+', '_', sheet_name.lower()).strip('_')
+                path = output_file.with_name(f"{output_file.stem}_{slug}.{companion_format}")
+                companion_futures.append(executor.submit(write_companion, frame, path, companion_format))
+
+        if xlsxwriter is not None:
+            engine = 'xlsxwriter'
+            write_excel_constant_memory(sheets, output_file)
+        else:
+            engine = 'openpyxl'
+            write_excel_openpyxl(sheets, output_file)
+
+        companions = [future.result() for future in companion_futures]
+
+    return {'excel_path': output_file, 'engine': engine, 'companions': companions}
@@ -12,13 +12,22 @@ Version: 1.0
 """
 
 import json
-import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 import hashlib
 
+from utils.quality_report_export import export_report_sheets
+
+
+def record_document_id(upid: Any, record_index: Any) -> Any:
+    """
+    Clave del reporte de un registro: el upid o `IDX_<posición>` si no tiene upid.
+    Los problemas con el mismo upid se agrupan en un solo reporte.
+    """
+    return upid or f"IDX_{record_index}"
+
 
 class QualityReporter:
     """
@@ -59,7 +68,7 @@ class QualityReporter:
         })
         
         for issue in issues:
-            record_key = issue.get('upid') or f"IDX_{issue.get('record_index')}"
+            record_key = record_document_id(issue.get('upid'), issue.get('record_index'))
             
             records_map[record_key]['issues'].append({
                 'rule_id': issue['rule_id'],
@@ -462,60 +471,39 @@ class QualityReporter:
         record_reports: List[Dict[str, Any]],
         centro_reports: List[Dict[str, Any]],
         summary_report: Dict[str, Any],
-        output_path: str
+        output_path: str,
+        companion_format: Optional[str] = None
     ) -> bool:
         """
         Exporta reportes a archivo Excel con múltiples hojas.
         
+        Las hojas se construyen en paralelo y se escriben con xlsxwriter en modo
+        constant_memory (ver utils.quality_report_export).
+        
         Args:
             record_reports: Reportes por registro
             centro_reports: Reportes por centro gestor
             summary_report: Reporte resumen
             output_path: Ruta del archivo de salida
+            companion_format: 'parquet' o 'csv' para generar además un archivo por hoja
             
         Returns:
             True si se exportó exitosamente
         """
         try:
-            output_file = Path(output_path)
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                # Hoja 1: Resumen
-                summary_df = pd.DataFrame([summary_report])
-                summary_df.to_excel(writer, sheet_name='Resumen', index=False)
-                
-                # Hoja 2: Por Centro Gestor
-                centro_df = pd.DataFrame(centro_reports)
-                # Simplificar columnas complejas
-                if 'top_problematic_fields' in centro_df.columns:
-                    centro_df['top_problematic_fields'] = centro_df['top_problematic_fields'].apply(
-                        lambda x: ', '.join([f"{f['field']} ({f['count']})" for f in x[:3]]) if x else ''
-                    )
-                if 'affected_records' in centro_df.columns:
-                    centro_df = centro_df.drop(columns=['affected_records'])
-                
-                centro_df.to_excel(writer, sheet_name='Por Centro Gestor', index=False)
-                
-                # Hoja 3: Registros con Problemas (simplificado)
-                records_simple = []
-                for rec in record_reports:
-                    records_simple.append({
-                        'UPID': rec['upid'],
-                        'Nombre UP': rec['nombre_up'],
-                        'Centro Gestor': rec['nombre_centro_gestor'],
-                        'Total Problemas': rec['total_issues'],
-                        'Severidad Máxima': rec['max_severity'],
-                        'Prioridad': rec['priority'],
-                        'Acción Inmediata': 'SÍ' if rec['requires_immediate_action'] else 'NO',
-                        'Campos Afectados': ', '.join(rec['affected_fields'][:5])
-                    })
-                
-                records_df = pd.DataFrame(records_simple)
-                records_df.to_excel(writer, sheet_name='Registros con Problemas', index=False)
+            result = export_report_sheets(
+                record_reports,
+                centro_reports,
+                summary_report,
+                output_path,
+                companion_format=companion_format
+            )
             
+            output_file = result['excel_path']
             file_size = output_file.stat().st_size / 1024
             print(f"  ✓ Exportado: {output_file.name} ({file_size:.1f} KB)")
+            for companion in result['companions']:
+                print(f"  ✓ Exportado: {companion.name}")
             return True
             
         except Exception as e:
@@ -705,75 +693,8 @@ class QualityReporter:
         Returns:
             Diccionario con metadata categórica estructurada
         """
-        # Extraer todos los valores únicos
-        all_severities = set()
-        all_dimensions = set()
-        all_rule_ids = set()
-        all_rule_names = set()
-        all_field_names = set()
-        all_centros_gestores = set()
-        all_priorities = set()
-        all_statuses = set()
-        
-        # Recopilar de record_reports
-        for record in record_reports:
-            all_severities.update(record.get('severity_counts', {}).keys())
-            all_dimensions.update(record.get('dimension_counts', {}).keys())
-            all_priorities.add(record.get('priority', 'P3'))
-            
-            # Extraer de issues individuales
-            for issue in record.get('issues', []):
-                all_rule_ids.add(issue.get('rule_id', ''))
-                all_rule_names.add(issue.get('rule_name', ''))
-                all_field_names.add(issue.get('field_name', ''))
-        
-        # Recopilar de centro_reports
-        for centro in centro_reports:
-            all_centros_gestores.add(centro.get('nombre_centro_gestor', ''))
-            all_statuses.add(centro.get('status', ''))
-        
-        # Calcular rangos numéricos
-        quality_scores = [c.get('quality_score', 0) for c in centro_reports]
-        error_rates = [c.get('error_rate', 0) for c in centro_reports]
-        issue_counts = [c.get('total_issues', 0) for c in centro_reports]
-        
-        # Crear opciones de filtrado (filtrar None y valores nulos)
-        filter_options = {
-            'severities': sorted([x for x in all_severities if x], 
-                                key=lambda x: ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW'].index(x) 
-                                if x in ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW'] else 999),
-            'dimensions': sorted([x for x in all_dimensions if x]),
-            'priorities': sorted([x for x in all_priorities if x]),
-            'statuses': sorted([x for x in all_statuses if x]),
-            'centros_gestores': sorted([x for x in all_centros_gestores if x]),
-            'rule_ids': sorted([x for x in all_rule_ids if x]),
-            'field_names': sorted([x for x in all_field_names if x])
-        }
-        
-        # Crear configuración de rangos (para sliders, gráficas)
-        ranges = {
-            'quality_score': {
-                'min': min(quality_scores) if quality_scores else 0,
-                'max': max(quality_scores) if quality_scores else 100,
-                'average': sum(quality_scores) / len(quality_scores) if quality_scores else 0,
-                'median': sorted(quality_scores)[len(quality_scores)//2] if quality_scores else 0,
-                'step': 5
-            },
-            'error_rate': {
-                'min': min(error_rates) if error_rates else 0,
-                'max': max(error_rates) if error_rates else 100,
-                'average': sum(error_rates) / len(error_rates) if error_rates else 0,
-                'median': sorted(error_rates)[len(error_rates)//2] if error_rates else 0,
-                'step': 1
-            },
-            'issue_count': {
-                'min': min(issue_counts) if issue_counts else 0,
-                'max': max(issue_counts) if issue_counts else 0,
-                'average': sum(issue_counts) / len(issue_counts) if issue_counts else 0,
-                'median': sorted(issue_counts)[len(issue_counts)//2] if issue_counts else 0,
-                'step': 1
-            }
-        }
+        # Opciones de filtrado y rangos numéricos (una sola pasada)
+        filter_options, ranges = self._build_filters_and_ranges(record_reports, centro_reports)
         
         # Configuración de tabs/pestañas
         tab_configurations = {
@@ -961,6 +882,85 @@ class QualityReporter:
         
         return metadata
     
+    def _build_filters_and_ranges(
+        self,
+        record_reports: List[Dict[str, Any]],
+        centro_reports: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, List[Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Construye las opciones de filtrado y los rangos numéricos de la metadata.
+        
+        Recorre registros y centros una sola vez. Severidades, dimensiones y
+        campos se toman de los conteos ya calculados por registro; solo
+        `rule_id` requiere revisar los problemas individuales.
+        
+        Args:
+            record_reports: Reportes a nivel de registro
+            centro_reports: Reportes por centro gestor
+            
+        Returns:
+            Tupla (filter_options, ranges)
+        """
+        severities = set()
+        dimensions = set()
+        priorities = set()
+        field_names = set()
+        rule_ids = set()
+        
+        for record in record_reports:
+            severities.update(record.get('severity_counts', {}))
+            dimensions.update(record.get('dimension_counts', {}))
+            priorities.add(record.get('priority', 'P3'))
+            field_names.update(record.get('affected_fields', ()))
+            rule_ids.update([issue.get('rule_id', '') for issue in record.get('issues', ())])
+        
+        centros = set()
+        statuses = set()
+        quality_scores = []
+        error_rates = []
+        issue_counts = []
+        
+        for centro in centro_reports:
+            centros.add(centro.get('nombre_centro_gestor', ''))
+            statuses.add(centro.get('status', ''))
+            quality_scores.append(centro.get('quality_score', 0))
+            error_rates.append(centro.get('error_rate', 0))
+            issue_counts.append(centro.get('total_issues', 0))
+        
+        # Crear opciones de filtrado (filtrar None y valores nulos)
+        severity_order = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']
+        filter_options = {
+            'severities': sorted([x for x in severities if x],
+                                 key=lambda x: severity_order.index(x) if x in severity_order else 999),
+            'dimensions': sorted([x for x in dimensions if x]),
+            'priorities': sorted([x for x in priorities if x]),
+            'statuses': sorted([x for x in statuses if x]),
+            'centros_gestores': sorted([x for x in centros if x]),
+            'rule_ids': sorted([x for x in rule_ids if x]),
+            'field_names': sorted([x for x in field_names if x])
+        }
+        
+        def numeric_range(values: List[Any], empty_max: Any, step: int) -> Dict[str, Any]:
+            if not values:
+                return {'min': 0, 'max': empty_max, 'average': 0, 'median': 0, 'step': step}
+            ordered = sorted(values)
+            return {
+                'min': ordered[0],
+                'max': ordered[-1],
+                'average': sum(values) / len(values),
+                'median': ordered[len(ordered) // 2],
+                'step': step
+            }
+        
+        # Crear configuración de rangos (para sliders, gráficas)
+        ranges = {
+            'quality_score': numeric_range(quality_scores, 100, 5),
+            'error_rate': numeric_range(error_rates, 100, 1),
+            'issue_count': numeric_range(issue_counts, 0, 1)
+        }
+        
+        return filter_options, ranges
+    
     def _sanitize_id(self, text: str) -> str:
         """Sanitiza un texto para usar como ID de documento."""
         # Manejar None o valores vacíos